@@ -0,0 +1,253 @@
+#
+# Copyright (c) 2024–2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Semantic Answer Cache.
+
+Most calls are the same few dozen troubleshooting intents, and each one costs a
+full LLM turn, a knowledge base lookup and a second LLM turn before anything
+is spoken. ``SemanticAnswerCache`` remembers the final assistant answer to a
+knowledge base question, keyed on:
+- The canonical product model
+- The session language
+- The query embedding (a hit is any stored query within a cosine threshold)
+
+Entries also record the retrieved chunk ids. They are evicted LRU and by TTL,
+and the whole cache is dropped when the collection fingerprint changes (it is
+recomputed in a worker thread, never on the event loop). A hit
+lets the search tool skip the second LLM turn and send the stored answer
+straight to TTS.
+
+``AnswerCacheRecorder`` is the per-session pipeline processor (placed after
+the LLM) that captures the answer text and token usage of a cache miss.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from loguru import logger
+
+from pipecat.frames.frames import (
+    Frame,
+    LLMFullResponseEndFrame,
+    LLMFullResponseStartFrame,
+    LLMTextFrame,
+    MetricsFrame,
+    StartInterruptionFrame,
+)
+from pipecat.metrics.metrics import LLMUsageMetricsData
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+# Seconds between collection fingerprint checks
+FINGERPRINT_INTERVAL = 30.0
+
+
+@dataclass
+class CachedAnswer:
+    """A stored answer and what it was built from."""
+
+    model: str
+    language: str
+    vector: np.ndarray
+    answer: str
+    chunk_ids: List[str]
+    tokens: int
+    created: float
+    hits: int = 0
+
+
+class SemanticAnswerCache:
+    """Process-wide cache of knowledge base answers, shared by all sessions.
+
+    Args:
+        threshold: Minimum cosine similarity between queries for a hit
+        max_entries: Entries kept before least-recently-used eviction
+        ttl: Seconds an entry stays valid
+        fingerprint: Callable returning the current collection version; the
+            cache is cleared whenever it changes
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.92,
+        max_entries: int = 512,
+        ttl: float = 7 * 24 * 60 * 60,
+        fingerprint: Optional[Callable[[], str]] = None,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._fingerprint = fingerprint
+        self._version = fingerprint() if fingerprint else None
+        self._checked_at = time.monotonic()
+        # Fingerprint being computed in a worker thread, applied by a later lookup
+        self._pending_version: Optional[asyncio.Future] = None
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._next_id = 0
+        self._hits = 0
+        self._misses = 0
+        self._tokens_saved = 0
+
+    def _check_version(self):
+        """Applies a finished fingerprint check and starts the next one when due.
+
+        The fingerprint walks the knowledge base files, so it runs in the loop's
+        default executor; a change is noticed one lookup after the walk ends.
+        """
+        pending = self._pending_version
+        if pending is not None and pending.done():
+            self._pending_version = None
+            if pending.exception() is None:
+                self._apply_version(pending.result())
+            else:
+                logger.warning(f"Knowledge base fingerprint failed: {pending.exception()!r}")
+        now = time.monotonic()
+        if not self._fingerprint or self._pending_version or now - self._checked_at < FINGERPRINT_INTERVAL:
+            return
+        self._checked_at = now
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._apply_version(self._fingerprint())
+            return
+        self._pending_version = loop.run_in_executor(None, self._fingerprint)
+
+    def _apply_version(self, version: str):
+        if version != self._version:
+            logger.info(f"Knowledge base changed ({self._version} -> {version}), clearing answer cache")
+            self._version = version
+            self.invalidate()
+
+    def invalidate(self):
+        """Drops every cached answer."""
+        self._entries.clear()
+
+    def lookup(self, model: str, language: str, vector: List[float]) -> Optional[CachedAnswer]:
+        """Returns the closest cached answer within the threshold, if any."""
+        self._check_version()
+        query = np.asarray(vector, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        now = time.time()
+
+        best_id, best_score = None, self.threshold
+        for entry_id, entry in list(self._entries.items()):
+            if now - entry.created > self.ttl:
+                del self._entries[entry_id]
+                continue
+            if entry.model != model or entry.language != language:
+                continue
+            score = float(entry.vector @ query)
+            if score >= best_score:
+                best_id, best_score = entry_id, score
+
+        if best_id is None:
+            self._misses += 1
+            return None
+
+        entry = self._entries[best_id]
+        self._entries.move_to_end(best_id)
+        entry.hits += 1
+        self._hits += 1
+        self._tokens_saved += entry.tokens
+        logger.debug(f"Answer cache hit ({best_score:.3f}) for {model}/{language}")
+        return entry
+
+    def store(
+        self,
+        model: str,
+        language: str,
+        vector: List[float],
+        answer: str,
+        chunk_ids: List[str],
+        tokens: int = 0,
+    ):
+        """Caches the final answer to a knowledge base question."""
+        normalized = np.asarray(vector, dtype=np.float32)
+        normalized /= np.linalg.norm(normalized) or 1.0
+        self._entries[self._next_id] = CachedAnswer(
+            model=model,
+            language=language,
+            vector=normalized,
+            answer=answer,
+            chunk_ids=chunk_ids,
+            tokens=tokens,
+            created=time.time(),
+        )
+        self._next_id += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count, hit rate and LLM tokens saved."""
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+            "llm_tokens_saved": self._tokens_saved,
+        }
+
+
+class AnswerCacheRecorder(FrameProcessor):
+    """Captures the LLM answer that follows a knowledge base cache miss.
+
+    The search tool calls ``expect()`` after a miss; the next complete LLM
+    response (and its token usage) is then stored in the cache. Interrupted
+    responses are discarded.
+    """
+
+    def __init__(self, cache: SemanticAnswerCache, **kwargs):
+        super().__init__(**kwargs)
+        self._cache = cache
+        self._pending: Optional[Dict[str, Any]] = None
+        self._text: List[str] = []
+        self._tokens = 0
+        self._in_response = False
+
+    def expect(self, model: str, language: str, vector: List[float], chunk_ids: List[str]):
+        """Marks the next LLM response as the answer to this question."""
+        self._pending = {
+            "model": model,
+            "language": language,
+            "vector": vector,
+            "chunk_ids": chunk_ids,
+        }
+        self._text = []
+        self._tokens = 0
+        self._in_response = False
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        """Collect answer text and usage for a pending question.
+
+        Args:
+            frame: The incoming frame to process
+            direction: The direction of frame flow in the pipeline
+        """
+        await super().process_frame(frame, direction)
+
+        if self._pending:
+            if isinstance(frame, LLMFullResponseStartFrame):
+                self._in_response = True
+                self._text = []
+            elif isinstance(frame, LLMTextFrame) and self._in_response:
+                self._text.append(frame.text)
+            elif isinstance(frame, MetricsFrame):
+                for data in frame.data:
+                    if isinstance(data, LLMUsageMetricsData):
+                        self._tokens += data.value.prompt_tokens + data.value.completion_tokens
+            elif isinstance(frame, StartInterruptionFrame):
+                self._pending = None
+            elif isinstance(frame, LLMFullResponseEndFrame) and self._in_response:
+                answer = "".join(self._text).strip()
+                if answer:
+                    self._cache.store(answer=answer, tokens=self._tokens, **self._pending)
+                self._pending = None
+
+        await self.push_frame(frame, direction)
@@ -0,0 +1,230 @@
+#
+# Copyright (c) 2024–2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Adaptive Avatar Video Output.
+
+The transport used to redraw the full-resolution listening frame 30 times a
+second for the whole call, even though it never changes. Here the transport
+runs in live mode (it only sends what it is given) and ``AvatarVideo`` decides
+what to send:
+- The talking animation at the configured frame rate while the bot speaks
+- The static listening frame once, then only as a keepalive at the idle rate
+- Consecutive identical frames are never re-sent
+
+Resolution, frame rate, idle rate and bitrate come from the environment. A
+session can override them, or ask for audio only, with the ``video`` options
+passed to /start or /connect. Frames are scaled once per resolution per
+process, not per frame.
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from pipecat.frames.frames import (
+    BotStartedSpeakingFrame,
+    BotStoppedSpeakingFrame,
+    CancelFrame,
+    EndFrame,
+    Frame,
+    OutputImageRawFrame,
+    StartFrame,
+)
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+VIDEO_OUT_WIDTH = int(os.getenv("VIDEO_OUT_WIDTH", "1024"))
+VIDEO_OUT_HEIGHT = int(os.getenv("VIDEO_OUT_HEIGHT", "576"))
+VIDEO_OUT_FPS = int(os.getenv("VIDEO_OUT_FPS", "30"))
+# Keepalive rate for the unchanged listening frame (0: send it once per pause)
+VIDEO_IDLE_FPS = float(os.getenv("VIDEO_IDLE_FPS", "1"))
+VIDEO_OUT_BITRATE = int(os.getenv("VIDEO_OUT_BITRATE", "800000"))
+
+
+def _clamp(value: Any, low: float, high: float, default: float) -> float:
+    try:
+        return min(high, max(low, float(value)))
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass
+class VideoConfig:
+    """Video output settings for one session."""
+
+    enabled: bool = True
+    width: int = VIDEO_OUT_WIDTH
+    height: int = VIDEO_OUT_HEIGHT
+    fps: int = VIDEO_OUT_FPS
+    idle_fps: float = VIDEO_IDLE_FPS
+    bitrate: int = VIDEO_OUT_BITRATE
+
+    def __post_init__(self):
+        # The environment defaults skip from_options' clamping
+        self.fps = max(1, self.fps)
+        self.idle_fps = min(max(0.0, self.idle_fps), self.fps)
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return (self.width, self.height)
+
+    @classmethod
+    def from_options(cls, options: Optional[Dict[str, Any]]) -> "VideoConfig":
+        """Builds a session config from client options, falling back to the defaults.
+
+        Args:
+            options: e.g. ``{"audio_only": true}`` or ``{"width": 640, "height": 360, "fps": 15}``
+        """
+        config = cls()
+        if not options:
+            return config
+        if options.get("audio_only") or options.get("enabled") is False:
+            config.enabled = False
+            return config
+        config.width = int(_clamp(options.get("width"), 160, 1920, config.width))
+        config.height = int(_clamp(options.get("height"), 90, 1080, config.height))
+        config.fps = int(_clamp(options.get("fps"), 1, 30, config.fps))
+        config.idle_fps = _clamp(options.get("idle_fps"), 0.2, config.fps, min(config.idle_fps, config.fps))
+        config.bitrate = int(_clamp(options.get("bitrate"), 100_000, 2_500_000, config.bitrate))
+        return config
+
+
+class AvatarFrames:
+    """The avatar animation, scaled once per output resolution.
+
+    Args:
+        frames: Animation frames at their native size; the first one is the
+            listening frame
+    """
+
+    def __init__(self, frames: List[OutputImageRawFrame]):
+        self._frames = frames
+        self._scaled: Dict[Tuple[int, int], List[OutputImageRawFrame]] = {}
+
+    def at(self, size: Tuple[int, int]) -> List[OutputImageRawFrame]:
+        if size == self._frames[0].size:
+            return self._frames
+        if size not in self._scaled:
+            from PIL import Image
+
+            # The animation repeats frames (it plays forward then back); scale each one once
+            scaled: Dict[int, OutputImageRawFrame] = {}
+            for frame in self._frames:
+                if id(frame) not in scaled:
+                    image = Image.frombytes("RGB", frame.size, frame.image).resize(size)
+                    scaled[id(frame)] = OutputImageRawFrame(image=image.tobytes(), size=size, format="RGB")
+            self._scaled[size] = [scaled[id(frame)] for frame in self._frames]
+            logger.debug(f"Scaled avatar frames to {size[0]}x{size[1]}")
+        return self._scaled[size]
+
+
+class AvatarVideo(FrameProcessor):
+    """Sends avatar frames to the (live-mode) output transport.
+
+    Replaces pushing a static frame or SpriteFrame and letting the transport
+    repeat it at its full frame rate.
+
+    Args:
+        frames: Frames at the output resolution; the first is the listening frame
+        config: Session video settings
+    """
+
+    def __init__(self, frames: List[OutputImageRawFrame], config: VideoConfig, **kwargs):
+        super().__init__(**kwargs)
+        self._frames = frames
+        self._quiet = frames[0]
+        self._config = config
+        self._talking = False
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._frame_bytes = config.width * config.height * 3
+        self._sent = 0
+        self._skipped = 0
+        self._started_at = 0.0
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        """Track speaking state; frames pass through unchanged.
+
+        Args:
+            frame: The incoming frame to process
+            direction: The direction of frame flow in the pipeline
+        """
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, StartFrame):
+            # The transport has to see the StartFrame before any image
+            await self.push_frame(frame, direction)
+            self._started_at = time.monotonic()
+            self._task = self.create_task(self._render_loop())
+            return
+
+        if isinstance(frame, BotStartedSpeakingFrame):
+            self._talking = True
+            self._wake.set()
+        elif isinstance(frame, BotStoppedSpeakingFrame):
+            self._talking = False
+            self._wake.set()
+        elif isinstance(frame, (EndFrame, CancelFrame)):
+            await self._stop()
+
+        await self.push_frame(frame, direction)
+
+    async def _render_loop(self):
+        talking_interval = 1 / self._config.fps
+        # None: no keepalive, the listening frame is sent once when speech stops
+        idle_interval = 1 / self._config.idle_fps if self._config.idle_fps > 0 else None
+        index = 0
+        last: Optional[OutputImageRawFrame] = None
+        last_sent_at = 0.0
+        while True:
+            if self._talking:
+                image = self._frames[index % len(self._frames)]
+                index += 1
+                interval = talking_interval
+            else:
+                image = self._quiet
+                index = 0
+                interval = idle_interval
+
+            now = time.monotonic()
+            # Unchanged since the last frame sent: the receiver keeps showing it until the
+            # keepalive is due (with some slack so timer jitter doesn't skip a whole tick)
+            if image is last and (idle_interval is None or now - last_sent_at < idle_interval * 0.95):
+                self._skipped += 1
+            else:
+                await self.push_frame(image)
+                last, last_sent_at = image, now
+                self._sent += 1
+
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _stop(self):
+        if self._task:
+            await self.cancel_task(self._task)
+            self._task = None
+
+    def stats(self) -> Dict[str, float]:
+        """Frames sent and skipped, average frame rate and raw frame bytes handed to the encoder."""
+        elapsed = max(time.monotonic() - self._started_at, 1e-6) if self._started_at else 0.0
+        return {
+            "frames_sent": self._sent,
+            "frames_skipped": self._skipped,
+            "avg_fps": round(self._sent / elapsed, 2) if elapsed else 0.0,
+            "raw_mb": round(self._sent * self._frame_bytes / 1e6, 1),
+            "max_bitrate_kbps": self._config.bitrate // 1000,
+        }
+
+    async def cleanup(self):
+        await super().cleanup()
+        await self._stop()
+        logger.info(f"Avatar video: {self.stats()}")
@@ -10,114 +10,324 @@ This module implements a chatbot using OpenAI's GPT-4 model for natural language
 processing. It includes:
 - Real-time audio/video interaction through Daily
 - Animated robot avatar
-- Text-to-speech using ElevenLabs
+- Text-to-speech using Cartesia (or ElevenLabs, with TTS_PROVIDER=elevenlabs)
 - Support for both English and Spanish
 
 The bot runs as part of a pipeline that processes audio/video frames and manages
 the conversation flow.
+
+Started with ``--worker`` the module becomes a pre-warmed pool worker that can
+host up to ``--max-sessions`` concurrent conversations. Sprite frames, the
+vector store and the retriever are loaded once per process and shared; every
+session gets its own transport, VAD, TTS, LLM service and context.
+
+Importing the module stays cheap: only the selected transport and TTS provider
+are imported, when a session needs them, and the knowledge base and sprites
+are loaded on first use. A cold-started bot loads the knowledge base in the
+background while it configures and joins the room; a pool worker loads
+everything before it reports ready. ``python startup_profile.py`` reports where
+import and startup time goes.
 """
 
+import argparse
 import asyncio
+import concurrent.futures
+import importlib
+import json
 import os
 import sys
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
 
 import aiohttp
 from dotenv import load_dotenv
 from loguru import logger
-from PIL import Image
 from runner import configure
+from sprite_atlas import load_sprite_frames
 
-from pipecat.audio.vad.silero import SileroVADAnalyzer
-from pipecat.frames.frames import (
-    BotStartedSpeakingFrame,
-    BotStoppedSpeakingFrame,
-    Frame,
-    OutputImageRawFrame,
-    SpriteFrame,
-)
+from pipecat.frames.frames import FunctionCallResultProperties
 from pipecat.pipeline.pipeline import Pipeline
 from pipecat.pipeline.runner import PipelineRunner
 from pipecat.pipeline.task import PipelineParams, PipelineTask
-from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
 from pipecat.frames.frames import TTSSpeakFrame
 from pipecat.processors.frameworks.rtvi import RTVIConfig, RTVIObserver, RTVIProcessor
-from pipecat.services.cartesia.tts import CartesiaTTSService
-from pipecat.services.elevenlabs.tts import ElevenLabsTTSService
-from pipecat.transports.services.daily import DailyParams, DailyTransport
 from pipecat.services.llm_service import FunctionCallParams
-from tool import TOOL_CONTEXT, LLM_WITH_TOOLS, load_qdrant_from_disk
+from tool import (
+    KB_MODEL_FIELD,
+    KB_SEARCH_TIMEOUT,
+    create_answer_cache,
+    create_llm_with_tools,
+    create_retriever,
+    create_tool_context,
+    embed_query,
+    load_vector_store,
+    model_search_kwargs,
+    retrieve_documents,
+)
+from product_models import extract_models, latest_model_in_messages
+from prefetch import RetrievalPrefetcher
+from answer_cache import AnswerCacheRecorder
+from avatar_video import AvatarFrames, AvatarVideo, VideoConfig
+from shared_vad import create_vad_analyzer, shared_session
+from latency_observer import TurnLatencyObserver
+from context_packing import KB_RESULT_METADATA, ResultPacker
+from context_compaction import CONTEXT_COMPACTION, ContextCompactor, is_summary
+import http_clients
+from http_clients import http_session, warm_up
+import worker_ipc
 
 load_dotenv(override=True)
 logger.remove(0)
 logger.add(sys.stderr, level="DEBUG")
 
-sprites = []
 script_dir = os.path.dirname(__file__)
 
-# Load sequential animation frames
-for i in range(1, 26):
-    # Build the full path to the image file
-    full_path = os.path.join(script_dir, f"assets/robot0{i}.png")
-    # Get the filename without the extension to use as the dictionary key
-    # Open the image and convert it to bytes
-    with Image.open(full_path) as img:
-        sprites.append(OutputImageRawFrame(image=img.tobytes(), size=img.size, format=img.format))
+KB_PATH = "./waterdrop_faq_qdrant"
+KB_COLLECTION = "waterdrop_faq"
+
+# Shared by every session in this process; None unless ANSWER_CACHE is enabled
+answer_cache = create_answer_cache(KB_PATH)
+
+# Text-to-speech provider ("cartesia" or "elevenlabs"); only its pipecat service is imported
+TTS_PROVIDER = os.getenv("TTS_PROVIDER", "cartesia").lower().strip()
+TTS_MODULES = {
+    "cartesia": "tts_cache",
+    "elevenlabs": "pipecat.services.elevenlabs.tts",
+}
+if TTS_PROVIDER not in TTS_MODULES:
+    raise ValueError(f"Invalid TTS_PROVIDER: {TTS_PROVIDER}. Must be one of {', '.join(TTS_MODULES)}")
+
+# Default voice per provider when the session does not request one
+DEFAULT_VOICE_IDS = {
+    "cartesia": "9626c31c-bec5-4cca-baa8-f8ba9e84c8bc",
+    # English; "gD1IexrzCvsXPHUuT0s3" with model "eleven_multilingual_v2" for Spanish
+    "elevenlabs": "pNInz6obpgDQGcFmaJgB",
+}
+DEFAULT_VOICE_ID = DEFAULT_VOICE_IDS[TTS_PROVIDER]
+
+# Send turn latency histograms to server.py (set in the environment it starts bots with)
+REPORT_METRICS = os.getenv("BOT_REPORT_METRICS") == "1"
+# Seconds between turn latency reports
+METRICS_REPORT_INTERVAL = float(os.getenv("BOT_METRICS_INTERVAL", "10"))
 
-# Create a smooth animation by adding reversed frames
-flipped = sprites[::-1]
-sprites.extend(flipped)
+# Set by loadtest.py: ws:// room URLs are the harness's caller, not Daily rooms
+LOADTEST = os.getenv("LOADTEST") == "1"
 
-# Define static and animated states
-quiet_frame = sprites[0]  # Static frame for when bot is listening
-talking_frame = SpriteFrame(images=sprites)  # Animation sequence for when bot is talking
 
-# Load vector store and perform search
-vector_store = load_qdrant_from_disk("./waterdrop_faq_qdrant", "waterdrop_faq")
-retriever = vector_store.as_retriever(k=4)
+@dataclass
+class KnowledgeBase:
+    """The process-wide vector store and the retriever over it."""
 
+    vector_store: Any
+    retriever: Any
 
-class TalkingAnimation(FrameProcessor):
-    """Manages the bot's visual animation states.
 
-    Switches between static (listening) and animated (talking) states based on
-    the bot's current speaking status.
+# Loads the knowledge base off the event loop, once per process
+_kb_loader = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="kb-load")
+_kb_future: concurrent.futures.Future | None = None
+
+
+def _load_knowledge_base() -> KnowledgeBase:
+    started_at = time.monotonic()
+    vector_store = load_vector_store(KB_PATH, KB_COLLECTION)
+    knowledge_base = KnowledgeBase(vector_store, create_retriever(vector_store, k=4))
+    logger.info(f"Knowledge base loaded in {time.monotonic() - started_at:.2f}s")
+    return knowledge_base
+
+
+def start_knowledge_base() -> concurrent.futures.Future:
     """
+    Starts loading the knowledge base in the background, unless it is loaded or
+    loading already. A failed load is retried by the next caller.
+    """
+    global _kb_future
+    if _kb_future is None or (_kb_future.done() and _kb_future.exception()):
+        _kb_future = _kb_loader.submit(_load_knowledge_base)
+    return _kb_future
 
-    def __init__(self):
-        super().__init__()
-        self._is_talking = False
 
-    async def process_frame(self, frame: Frame, direction: FrameDirection):
-        """Process incoming frames and update animation state.
+async def get_knowledge_base() -> KnowledgeBase:
+    """
+    The knowledge base, waiting for it if it is still loading.
+    """
+    return await asyncio.wrap_future(start_knowledge_base())
 
-        Args:
-            frame: The incoming frame to process
-            direction: The direction of frame flow in the pipeline
-        """
-        await super().process_frame(frame, direction)
 
-        # Switch to talking animation when bot starts speaking
-        if isinstance(frame, BotStartedSpeakingFrame):
-            if not self._is_talking:
-                await self.push_frame(talking_frame)
-                self._is_talking = True
-        # Return to static frame when bot stops speaking
-        elif isinstance(frame, BotStoppedSpeakingFrame):
-            await self.push_frame(quiet_frame)
-            self._is_talking = False
+@lru_cache(maxsize=1)
+def avatar_frames() -> AvatarFrames:
+    """
+    Avatar animation frames, loaded by the first session with video.
+    """
+    # Sequential animation frames from the memory-mapped sprite atlas
+    # (built from assets/robot0*.png by sprite_atlas.py, shared by every bot process)
+    sprites = load_sprite_frames(os.path.join(script_dir, "assets"))
+
+    # Create a smooth animation by adding reversed frames
+    sprites.extend(sprites[::-1])
+
+    # The first frame doubles as the static listening frame; scaled per output resolution on demand
+    return AvatarFrames(sprites)
+
+
+@lru_cache(maxsize=1)
+def shared_tts_cache():
+    """
+    Pre-synthesized filler phrases and repeated sentences, shared by every session
+    in this process (Cartesia only).
+    """
+    from tts_cache import create_tts_cache
+
+    return create_tts_cache()
+
+
+def create_tts(session: aiohttp.ClientSession, voice_id: str):
+    """
+    The session's text-to-speech service from TTS_PROVIDER.
+    """
+    if TTS_PROVIDER == "elevenlabs":
+        from pipecat.services.elevenlabs.tts import ElevenLabsTTSService
 
-        await self.push_frame(frame, direction)
+        return ElevenLabsTTSService(api_key=os.getenv("ELEVENLABS_API_KEY"), voice_id=voice_id)
 
-async def search_knowledge_base(params: FunctionCallParams):
+    from tts_cache import CachedCartesiaTTSService
+
+    return CachedCartesiaTTSService(
+        api_key=os.getenv("CARTESIA_API_KEY"),
+        voice_id=voice_id,
+        audio_cache=shared_tts_cache(),
+        http_session=session,
+    )
+
+
+def warm_up_urls() -> list[str]:
+    """
+    Upstream URLs besides OpenAI whose connections are opened ahead of the first turn.
+    """
+    if TTS_PROVIDER != "cartesia":
+        return []
+    from tts_cache import CARTESIA_HTTP_URL
+
+    return [CARTESIA_HTTP_URL]
+
+
+# Filler renders by voice, so each voice is rendered once per process rather than per session
+_filler_renders: dict[str, asyncio.Task] = {}
+
+
+async def prerender_fillers(session: aiohttp.ClientSession, voice_id: str):
+    """
+    Renders the filler phrases for a voice into the TTS cache, if they are missing.
+    Sessions share one render per voice; a render that left phrases missing is
+    retried by the next session that asks.
+    """
+    if TTS_PROVIDER != "cartesia":
+        return
+    from tts_cache import FILLER_PHRASES, TTS_CACHE_SAMPLE_RATE, prerender
+
+    async def render() -> bool:
+        cache = shared_tts_cache()
+        await prerender(cache, session, voice_id)
+        return all([await cache.contains(voice_id, TTS_CACHE_SAMPLE_RATE, p) for p in FILLER_PHRASES])
+
+    task = _filler_renders.get(voice_id)
+    if task is None or (task.done() and (task.cancelled() or task.exception() or not task.result())):
+        task = _filler_renders[voice_id] = asyncio.create_task(render())
+    await asyncio.shield(task)
+
+
+def remaining(deadline: float) -> float:
+    """
+    Seconds left until a time.monotonic() deadline (0 once it has passed).
+    """
+    return max(0.0, deadline - time.monotonic())
+
+
+async def knowledge_base_by(deadline: float) -> KnowledgeBase | None:
+    """
+    The knowledge base, or None if it is still loading at the deadline.
+    """
+    try:
+        # Shielded: a lookup that gives up must not cancel the shared load
+        return await asyncio.wait_for(asyncio.shield(get_knowledge_base()), remaining(deadline))
+    except asyncio.TimeoutError:
+        return None
+
+
+async def fetch_documents(query: str, models: list[str], deadline: float | None = None):
+    """
+    Retrieves documents for a query, routed to the given product models.
+    Every step shares one latency budget that ends at deadline (KB_SEARCH_TIMEOUT
+    from now if not given). Returns None if the lookup did not finish by then.
+    """
+    deadline = deadline or time.monotonic() + KB_SEARCH_TIMEOUT
+    knowledge_base = await knowledge_base_by(deadline)
+    if knowledge_base is None:
+        return None
+    retriever = knowledge_base.retriever
+    search_kwargs = model_search_kwargs(retriever, models)
+
+    # Runs off the event loop within what is left of the budget
+    docs = await retrieve_documents(retriever, query, timeout=remaining(deadline), **search_kwargs)
+    if docs == [] and search_kwargs and remaining(deadline) > 0:
+        # Nothing indexed for this model; fall back to the whole collection
+        docs = await retrieve_documents(retriever, query, timeout=remaining(deadline))
+    return docs
+
+
+async def answer_timed_out(params: FunctionCallParams, query: str):
+    """
+    Tool result for a lookup that ran out of its latency budget.
+    """
+    logger.warning(f"Knowledge base search timed out after {KB_SEARCH_TIMEOUT}s: {query}")
+    await params.result_callback({
+        "query": query,
+        "results": [],
+        "total_results": 0,
+        "error": "The knowledge base is taking too long to respond. "
+                 "Apologize briefly and suggest contacting customer service if the issue persists."
+    })
+
+
+def is_first_lookup(params: FunctionCallParams) -> bool:
+    """
+    Whether this is the session's first knowledge base call. Later calls are
+    follow-ups whose answers depend on the conversation so far, so they are
+    neither served from nor stored in the answer cache.
+    """
+    if not params.context:
+        return True
+    # Earlier lookups may since have been compacted into a summary
+    return not any(
+        (message.get("role") == "tool" and message.get("tool_call_id") != params.tool_call_id)
+        or is_summary(message)
+        for message in params.context.get_messages()
+    )
+
+
+async def search_knowledge_base(
+    params: FunctionCallParams,
+    prefetcher: RetrievalPrefetcher | None = None,
+    recorder: AnswerCacheRecorder | None = None,
+    language: str = "en",
+    packer: ResultPacker | None = None,
+):
     """
     Implementation of the search function that will be called when the LLM invokes the tool.
     
     Args:
         params: FunctionCallParams object containing arguments and result callback
+        prefetcher: Session prefetcher that may already hold results for this query
+        recorder: Session answer cache recorder (None when the cache is disabled)
+        language: Session language, part of the answer cache key
+        packer: Session result packer that fits the results into a token budget
         
     Returns:
         Results via params.result_callback()
     """
+    # One latency budget for the whole lookup, however many steps it takes
+    deadline = time.monotonic() + KB_SEARCH_TIMEOUT
     try:
         # Extract arguments
         query = params.arguments.get("query")
@@ -128,20 +338,78 @@ async def search_knowledge_base(params: FunctionCallParams):
             })
             return
         
-        docs = retriever.invoke(query)
+        # Route the search to the customer's product model (from the query, or the
+        # conversation so far) plus shared policy/warranty documents
+        models = extract_models(query)
+        if not models and params.context:
+            model = latest_model_in_messages(params.context.get_messages())
+            models = [model] if model else []
+
+        # Loaded in the background when the session started; usually ready by now
+        knowledge_base = await knowledge_base_by(deadline)
+        if knowledge_base is None:
+            await answer_timed_out(params, query)
+            return
+
+        # Answer cache: a near-identical first question for the same model is
+        # answered with the stored reply, skipping the second LLM turn. Without
+        # a model the answer depends on the conversation, so it is not cached
+        cache_key = None
+        if recorder and answer_cache and models and is_first_lookup(params):
+            vector = await embed_query(knowledge_base.vector_store, query, timeout=remaining(deadline))
+            if vector is not None:
+                cache_key = (",".join(sorted(models)), language, vector)
+                cached = answer_cache.lookup(*cache_key)
+                if cached:
+                    await params.result_callback(
+                        {
+                            "query": query,
+                            "product_models": models,
+                            "answered_from_cache": True,
+                            "answer": cached.answer,
+                        },
+                        properties=FunctionCallResultProperties(run_llm=False),
+                    )
+                    params.context.add_message({"role": "assistant", "content": cached.answer})
+                    await params.llm.push_frame(TTSSpeakFrame(cached.answer))
+                    logger.debug(f"Answer cache: {answer_cache.stats()}")
+                    return
+
+        docs = None
+        if prefetcher:
+            docs = await prefetcher.lookup(query, models, timeout=remaining(deadline))
+        if docs is None and remaining(deadline) > 0:
+            docs = await fetch_documents(query, models, deadline)
+        if docs is None:
+            await answer_timed_out(params, query)
+            return
         
-        # Format results
-        results = []
-        for i, doc in enumerate(docs):
-            results.append({
-                "rank": i + 1,
-                "content": doc.page_content,
-                "metadata": doc.metadata if hasattr(doc, 'metadata') else {}
-            })
+        # Format results: deduped, trimmed to the relevant sentences and within the
+        # token budget, since tool results are resent with every later LLM call
+        if packer:
+            results = packer.pack(query, docs)
+        else:
+            results = []
+            for i, doc in enumerate(docs):
+                results.append({
+                    "rank": i + 1,
+                    "content": doc.page_content,
+                    "metadata": doc.metadata if hasattr(doc, 'metadata') else {}
+                })
         
+        if cache_key:
+            # Store whatever the LLM answers from these results
+            recorder.expect(*cache_key, chunk_ids=[str(doc.metadata.get("_id")) for doc in docs])
+            logger.debug(f"Answer cache: {answer_cache.stats()}")
+
+        logger.debug(f"Embedding cache: {knowledge_base.vector_store.embeddings.stats()}")
+        if hasattr(knowledge_base.retriever, "stats"):
+            logger.debug(f"Retrieval paths: {knowledge_base.retriever.stats()}")
+
         # Return results via callback
         await params.result_callback({
             "query": query,
+            "product_models": models,
             "results": results,
             "total_results": len(results)
         })
@@ -153,132 +421,354 @@ async def search_knowledge_base(params: FunctionCallParams):
         })
 
 
-async def main():
+async def main(handoff: dict | None = None):
     """Main bot execution function.
 
     Sets up and runs the bot pipeline including:
-    - Daily video transport
+    - Daily video transport (or audio only, if the session asked for it)
     - Speech-to-text and text-to-speech services
     - Language model integration
     - Animation processing
     - RTVI event handling
-    """
-    async with aiohttp.ClientSession() as session:
-        (room_url, token) = await configure(session)
 
-        # Set up Daily transport with video/audio parameters
-        transport = DailyTransport(
-            room_url,
-            token,
-            "Chatbot",
-            DailyParams(
-                audio_in_enabled=True,
-                audio_out_enabled=True,
-                video_out_enabled=True,
-                video_out_width=1024,
-                video_out_height=576,
-                vad_analyzer=SileroVADAnalyzer(),
-                transcription_enabled=True,
-            ),
+    Args:
+        handoff: Session parameters from the server (stdin in worker mode, the
+            command line for a cold start)
+    """
+    handoff = handoff or {}
+    video = VideoConfig.from_options(handoff.get("video"))
+    # A cold start loads these while the room is configured and joined; the first
+    # lookup waits for the knowledge base if it is still loading
+    start_knowledge_base()
+    frames_task = asyncio.create_task(asyncio.to_thread(avatar_frames)) if video.enabled else None
+    # Per-session VAD state on the process-wide Silero session
+    vad_analyzer = create_vad_analyzer()
+    started_at, cpu_started = time.monotonic(), time.process_time()
+    # Process-wide keep-alive session, shared with every other session in this worker
+    session = http_session()
+    # Open the upstream connections while the room is configured, not on the first turn
+    (room_url, token), _ = await asyncio.gather(
+        configure(session, url=handoff.get("room_url"), token=handoff.get("token")),
+        warm_up(warm_up_urls()),
+    )
+
+    # Set up Daily transport with video/audio parameters. Video runs in live mode:
+    # the transport only sends the frames AvatarVideo pushes instead of repeating one
+    transport = create_transport(room_url, token, video, vad_analyzer)
+
+    # Initialize text-to-speech service
+    voice_id = handoff.get("voice") or DEFAULT_VOICE_ID
+    tts = create_tts(session, voice_id)
+    # Filler phrases for this voice, unless this process already rendered them
+    prerender_task = asyncio.create_task(prerender_fillers(session, voice_id))
+
+    # Debug logging to track context resets
+    original_flush_audio = tts.flush_audio
+    async def debug_flush_audio():
+        logger.warning("TTS Context being flushed - this may cause emotion drift!")
+        await original_flush_audio()
+    tts.flush_audio = debug_flush_audio
+
+    # Initialize LLM service (one per session; conversation state lives in the context)
+    llm = create_llm_with_tools()
+    # Starts knowledge base lookups from transcriptions, ahead of the tool call
+    prefetcher = RetrievalPrefetcher(fetch_documents)
+    # Captures answers to knowledge base questions for the shared answer cache
+    recorder = AnswerCacheRecorder(answer_cache) if answer_cache else None
+    # Fits each knowledge base result into KB_RESULT_TOKENS
+    packer = ResultPacker(metadata_fields=[KB_MODEL_FIELD, *KB_RESULT_METADATA])
+    # Summarizes older turns of long calls in the background
+    compactor = ContextCompactor() if CONTEXT_COMPACTION else None
+
+    async def search_with_prefetch(params: FunctionCallParams):
+        await search_knowledge_base(
+            params,
+            prefetcher,
+            recorder=recorder,
+            language=handoff.get("language") or "en",
+            packer=packer,
         )
 
-        # Initialize text-to-speech service
-        # tts = ElevenLabsTTSService(
-        #     api_key=os.getenv("ELEVENLABS_API_KEY"),
-        #     #
-        #     # English
-        #     #
-        #     voice_id="pNInz6obpgDQGcFmaJgB",
-        #     #
-        #     # Spanish
-        #     #
-        #     # model="eleven_multilingual_v2",
-        #     # voice_id="gD1IexrzCvsXPHUuT0s3",
-        # )
-
-        tts = CartesiaTTSService(
-            api_key=os.getenv("CARTESIA_API_KEY"),
-            voice_id="9626c31c-bec5-4cca-baa8-f8ba9e84c8bc",
-        )
+    llm.register_function(
+        "search_knowledge_base",
+        search_with_prefetch,
+    )
+
+    @llm.event_handler("on_function_calls_started")
+    async def on_function_calls_started(service, function_calls):
+        await tts.queue_frame(TTSSpeakFrame("Let me check on that."))
+
+    # Set up conversation context and management
+    # The context_aggregator will automatically collect conversation context
+    context_aggregator = llm.create_context_aggregator(create_tool_context())
+
+    avatar = AvatarVideo((await frames_task).at(video.size), video) if frames_task else None
+
+    #
+    # RTVI events for Pipecat client UI
+    #
+    rtvi = RTVIProcessor(config=RTVIConfig(config=[]))
+
+    processors = [
+        transport.input(),
+        rtvi,
+        prefetcher,
+        context_aggregator.user(),
+        compactor,
+        llm,
+        recorder,
+        tts,
+        avatar,
+        transport.output(),
+        context_aggregator.assistant(),
+    ]
+    pipeline = Pipeline([p for p in processors if p is not None])
+
+    # Per-turn stage latencies, from the metrics frames enabled below
+    latency = TurnLatencyObserver(llm, tts)
+
+    task = PipelineTask(
+        pipeline,
+        params=PipelineParams(
+            allow_interruptions=True,
+            enable_metrics=True,
+            enable_usage_metrics=True,
+        ),
+        observers=[RTVIObserver(rtvi), latency],
+    )
+
+    # Flag to track if we've already handled client ready
+    client_ready_handled = False
+
+    @rtvi.event_handler("on_client_ready")
+    async def on_client_ready(rtvi):
+        nonlocal client_ready_handled
+        if not client_ready_handled:
+            client_ready_handled = True
+            await rtvi.set_bot_ready()
+            # Kick off the conversation only once
+            await task.queue_frames([context_aggregator.user().get_context_frame()])
+
+    if not is_websocket_room(room_url):
+        @transport.event_handler("on_first_participant_joined")
+        async def on_first_participant_joined(transport, participant):
+            await transport.capture_participant_transcription(participant["id"])
+
+        @transport.event_handler("on_participant_left")
+        async def on_participant_left(transport, participant, reason):
+            logger.info(f"Participant left: {participant}")
+            await task.cancel()
+    else:
+        # The load-test caller hanging up
+        @transport.event_handler("on_disconnected")
+        async def on_disconnected(transport, websocket):
+            logger.info("Caller disconnected")
+            await task.cancel()
+
+    # Several sessions may share a worker process, so leave signals to the worker
+    runner = PipelineRunner(handle_sigint="session_id" not in handoff)
+
+    report_task = asyncio.create_task(report_latency(latency)) if REPORT_METRICS else None
+    await runner.run(task)
+    prerender_task.cancel()
+    if report_task:
+        report_task.cancel()
+        send_latency_report(latency)
+
+    # Process-wide figures: exact for a single-session process, shared otherwise
+    wall = time.monotonic() - started_at
+    cpu = time.process_time() - cpu_started
+    logger.info(
+        f"Session {'with video ' + str(video.size) if video.enabled else 'audio only'}: "
+        f"{cpu:.1f}s CPU over {wall:.0f}s ({100 * cpu / max(wall, 1e-6):.1f}%)"
+    )
+    logger.info(f"VAD latency: {vad_analyzer.stats()}")
+    logger.info(f"Turn latency: {latency.stats()}")
+    logger.info(f"Result packing: {packer.stats()}")
+    logger.info(f"HTTP connections: {http_clients.stats()}")
+    if compactor:
+        logger.info(f"Context compaction: {compactor.stats()}")
+
+
+def is_websocket_room(room_url: str) -> bool:
+    """Whether a room is a load-test websocket server rather than a Daily room.
+
+    Only under LOADTEST=1, so no room URL alone can move a session off Daily.
+    """
+    return LOADTEST and room_url.startswith(("ws://", "wss://"))
 
-        # Debug logging to track context resets
-        original_flush_audio = tts.flush_audio
-        async def debug_flush_audio():
-            logger.warning("TTS Context being flushed - this may cause emotion drift!")
-            await original_flush_audio()
-        tts.flush_audio = debug_flush_audio
-
-        # Initialize LLM service
-        llm = LLM_WITH_TOOLS
-        llm.register_function(
-            "search_knowledge_base",
-            search_knowledge_base,
-        )
 
-        @llm.event_handler("on_function_calls_started")
-        async def on_function_calls_started(service, function_calls):
-            await tts.queue_frame(TTSSpeakFrame("Let me check on that."))
-
-        # Set up conversation context and management
-        # The context_aggregator will automatically collect conversation context
-        context_aggregator = llm.create_context_aggregator(TOOL_CONTEXT)
-
-        ta = TalkingAnimation()
-
-        #
-        # RTVI events for Pipecat client UI
-        #
-        rtvi = RTVIProcessor(config=RTVIConfig(config=[]))
-
-        pipeline = Pipeline(
-            [
-                transport.input(),
-                rtvi,
-                context_aggregator.user(),
-                llm,
-                tts,
-                ta,
-                transport.output(),
-                context_aggregator.assistant(),
-            ]
+def create_transport(room_url: str, token: str, video: VideoConfig, vad_analyzer):
+    """Daily transport for the room, or a websocket one for load-test rooms.
+
+    With LOADTEST=1, rooms created by daily_rest_stub.py with ``--transport-url``
+    are ws:// URLs served by loadtest.py, which sends the caller's audio and transcriptions
+    (standing in for Daily's) as protobuf frames and plays the bot's audio.
+    """
+    params = dict(
+        audio_in_enabled=True,
+        audio_out_enabled=True,
+        video_out_enabled=video.enabled,
+        video_out_is_live=True,
+        video_out_width=video.width,
+        video_out_height=video.height,
+        video_out_framerate=video.fps,
+        video_out_bitrate=video.bitrate,
+        vad_analyzer=vad_analyzer,
+    )
+    if is_websocket_room(room_url):
+        from pipecat.serializers.protobuf import ProtobufFrameSerializer
+        from pipecat.transports.network.websocket_client import (
+            WebsocketClientParams,
+            WebsocketClientTransport,
         )
 
-        task = PipelineTask(
-            pipeline,
-            params=PipelineParams(
-                allow_interruptions=True,
-                enable_metrics=True,
-                enable_usage_metrics=True,
+        return WebsocketClientTransport(
+            room_url,
+            WebsocketClientParams(
+                **params, add_wav_header=False, serializer=ProtobufFrameSerializer()
             ),
-            observers=[RTVIObserver(rtvi)],
         )
-        await task.queue_frame(quiet_frame)
+    from pipecat.transports.services.daily import DailyParams, DailyTransport
 
-        # Flag to track if we've already handled client ready
-        client_ready_handled = False
+    return DailyTransport(
+        room_url, token, "Chatbot", DailyParams(**params, transcription_enabled=True)
+    )
 
-        @rtvi.event_handler("on_client_ready")
-        async def on_client_ready(rtvi):
-            nonlocal client_ready_handled
-            if not client_ready_handled:
-                client_ready_handled = True
-                await rtvi.set_bot_ready()
-                # Kick off the conversation only once
-                await task.queue_frames([context_aggregator.user().get_context_frame()])
 
-        @transport.event_handler("on_first_participant_joined")
-        async def on_first_participant_joined(transport, participant):
-            await transport.capture_participant_transcription(participant["id"])
+def send_latency_report(latency: TurnLatencyObserver):
+    """Send the turn latencies recorded since the last report to server.py."""
+    stages = latency.take_report()
+    if stages:
+        worker_ipc.send_event(worker_ipc.METRICS, pid=os.getpid(), stages=stages)
 
-        @transport.event_handler("on_participant_left")
-        async def on_participant_left(transport, participant, reason):
-            print(f"Participant left: {participant}")
-            await task.cancel()
 
-        runner = PipelineRunner()
+async def report_latency(latency: TurnLatencyObserver):
+    """Report turn latencies every METRICS_REPORT_INTERVAL seconds while the session runs."""
+    while True:
+        await asyncio.sleep(METRICS_REPORT_INTERVAL)
+        send_latency_report(latency)
 
-        await runner.run(task)
+
+async def run_session(session_id: str, handoff: dict):
+    """Run one worker-hosted session and report back to the server when it ends."""
+    try:
+        await main(handoff)
+    except Exception as e:
+        logger.exception(f"Session {session_id} failed: {e}")
+    finally:
+        worker_ipc.send_event(worker_ipc.SESSION_ENDED, session_id=session_id)
+
+
+def import_session_modules():
+    """Imports the Daily transport and TTS provider modules ahead of the first session."""
+    for module in ("pipecat.transports.services.daily", TTS_MODULES[TTS_PROVIDER]):
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            # Only a warm-up; a session that needs the module reports the error
+            logger.warning(f"Could not preload {module}: {e}")
+
+
+async def worker_main(max_sessions: int = 1):
+    """Pre-warmed pool worker entry point.
+
+    Load everything expensive a session needs (knowledge base, sprites, the
+    transport and TTS modules, the shared VAD model and filler audio), tell the
+    server we're ready, then accept session handoffs until ``max_sessions`` are
+    running concurrently.
+    A single-session worker exits once its session is over.
+
+    Args:
+        max_sessions: Number of concurrent sessions this process may host
+    """
+    sessions: dict[str, asyncio.Task] = {}
+    await asyncio.gather(
+        asyncio.wrap_future(start_knowledge_base()),
+        asyncio.to_thread(avatar_frames),
+        asyncio.to_thread(import_session_modules),
+    )
+    # One Silero session for every session this worker hosts, within the server's VAD_THREADS budget
+    shared_session()
+    await warm_up(warm_up_urls())
+    await prerender_fillers(http_session(), DEFAULT_VOICE_ID)
+    worker_ipc.send_event(
+        worker_ipc.READY, pid=os.getpid(), capacity=max_sessions, reusable=max_sessions > 1
+    )
+
+    while True:
+        handoff = await worker_ipc.read_message()
+        if handoff is None:
+            logger.info("Server closed the worker pipe, no more sessions will be accepted")
+            break
+
+        session_id = handoff.get("session_id") or str(os.getpid())
+        reason = None
+        if len(sessions) >= max_sessions:
+            reason = "full"
+        elif time.time() > handoff.get("expires", float("inf")):
+            reason = "expired"
+        if reason:
+            # The server routes the session to another worker
+            logger.warning(f"Worker rejected session {session_id}: {reason}")
+            worker_ipc.send_event(worker_ipc.REJECTED, session_id=session_id, reason=reason)
+            continue
+
+        worker_ipc.send_event(
+            worker_ipc.ACCEPTED, session_id=session_id, room_url=handoff.get("room_url")
+        )
+        logger.info(f"Worker received session {session_id} for {handoff.get('room_url')}")
+
+        task = asyncio.create_task(run_session(session_id, handoff))
+        sessions[session_id] = task
+        task.add_done_callback(lambda _, sid=session_id: sessions.pop(sid, None))
+
+        if max_sessions == 1:
+            break
+
+    if sessions:
+        await asyncio.gather(*sessions.values(), return_exceptions=True)
+
+
+def worker_args() -> argparse.Namespace:
+    """Worker-mode options the pool starts the bot with."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Start as a pre-warmed pool worker and wait for a session on stdin",
+    )
+    parser.add_argument(
+        "--max-sessions",
+        type=int,
+        default=1,
+        help="Number of concurrent sessions a pool worker may host",
+    )
+    args, _ = parser.parse_known_args()
+    return args
+
+
+def handoff_from_args() -> dict:
+    """Session parameters for a cold-started bot, from the command line the server built."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--tts-voice", default=None)
+    parser.add_argument("--video", type=json.loads, default=None)
+    args, _ = parser.parse_known_args()
+    return {"language": args.language, "voice": args.tts_voice, "video": args.video}
+
+
+async def run_and_close(coroutine):
+    """Run the bot, then close the shared HTTP clients."""
+    try:
+        await coroutine
+    finally:
+        await http_clients.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    worker = worker_args()
+    if worker.worker:
+        asyncio.run(run_and_close(worker_main(max_sessions=max(1, worker.max_sessions))))
+    else:
+        asyncio.run(run_and_close(main(handoff_from_args())))
@@ -0,0 +1,445 @@
+#
+# Copyright (c) 2024–2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Pre-warmed Bot Worker Pool.
+
+Starting a bot with ``python3 -m bot-openai`` re-imports pipecat and
+langchain, decodes the sprite assets, opens the knowledge base and builds the
+VAD model before it can join a room. This module keeps bot workers that have
+already done all of that and are blocked waiting for a session handoff (see
+``worker_ipc``).
+
+A worker may host several concurrent sessions (``--max-sessions``), sharing its
+read-only assets between them. The pool counts free session slots across all
+workers rather than processes.
+
+The pool:
+- Spawns workers with ``--worker`` and waits for their ``ready`` event
+- Hands a room URL, token, language and voice to a free slot on demand,
+  re-routing it to another slot if the worker rejects it or does not answer
+- Refills itself in the background, backing off exponentially while workers
+  fail to start
+- Tracks pool size, hit/miss counts and handoff latency
+"""
+
+import asyncio
+import os
+import subprocess
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+import worker_ipc
+
+# Seconds a worker may take to import and initialize before it is discarded
+WORKER_STARTUP_TIMEOUT = float(os.getenv("BOT_POOL_STARTUP_TIMEOUT", "120"))
+
+# Seconds to wait for a worker to acknowledge a handoff
+HANDOFF_TIMEOUT = float(os.getenv("BOT_POOL_HANDOFF_TIMEOUT", "2"))
+
+# Seconds of silence (hosting sessions report metrics every few seconds) after a
+# missed handoff before a worker is considered hung and killed
+WORKER_STALL_TIMEOUT = float(os.getenv("BOT_POOL_STALL_TIMEOUT", "30"))
+
+# Delay before retrying after a worker failed to start, doubled on every further failure
+SPAWN_BACKOFF_SECS = float(os.getenv("BOT_POOL_SPAWN_BACKOFF", "5"))
+SPAWN_BACKOFF_MAX_SECS = float(os.getenv("BOT_POOL_SPAWN_BACKOFF_MAX", "300"))
+
+
+class BotWorker:
+    """A bot process started in worker mode plus its event stream."""
+
+    def __init__(self, proc: subprocess.Popen, reader: asyncio.StreamReader, capacity: int):
+        self.proc = proc
+        self.reader = reader
+        self.capacity = capacity
+        self.sessions: set[str] = set()
+        # Single-session workers exit after their session and are never reused
+        self.reusable = capacity > 1
+        self.accepted_total = 0
+        self.started_at = time.monotonic()
+        self.last_event_at = self.started_at
+        # Missed a handoff: no new sessions until the worker is heard from again
+        self.stalled = False
+        # Rejected a handoff as full: no new sessions until one of its sessions ends
+        self.full = False
+        self.ready = asyncio.get_running_loop().create_future()
+        self.on_session_ended = None
+        self.on_metrics = None
+        self._accepted: Dict[str, asyncio.Future] = {}
+        # Resolved when a handed-off session ends (or the worker exits)
+        self._ended: Dict[str, asyncio.Future] = {}
+        self._read_task = asyncio.create_task(self._read_loop())
+
+    @property
+    def pid(self) -> int:
+        return self.proc.pid
+
+    @property
+    def free_slots(self) -> int:
+        if not self.ready.done() or not self.alive() or self.stalled or self.full:
+            return 0
+        if not self.reusable and self.accepted_total:
+            return 0
+        return self.capacity - len(self.sessions) - len(self._accepted)
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def unresponsive(self) -> bool:
+        """Whether a worker that missed a handoff should be replaced.
+
+        Only when it hosts no session, or has not sent anything for
+        WORKER_STALL_TIMEOUT; a busy event loop that misses one handoff is kept.
+        """
+        if not self.stalled:
+            return False
+        return not self.sessions or time.monotonic() - self.last_event_at > WORKER_STALL_TIMEOUT
+
+    async def _read_loop(self):
+        """Dispatch worker events for the life of the process.
+
+        Also keeps the stdout pipe drained so a running bot never blocks on it.
+        """
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            event = worker_ipc.decode(line)
+            if event is None:
+                continue
+            name = event.get("event")
+            session_id = event.get("session_id")
+            self.last_event_at = time.monotonic()
+            self.stalled = False
+            if name == worker_ipc.READY and not self.ready.done():
+                self.ready.set_result(event)
+            elif name == worker_ipc.ACCEPTED and session_id in self._accepted:
+                self.sessions.add(session_id)
+                self.accepted_total += 1
+                self._accepted.pop(session_id).set_result(event)
+            elif name == worker_ipc.REJECTED and session_id in self._accepted:
+                if event.get("reason") == "full":
+                    self.full = True
+                self._accepted.pop(session_id).set_result(event)
+            elif name == worker_ipc.SESSION_ENDED:
+                self.sessions.discard(session_id)
+                self.full = False
+                self._resolve_ended(session_id)
+                if self.on_session_ended:
+                    self.on_session_ended(self)
+            elif name == worker_ipc.METRICS and self.on_metrics:
+                self.on_metrics(event)
+
+        self.sessions.clear()
+        if not self.ready.done():
+            self.ready.set_result(None)
+        for future in self._accepted.values():
+            if not future.done():
+                future.set_result(None)
+        for session_id in list(self._ended):
+            self._resolve_ended(session_id)
+        if self.on_session_ended:
+            self.on_session_ended(self)
+
+    async def handoff(self, session_id: str, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Send a session to the worker and wait for it to be accepted.
+
+        Returns:
+            The worker's ``accepted`` or ``rejected`` event, or None if it did not
+            answer in time (the worker is marked stalled) or has exited.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._accepted[session_id] = future
+        self._ended[session_id] = loop.create_future()
+        # The worker rejects the handoff once this has passed, leaving it half the
+        # timeout to deliver its answer, so a late reader never joins a re-routed room
+        expires = time.time() + HANDOFF_TIMEOUT / 2
+        try:
+            self.proc.stdin.write(
+                worker_ipc.encode({**message, "session_id": session_id, "expires": expires})
+            )
+            self.proc.stdin.flush()
+            event = await asyncio.wait_for(future, HANDOFF_TIMEOUT)
+        except (OSError, asyncio.TimeoutError) as e:
+            print(f"Pool worker {self.pid} failed handoff: {e!r}")
+            self.stalled = True
+            event = None
+        finally:
+            self._accepted.pop(session_id, None)
+        if not event or event.get("event") != worker_ipc.ACCEPTED:
+            self._ended.pop(session_id, None)
+        return event
+
+    async def wait_session(self, session_id: str):
+        """Wait until a session hosted by this worker ends."""
+        future = self._ended.get(session_id)
+        if future is not None:
+            await asyncio.shield(future)
+
+    def _resolve_ended(self, session_id: str):
+        future = self._ended.pop(session_id, None)
+        if future and not future.done():
+            future.set_result(None)
+
+    def terminate(self):
+        if self.alive():
+            self.proc.terminate()
+
+    def kill(self):
+        if self.alive():
+            self.proc.kill()
+
+
+class PooledSession:
+    """Handle for one session running inside a pool worker.
+
+    Mirrors the parts of ``subprocess.Popen`` that server.py uses so pooled and
+    cold-started sessions can be tracked the same way.
+    """
+
+    def __init__(self, worker: BotWorker, session_id: str):
+        self.worker = worker
+        self.session_id = session_id
+
+    @property
+    def pid(self) -> int:
+        return self.worker.pid
+
+    def poll(self) -> Optional[int]:
+        if self.worker.alive() and self.session_id in self.worker.sessions:
+            return None
+        return self.worker.proc.poll() or 0
+
+    def terminate(self):
+        self.worker.terminate()
+
+    def kill(self):
+        self.worker.kill()
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        return self.worker.proc.wait(timeout)
+
+    async def wait_async(self) -> int:
+        """Wait for the session to end without blocking the event loop."""
+        await self.worker.wait_session(self.session_id)
+        return self.poll()
+
+
+class BotWorkerPool:
+    """Keeps ``size`` free session slots on fully initialized bot workers.
+
+    Args:
+        size: Number of free session slots to keep. 0 disables the pool.
+        command: Command used to start a worker; ``--worker`` is appended.
+        cwd: Working directory for worker processes.
+        sessions_per_worker: Concurrent sessions each worker process hosts.
+        env: Environment for worker processes (defaults to the server's).
+        on_metrics: Called with every ``metrics`` event a worker sends.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        command: List[str],
+        cwd: str,
+        sessions_per_worker: int = 1,
+        env: Optional[Dict[str, str]] = None,
+        on_metrics: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self.size = size
+        self.sessions_per_worker = max(1, sessions_per_worker)
+        self._command = command + ["--worker", "--max-sessions", str(self.sessions_per_worker)]
+        self._cwd = cwd
+        self._env = env
+        self._on_metrics = on_metrics
+        self._workers: List[BotWorker] = []
+        self._starting = 0
+        self._refill = asyncio.Event()
+        self._refill_task: Optional[asyncio.Task] = None
+        self._hits = 0
+        self._misses = 0
+        self._rejected = 0
+        self._handoff_timeouts = 0
+        self._handoff_ms: List[float] = []
+        # Consecutive failed worker starts, and when the next start may be attempted
+        self._spawn_failures = 0
+        self._spawn_after = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    async def start(self):
+        """Start the background refill loop."""
+        if not self.enabled:
+            return
+        self._refill_task = asyncio.create_task(self._refill_loop())
+        self._refill.set()
+
+    async def stop(self):
+        """Stop refilling and terminate idle workers.
+
+        Workers that are hosting sessions are left to the caller's cleanup.
+        """
+        if self._refill_task:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+        idle = [w for w in self._workers if not w.sessions]
+        for worker in idle:
+            worker.terminate()
+        await asyncio.gather(*(asyncio.to_thread(w.proc.wait) for w in idle))
+        self._workers.clear()
+
+    async def acquire(self, handoff: Dict[str, Any]) -> Optional[PooledSession]:
+        """Hand a session to a free worker slot.
+
+        Args:
+            handoff: Session parameters (room_url, token, language, voice).
+
+        Returns:
+            A handle for the session now running in a worker, or None on a pool
+            miss (the caller should fall back to a cold start).
+        """
+        if not self.enabled:
+            return None
+
+        start = time.monotonic()
+        while True:
+            candidates = [w for w in self._workers if w.free_slots > 0]
+            if not candidates:
+                break
+            # Spread sessions across workers so no single event loop gets hot
+            worker = max(candidates, key=lambda w: w.free_slots)
+            session_id = uuid.uuid4().hex[:12]
+            event = await worker.handoff(session_id, handoff)
+            if not event or event.get("event") != worker_ipc.ACCEPTED:
+                # Route the session to another slot; the refused worker gets no more
+                # until it has room (rejected) or is heard from again (timed out)
+                if event:
+                    self._rejected += 1
+                elif worker.alive():
+                    self._handoff_timeouts += 1
+                if not worker.alive() or worker.unresponsive():
+                    self._discard(worker)
+                continue
+
+            self._hits += 1
+            self._record_handoff((time.monotonic() - start) * 1000)
+            self._refill.set()
+            return PooledSession(worker, session_id)
+
+        self._misses += 1
+        self._refill.set()
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size, hit/miss counts and handoff latency."""
+        latencies = self._handoff_ms
+        workers = [w for w in self._workers if w.alive()]
+        return {
+            "enabled": self.enabled,
+            "target_size": self.size,
+            "sessions_per_worker": self.sessions_per_worker,
+            "workers": len(workers),
+            "idle": sum(w.free_slots for w in workers),
+            "active_sessions": sum(len(w.sessions) for w in workers),
+            "starting": self._starting,
+            "hits": self._hits,
+            "misses": self._misses,
+            "rejected": self._rejected,
+            "handoff_timeouts": self._handoff_timeouts,
+            "spawn_failures": self._spawn_failures,
+            "handoff_ms": {
+                "last": round(latencies[-1], 2) if latencies else None,
+                "avg": round(sum(latencies) / len(latencies), 2) if latencies else None,
+                "max": round(max(latencies), 2) if latencies else None,
+            },
+        }
+
+    def _record_handoff(self, ms: float):
+        self._handoff_ms.append(ms)
+        # Keep a bounded window of recent handoffs
+        if len(self._handoff_ms) > 1000:
+            del self._handoff_ms[:-1000]
+
+    def _on_session_ended(self, worker: BotWorker):
+        self._refill.set()
+
+    def _discard(self, worker: BotWorker):
+        if worker.alive():
+            print(f"Pool worker {worker.pid} stopped responding, killing it")
+            worker.kill()
+        if worker in self._workers:
+            self._workers.remove(worker)
+
+    async def _refill_loop(self):
+        while True:
+            # Wake on demand, and periodically to replace workers that died idle
+            try:
+                await asyncio.wait_for(self._refill.wait(), 5)
+            except asyncio.TimeoutError:
+                pass
+            self._refill.clear()
+            for worker in [w for w in self._workers if w.unresponsive()]:
+                self._discard(worker)
+            self._workers = [w for w in self._workers if w.alive()]
+            free = sum(w.free_slots for w in self._workers)
+            free += self._starting * self.sessions_per_worker
+            missing = -(-(self.size - free) // self.sessions_per_worker)
+            if self._spawn_failures:
+                # Backing off: one worker at a time, once the delay has passed
+                if time.monotonic() < self._spawn_after:
+                    continue
+                missing = min(missing, 1 - self._starting)
+            for _ in range(max(0, missing)):
+                self._starting += 1
+                asyncio.create_task(self._spawn_worker())
+
+    async def _spawn_worker(self):
+        worker = None
+        try:
+            proc = subprocess.Popen(
+                self._command,
+                cwd=self._cwd,
+                env=self._env,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+            reader = asyncio.StreamReader()
+            loop = asyncio.get_running_loop()
+            await loop.connect_read_pipe(
+                lambda: asyncio.StreamReaderProtocol(reader), proc.stdout
+            )
+            worker = BotWorker(proc, reader, self.sessions_per_worker)
+            worker.on_session_ended = self._on_session_ended
+            worker.on_metrics = self._on_metrics
+            event = await asyncio.wait_for(worker.ready, WORKER_STARTUP_TIMEOUT)
+            if not event:
+                raise RuntimeError("worker exited before becoming ready")
+            worker.capacity = int(event.get("capacity", self.sessions_per_worker))
+            worker.reusable = bool(event.get("reusable", worker.capacity > 1))
+            print(
+                f"Pool worker {worker.pid} ready in "
+                f"{time.monotonic() - worker.started_at:.2f}s "
+                f"({worker.capacity} session slots)"
+            )
+            self._workers.append(worker)
+            self._spawn_failures = 0
+        except Exception as e:
+            self._spawn_failures += 1
+            delay = min(SPAWN_BACKOFF_MAX_SECS, SPAWN_BACKOFF_SECS * 2 ** (self._spawn_failures - 1))
+            self._spawn_after = time.monotonic() + delay
+            print(f"Failed to start pool worker: {e!r} (retrying in {delay:.0f}s)")
+            if worker:
+                worker.kill()
+        finally:
+            self._starting -= 1
@@ -0,0 +1,280 @@
+#
+# Copyright (c) 2024–2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Rolling Conversation Context Compaction.
+
+Every LLM call resends the whole conversation, so a long troubleshooting call
+pays again and again for early small talk and for knowledge base results that
+stopped mattering several steps ago. ``ContextCompactor`` sits between the
+user context aggregator and the LLM, and watches the context on its way to the
+LLM:
+- Once the conversation (everything after the system prompt) passes
+  ``threshold`` tokens, the turns before the newest ``keep_turns`` user turns
+  are summarized in the background: product model, symptom, steps already
+  tried and anything else the agent still needs
+- The summary is swapped in on a later turn, when the context passes by
+  again, as one system message in place of those turns; the newest turns
+  always stay verbatim
+- Summarizing never blocks a turn. A turn that arrives while a summary is
+  being written goes to the LLM with the full context
+
+The summary message is named ``SUMMARY_NAME``, so model routing
+(``latest_model_in_messages``) still finds the product model after the turns
+that named it are gone. Compactions, tokens before/after and summary latency
+are available from ``stats()``.
+"""
+
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from openai import AsyncOpenAI
+
+from pipecat.frames.frames import Frame
+from pipecat.processors.aggregators.openai_llm_context import (
+    OpenAILLMContext,
+    OpenAILLMContextFrame,
+)
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+from context_packing import count_tokens
+from http_clients import openai_client
+from product_models import SUMMARY_NAME, latest_model_in_messages
+
+CONTEXT_COMPACTION = os.getenv("CONTEXT_COMPACTION", "false").lower() in ("1", "true", "yes")
+# Conversation tokens (system prompt excluded) before older turns are summarized
+CONTEXT_COMPACT_TOKENS = int(os.getenv("CONTEXT_COMPACT_TOKENS", "2000"))
+# Newest user turns, with everything after them, that are always kept verbatim
+CONTEXT_KEEP_TURNS = int(os.getenv("CONTEXT_KEEP_TURNS", "3"))
+# Model that writes the summaries
+CONTEXT_COMPACT_MODEL = os.getenv("CONTEXT_COMPACT_MODEL", "gpt-4o-mini")
+
+SUMMARY_PREFIX = "Conversation so far (summarized):"
+
+SUMMARY_PROMPT = """You maintain the running state of a customer support call for Waterdrop water filters.
+Rewrite the conversation below as a compact state summary for the agent who continues the call.
+Use these lines, leaving out any with nothing to report:
+Product model: <canonical model, e.g. WD-G3P600>
+Symptom: <the customer's problem, in their terms>
+Steps already tried: <troubleshooting steps suggested or done, and their outcome>
+Other facts: <order details, language preference, promises made, anything the agent must not ask again>
+Keep facts from knowledge base results only if the agent relied on them. No greetings, no advice."""
+
+# Characters of a knowledge base result shown to the summarizer
+TOOL_RESULT_CHARS = 1200
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content if isinstance(content, str) else ""
+
+
+def message_tokens(messages: List[dict]) -> int:
+    """Tokens of messages as sent to the LLM (roughly: their JSON)."""
+    return count_tokens(json.dumps(messages, default=str, ensure_ascii=False)) if messages else 0
+
+
+def is_summary(message: dict) -> bool:
+    return message.get("name") == SUMMARY_NAME
+
+
+def render_transcript(messages: List[dict]) -> str:
+    """Plain-text transcript of messages for the summarizer."""
+    lines = []
+    for message in messages:
+        role = message.get("role")
+        if is_summary(message):
+            lines.append(f"Earlier summary:\n{_text(message.get('content'))}")
+        elif role == "user":
+            lines.append(f"Customer: {_text(message.get('content'))}")
+        elif role == "assistant":
+            if _text(message.get("content")):
+                lines.append(f"Agent: {_text(message.get('content'))}")
+            for call in message.get("tool_calls") or []:
+                arguments = call.get("function", {}).get("arguments", "")
+                lines.append(f"Agent searched the knowledge base: {arguments}")
+        elif role == "tool":
+            lines.append(f"Knowledge base result: {_text(message.get('content'))[:TOOL_RESULT_CHARS]}")
+    return "\n".join(lines)
+
+
+def compaction_cut(messages: List[dict], keep_turns: int) -> Optional[int]:
+    """Index of the first message kept verbatim, or None if nothing can be compacted.
+
+    The cut is always at a user message, so a tool call is never separated
+    from its result.
+    """
+    user_turns = [i for i, m in enumerate(messages) if i > 0 and m.get("role") == "user"]
+    if len(user_turns) <= keep_turns:
+        return None
+    cut = user_turns[-keep_turns] if keep_turns > 0 else len(messages)
+    # A lone earlier summary gains nothing from being summarized again
+    older = messages[1:cut]
+    if not older or (len(older) == 1 and is_summary(older[0])):
+        return None
+    return cut
+
+
+@dataclass
+class PendingSummary:
+    """A summary of ``replaced`` (messages[1:1 + len(replaced)] when it started)."""
+
+    replaced: List[dict]
+    model: Optional[str]
+    started_at: float
+    text: Optional[str] = None
+
+
+@dataclass
+class CompactionStats:
+    compactions: int = 0
+    failures: int = 0
+    discarded: int = 0
+    tokens_before: List[int] = field(default_factory=list)
+    tokens_after: List[int] = field(default_factory=list)
+    summary_secs: List[float] = field(default_factory=list)
+
+
+class ContextCompactor(FrameProcessor):
+    """Summarizes a session's older turns once its context grows past a threshold.
+
+    Args:
+        threshold: Conversation tokens (system prompt excluded) that start a compaction
+        keep_turns: Newest user turns kept verbatim
+        model: Chat model that writes the summary
+        client: OpenAI client for the summaries (the process-wide pooled one if not given)
+    """
+
+    def __init__(
+        self,
+        threshold: int = CONTEXT_COMPACT_TOKENS,
+        keep_turns: int = CONTEXT_KEEP_TURNS,
+        model: str = CONTEXT_COMPACT_MODEL,
+        client: Optional[AsyncOpenAI] = None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self._threshold = threshold
+        self._keep_turns = keep_turns
+        self._model = model
+        self._client = client
+        self._pending: Optional[PendingSummary] = None
+        self._task = None
+        # After a failed summary, wait for the conversation to grow before retrying
+        self._retry_at = 0
+        self._stats = CompactionStats()
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        """Compact contexts on their way to the LLM; frames pass through unchanged.
+
+        Args:
+            frame: The incoming frame to process
+            direction: The direction of frame flow in the pipeline
+        """
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, OpenAILLMContextFrame) and direction == FrameDirection.DOWNSTREAM:
+            self._apply_summary(frame.context)
+            self._maybe_compact(frame.context)
+
+        await self.push_frame(frame, direction)
+
+    def _apply_summary(self, context: OpenAILLMContext):
+        pending = self._pending
+        if not pending or pending.text is None:
+            return
+        self._pending = None
+
+        messages = context.get_messages()
+        count = len(pending.replaced)
+        # Messages are only ever appended; anything else means the context was reset
+        if len(messages) <= count or any(a is not b for a, b in zip(messages[1:], pending.replaced)):
+            self._stats.discarded += 1
+            logger.debug("Context changed while it was being summarized; summary discarded")
+            return
+
+        text = pending.text
+        if pending.model and pending.model not in text:
+            text = f"Product model: {pending.model}\n{text}"
+        summary = {"role": "system", "name": SUMMARY_NAME, "content": f"{SUMMARY_PREFIX}\n{text}"}
+
+        before = message_tokens(messages[1:])
+        context.set_messages([messages[0], summary, *messages[1 + count:]])
+        after = message_tokens(context.get_messages()[1:])
+        self._stats.compactions += 1
+        self._stats.tokens_before.append(before)
+        self._stats.tokens_after.append(after)
+        logger.debug(f"Compacted {count} messages: {before} -> {after} conversation tokens")
+
+    def _maybe_compact(self, context: OpenAILLMContext):
+        if self._pending:
+            return
+        messages = context.get_messages()
+        tokens = message_tokens(messages[1:])
+        if tokens < max(self._threshold, self._retry_at):
+            return
+        cut = compaction_cut(messages, self._keep_turns)
+        if cut is None:
+            return
+
+        replaced = list(messages[1:cut])
+        # Routing falls back to the latest model named anywhere in the conversation
+        model = latest_model_in_messages(replaced)
+        self._pending = PendingSummary(replaced=replaced, model=model, started_at=time.monotonic())
+        self._task = self.create_task(self._summarize(self._pending, tokens))
+
+    async def _summarize(self, pending: PendingSummary, tokens: int):
+        try:
+            if self._client is None:
+                self._client = openai_client()
+            response = await self._client.chat.completions.create(
+                model=self._model,
+                messages=[
+                    {"role": "system", "content": SUMMARY_PROMPT},
+                    {"role": "user", "content": render_transcript(pending.replaced)},
+                ],
+                temperature=0,
+                max_tokens=300,
+            )
+            text = (response.choices[0].message.content or "").strip()
+            if not text:
+                raise ValueError("empty summary")
+        except Exception as e:
+            logger.warning(f"Context summary failed: {e}")
+            self._stats.failures += 1
+            self._retry_at = tokens + self._threshold // 2
+            if self._pending is pending:
+                self._pending = None
+            return
+        self._stats.summary_secs.append(time.monotonic() - pending.started_at)
+        pending.text = text
+
+    def stats(self) -> Dict[str, Any]:
+        """Compactions run, conversation tokens before/after and summary latency."""
+        stats = self._stats
+        before = sum(stats.tokens_before)
+        after = sum(stats.tokens_after)
+        return {
+            "compactions": stats.compactions,
+            "failures": stats.failures,
+            "discarded": stats.discarded,
+            "avg_tokens_before": round(before / len(stats.tokens_before)) if stats.tokens_before else 0,
+            "avg_tokens_after": round(after / len(stats.tokens_after)) if stats.tokens_after else 0,
+            "saved": round(1 - after / before, 3) if before else 0.0,
+            "avg_summary_secs": (
+                round(sum(stats.summary_secs) / len(stats.summary_secs), 3) if stats.summary_secs else 0.0
+            ),
+        }
+
+    async def cleanup(self):
+        if self._task and not self._task.done():
+            await self.cancel_task(self._task)
+            self._task = None
+        await super().cleanup()
@@ -0,0 +1,185 @@
+#
+# Copyright (c) 2024–2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Token-budgeted Packing of Knowledge Base Results.
+
+``search_knowledge_base`` used to return every retrieved chunk's full text
+and metadata. Tool results stay in the conversation context, so each later
+LLM call pays for them again. ``ResultPacker`` shrinks a tool result before it
+enters the context:
+- Drops sentences already included from a higher-ranked chunk, since chunks
+  overlap, and drops chunks left empty
+- Keeps the sentences most relevant to the query: query-term overlap (IDF
+  weighted over the retrieved sentences) plus a prior for the chunk's rank,
+  so a top dense hit that shares no words with the query still gets room
+- Fits the selection into ``budget`` tokens per tool result; kept sentences
+  stay in document order, with "…" where text was cut
+- Keeps only the metadata fields the model needs (product model, source)
+
+Token counts use tiktoken's ``o200k_base`` encoding when it is available,
+otherwise an estimate of four characters per token. Tokens before and after
+packing are available from ``stats()``.
+"""
+
+import json
+import math
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence
+
+from langchain_core.documents import Document
+from loguru import logger
+
+from lexical_index import tokenize
+
+# Token budget for the chunk text of one tool result (0 = return chunks unpacked)
+KB_RESULT_TOKENS = int(os.getenv("KB_RESULT_TOKENS", "600"))
+# Metadata fields kept besides the product model field
+KB_RESULT_METADATA = [f for f in os.getenv("KB_RESULT_METADATA", "source,title").split(",") if f]
+
+# Sentence ends, and line breaks between FAQ lines and list items
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[A-Z0-9])|\s*\n+\s*")
+
+# Score of the top-ranked chunk's sentences before any query-term overlap;
+# the prior halves, thirds... for lower-ranked chunks
+RANK_PRIOR = 0.5
+
+ELLIPSIS = " … "
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # Not installed, or the encoding could not be downloaded
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in text for OpenAI's current models (estimated without tiktoken)."""
+    encoding = _encoding()
+    if encoding:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / 4)
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_RE.split(text or "") if s and s.strip()]
+
+
+def _normalize(sentence: str) -> str:
+    return " ".join(re.findall(r"\w+", sentence.lower()))
+
+
+class ResultPacker:
+    """Packs one session's knowledge base results into a token budget.
+
+    Args:
+        budget: Tokens of chunk text per tool result (0 = no packing)
+        metadata_fields: Metadata keys kept on each result
+    """
+
+    def __init__(self, budget: int = KB_RESULT_TOKENS, metadata_fields: Sequence[str] = ()):
+        self.budget = budget
+        self.metadata_fields = list(metadata_fields)
+        self._calls = 0
+        self._raw_tokens = 0
+        self._packed_tokens = 0
+        self._duplicates = 0
+        self._dropped = 0
+
+    def pack(self, query: str, docs: List[Document]) -> List[Dict[str, Any]]:
+        """Results for the tool response, best first."""
+        unpacked = [
+            {"rank": i + 1, "content": doc.page_content, "metadata": doc.metadata or {}}
+            for i, doc in enumerate(docs)
+        ]
+        if self.budget <= 0:
+            return unpacked
+
+        # Sentences of every chunk, minus ones a higher-ranked chunk already has
+        seen = set()
+        chunks: List[List[str]] = []
+        for doc in docs:
+            sentences = []
+            for sentence in split_sentences(doc.page_content):
+                key = _normalize(sentence)
+                if key in seen:
+                    self._duplicates += 1
+                    continue
+                seen.add(key)
+                sentences.append(sentence)
+            chunks.append(sentences)
+
+        # IDF over the retrieved sentences: terms that appear everywhere count for little
+        terms = [[set(tokenize(s)) for s in sentences] for sentences in chunks]
+        total = sum(len(t) for t in terms)
+        frequency = Counter(term for chunk in terms for sentence in chunk for term in sentence)
+        query_terms = set(tokenize(query))
+        idf = {t: math.log(1 + total / frequency[t]) for t in query_terms if frequency[t]}
+        query_weight = sum(idf.values())
+
+        candidates = []
+        for rank, sentences in enumerate(chunks):
+            for position, sentence in enumerate(sentences):
+                overlap = sum(idf.get(t, 0.0) for t in terms[rank][position] & query_terms)
+                score = (overlap / query_weight if query_weight else 0.0) + RANK_PRIOR / (rank + 1)
+                candidates.append((score, rank, position, sentence))
+        # Best first; ties go to the higher-ranked chunk and earlier sentences
+        candidates.sort(key=lambda c: (-c[0], c[1], c[2]))
+
+        kept: Dict[int, List[int]] = {}
+        used = 0
+        for _, rank, position, sentence in candidates:
+            tokens = count_tokens(sentence)
+            if used + tokens > self.budget:
+                continue
+            used += tokens
+            kept.setdefault(rank, []).append(position)
+
+        results = []
+        for rank, doc in enumerate(docs):
+            if rank not in kept:
+                self._dropped += 1
+                continue
+            content = ""
+            previous = None
+            for position in sorted(kept[rank]):
+                if content and position != previous + 1:
+                    content += ELLIPSIS
+                elif content:
+                    content += " "
+                content += chunks[rank][position]
+                previous = position
+            metadata = {k: doc.metadata[k] for k in self.metadata_fields if doc.metadata.get(k)}
+            result = {"rank": len(results) + 1, "content": content}
+            if metadata:
+                result["metadata"] = metadata
+            results.append(result)
+
+        self._calls += 1
+        raw = count_tokens(json.dumps(unpacked, default=str))
+        packed = count_tokens(json.dumps(results, default=str))
+        self._raw_tokens += raw
+        self._packed_tokens += packed
+        logger.debug(f"Packed {len(docs)} results into {len(results)}: {raw} -> {packed} tokens")
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Tool results packed, and their tokens before and after packing."""
+        return {
+            "results": self._calls,
+            "raw_tokens": self._raw_tokens,
+            "packed_tokens": self._packed_tokens,
+            "saved": round(1 - self._packed_tokens / self._raw_tokens, 3) if self._raw_tokens else 0.0,
+            "duplicate_sentences": self._duplicates,
+            "dropped_chunks": self._dropped,
+        }
@@ -0,0 +1,137 @@
+#
+# Copyright (c) 2024–2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Local Stand-in for the Daily REST API.
+
+Implements the endpoints server.py and the bots call (create, get and delete a
+room, mint a meeting token) in memory, with an optional per-request delay to
+mimic the real API's round-trip time. Rooms and tokens are not joinable; this
+is for exercising the room pool, /connect and /start without a Daily account.
+
+With ``--transport-url`` the rooms' URLs point at a websocket server instead
+(``ws://host:port/<room name>``), and bots started with ``LOADTEST=1`` join
+them with a websocket transport in place of Daily's. ``loadtest.py`` runs that
+server as the caller.
+
+Usage:
+    python daily_rest_stub.py [--port 9100] [--latency-ms 150] [--transport-url ws://127.0.0.1:9300]
+    DAILY_API_URL=http://localhost:9100/v1 DAILY_API_KEY=stub python server.py
+
+GET /v1/_stats returns request counts per endpoint.
+"""
+
+import argparse
+import asyncio
+import secrets
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
+
+from aiohttp import web
+
+
+class DailyRESTStub:
+    """In-memory rooms and tokens behind Daily's REST routes.
+
+    Args:
+        latency_ms: Delay added to every request
+        domain: Domain used to build room URLs
+        transport_url: Websocket server rooms point at instead of ``domain``
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        domain: str = "stub.daily.co",
+        transport_url: Optional[str] = None,
+    ):
+        self.latency = latency_ms / 1000
+        self.domain = domain
+        self.transport_url = transport_url.rstrip("/") if transport_url else None
+        self.rooms = {}
+        self.requests = Counter()
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_post("/v1/rooms", self.create_room)
+        app.router.add_get("/v1/rooms/{name}", self.get_room)
+        app.router.add_delete("/v1/rooms/{name}", self.delete_room)
+        app.router.add_post("/v1/meeting-tokens", self.create_token)
+        app.router.add_get("/v1/_stats", self.stats)
+        return app
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        self.requests[f"{request.method} {request.match_info.route.resource.canonical}"] += 1
+        if request.path != "/v1/_stats":
+            if not request.headers.get("Authorization", "").startswith("Bearer "):
+                return web.json_response({"error": "authentication-error"}, status=401)
+            if self.latency:
+                await asyncio.sleep(self.latency)
+        return await handler(request)
+
+    async def create_room(self, request: web.Request) -> web.Response:
+        body = await request.json() if request.can_read_body else {}
+        name = body.get("name") or secrets.token_hex(6)
+        if name in self.rooms:
+            return web.json_response({"error": "invalid-request-error"}, status=400)
+        room = {
+            "id": secrets.token_hex(16),
+            "name": name,
+            "api_created": True,
+            "privacy": body.get("privacy", "public"),
+            "url": f"{self.transport_url or 'https://' + self.domain}/{name}",
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "config": body.get("properties", {}),
+        }
+        self.rooms[name] = room
+        return web.json_response(room)
+
+    async def get_room(self, request: web.Request) -> web.Response:
+        room = self.rooms.get(request.match_info["name"])
+        if not room:
+            return web.json_response({"error": "not-found"}, status=404)
+        return web.json_response(room)
+
+    async def delete_room(self, request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        if self.rooms.pop(name, None) is None:
+            return web.json_response({"error": "not-found"}, status=404)
+        return web.json_response({"deleted": True, "name": name})
+
+    async def create_token(self, request: web.Request) -> web.Response:
+        properties = (await request.json()).get("properties", {})
+        room = self.rooms.get(properties.get("room_name"))
+        if not room:
+            return web.json_response({"error": "invalid-request-error"}, status=400)
+        exp = room["config"].get("exp")
+        if exp and properties.get("exp", 0) > exp + 1:
+            # Daily accepts this too; flag it so pool bugs show up in the stub's log
+            print(f"Token for {room['name']} outlives its room by {properties['exp'] - exp:.0f}s")
+        return web.json_response({"token": f"stub.{room['name']}.{secrets.token_urlsafe(16)}"})
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {"rooms": len(self.rooms), "requests": dict(self.requests), "time": time.time()}
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Daily REST API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay added to every request")
+    parser.add_argument("--transport-url", help="Websocket server rooms point at (see loadtest.py)")
+    args = parser.parse_args()
+
+    stub = DailyRESTStub(latency_ms=args.latency_ms, transport_url=args.transport_url)
+    print(f"Daily REST stub on http://{args.host}:{args.port}/v1")
+    web.run_app(stub.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Query embedding cache for the knowledge base retriever.
+
+Customers ask about the same few issues over and over, so most query
+embeddings can be served locally instead of paying an OpenAI round-trip.
+CachedEmbeddings wraps any LangChain Embeddings object with:
+- Keys built from normalized query text (case, whitespace, model numbers)
+- A bounded in-memory LRU tier with a TTL
+- An optional SQLite tier that survives restarts and is shared by worker processes;
+  expired rows are deleted and the row count is capped (on open, then at most every
+  PRUNE_INTERVAL seconds on write), in small batches on a separate connection so
+  lookups never wait behind a prune
+- Hit-rate counters
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from product_models import canonicalize_models
+
+# Seconds between prunes of the SQLite tier, and rows deleted per prune transaction
+PRUNE_INTERVAL = 5 * 60
+PRUNE_BATCH = 500
+
+
+def normalize_query(text: str) -> str:
+    """
+    Canonical form of a query used for embedding and as the cache key:
+    model numbers rewritten to their WD- names, whitespace collapsed and
+    trailing punctuation dropped.
+    """
+    text = canonicalize_models(text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip("?!.,;: ")
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that caches query vectors.
+
+    Document embeddings (ingestion) are passed straight through.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model: str,
+        max_entries: int = 1024,
+        ttl: float = 24 * 60 * 60,
+        disk_path: Optional[str] = None,
+        disk_max_entries: int = 10000,
+    ):
+        self.embeddings = embeddings
+        self.model = model
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_max_entries = disk_max_entries
+        self._memory: "OrderedDict[str, tuple[float, List[float]]]" = OrderedDict()
+        # Guards the memory tier and counters; SQLite is never touched under it
+        self._lock = threading.Lock()
+        # Guards the lookup/write connection; the prune has its own connection
+        self._db_lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "disk_pruned": 0}
+        self._pruned_at = 0.0
+        self._db = self._open_disk_tier(disk_path) if disk_path else None
+        self._prune_db = sqlite3.connect(disk_path, check_same_thread=False, timeout=5) if disk_path else None
+        if self._db is not None:
+            self._disk_prune()
+
+    def _open_disk_tier(self, path: str) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        # WAL lets several bot processes read while one writes
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings ("
+            " model TEXT NOT NULL, key TEXT NOT NULL, vector BLOB NOT NULL,"
+            " created REAL NOT NULL, PRIMARY KEY (model, key))"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS query_embeddings_created ON query_embeddings (created)")
+        db.commit()
+        return db
+
+    def _disk_prune(self):
+        """
+        Deletes expired rows, then the oldest rows beyond disk_max_entries.
+        The file is shared by every bot process, so the cap covers all models.
+        Runs on its own connection, PRUNE_BATCH rows per transaction, so lookups
+        (WAL readers) never wait and writers wait at most one batch. A prune
+        already running in this process is not started again.
+        """
+        if not self._prune_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.time()
+            self._pruned_at = now
+            deleted = self._prune_batches(
+                "DELETE FROM query_embeddings WHERE rowid IN"
+                " (SELECT rowid FROM query_embeddings WHERE created < ? LIMIT ?)",
+                (now - self.ttl,),
+            )
+            deleted += self._prune_batches(
+                "DELETE FROM query_embeddings WHERE rowid IN"
+                " (SELECT rowid FROM query_embeddings ORDER BY created DESC LIMIT ? OFFSET ?)",
+                (),
+                offset=self.disk_max_entries,
+            )
+            with self._lock:
+                self._stats["disk_pruned"] += deleted
+        finally:
+            self._prune_lock.release()
+
+    def _prune_batches(self, sql: str, params: tuple, offset: Optional[int] = None) -> int:
+        deleted = 0
+        while True:
+            batch_params = params + (PRUNE_BATCH,) + ((offset,) if offset is not None else ())
+            count = self._prune_db.execute(sql, batch_params).rowcount
+            self._prune_db.commit()
+            deleted += count
+            if count < PRUNE_BATCH:
+                return deleted
+
+    def _memory_get(self, key: str) -> Optional[List[float]]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        created, vector = entry
+        if time.time() - created > self.ttl:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return vector
+
+    def _memory_put(self, key: str, vector: List[float], created: float):
+        self._memory[key] = (created, vector)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[tuple[float, List[float]]]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT vector, created FROM query_embeddings WHERE model = ? AND key = ?",
+                (self.model, key),
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return row[1], array("f", row[0]).tolist()
+
+    def _disk_put(self, key: str, vector: List[float], created: float):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO query_embeddings (model, key, vector, created) VALUES (?, ?, ?, ?)",
+                (self.model, key, array("f", vector).tobytes(), created),
+            )
+            self._db.commit()
+        if created - self._pruned_at > PRUNE_INTERVAL:
+            self._disk_prune()
+
+    def embed_query(self, text: str) -> List[float]:
+        normalized = normalize_query(text)
+        key = normalized.lower()
+
+        with self._lock:
+            vector = self._memory_get(key)
+            if vector is not None:
+                self._stats["memory_hits"] += 1
+                return vector
+        if self._db is not None:
+            entry = self._disk_get(key)
+            if entry is not None:
+                with self._lock:
+                    self._stats["disk_hits"] += 1
+                    self._memory_put(key, entry[1], entry[0])
+                return entry[1]
+        with self._lock:
+            self._stats["misses"] += 1
+
+        # Embed outside the lock so concurrent misses don't serialize on the network
+        vector = self.embeddings.embed_query(normalized)
+        created = time.time()
+        with self._lock:
+            self._memory_put(key, vector, created)
+        if self._db is not None:
+            self._disk_put(key, vector, created)
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns hit/miss counters and the overall hit rate.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (lookups - stats["misses"]) / lookups if lookups else 0.0
+        return stats
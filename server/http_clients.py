@@ -0,0 +1,226 @@
+#
+# Copyright (c) 2024–2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Shared Keep-Alive HTTP Clients.
+
+Every session used to open its own upstream connections: pipecat's
+``OpenAILLMService`` creates an httpx pool per instance, ``OpenAIEmbeddings``
+another (synchronous) one, and each session its own ``aiohttp.ClientSession``
+for Daily REST and Cartesia. Each first request then paid DNS, TCP and TLS on
+the turn's critical path. This module keeps one set of clients per process,
+shared by every session a worker hosts:
+- ``openai_client()``: an ``AsyncOpenAI`` on ``async_http_client()``, used by the
+  LLM service and the context compactor
+- ``sync_http_client()``: the embeddings client (retrieval runs on threads)
+- ``http_session()``: aiohttp for Daily REST and Cartesia HTTP renders
+
+The httpx clients speak HTTP/2 when ``h2`` is installed (one multiplexed
+connection per host), and all pools are bounded and keep connections alive for
+``HTTP_KEEPALIVE_SECS``. ``warm_up()`` opens the connections ahead of time;
+the bot runs it alongside ``configure()``. New connections, TLS handshakes and
+requests per client are available from ``stats()``.
+
+Cartesia's streaming TTS is a websocket per session, opened when the pipeline
+starts, so it is not pooled here.
+"""
+
+import asyncio
+import importlib.util
+import os
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+
+import aiohttp
+import httpx
+import openai
+from loguru import logger
+
+HTTP2 = os.getenv("HTTP2", "true").lower() in ("1", "true", "yes")
+# Connections per pool, and how many idle ones are kept alive for how long
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_SECS = float(os.getenv("HTTP_KEEPALIVE_SECS", "120"))
+# Seconds warm_up() may take; it never fails the caller
+HTTP_WARMUP_TIMEOUT = float(os.getenv("HTTP_WARMUP_TIMEOUT", "3"))
+
+
+@dataclass
+class ConnectionStats:
+    """Requests and the connections they needed, for one client."""
+
+    requests: int = 0
+    connections: int = 0
+    tls_handshakes: int = 0
+    http2_requests: int = 0
+
+    def trace(self, name: str, info: dict):
+        """httpcore ``trace`` extension callback."""
+        if name == "connection.connect_tcp.complete":
+            self.connections += 1
+        elif name == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+        elif name == "http2.send_request_headers.started":
+            self.http2_requests += 1
+
+    async def atrace(self, name: str, info: dict):
+        self.trace(name, info)
+
+    def summary(self) -> dict:
+        return {
+            "requests": self.requests,
+            "connections": self.connections,
+            "tls_handshakes": self.tls_handshakes,
+            "http2_requests": self.http2_requests,
+            # Share of requests that went out on an existing connection
+            "reuse": round(1 - self.connections / self.requests, 3) if self.requests else 0.0,
+        }
+
+
+_stats: Dict[str, ConnectionStats] = {
+    "openai": ConnectionStats(),
+    "openai_sync": ConnectionStats(),
+    "aiohttp": ConnectionStats(),
+}
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def http2_available() -> bool:
+    return HTTP2 and importlib.util.find_spec("h2") is not None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_SECS,
+    )
+
+
+@lru_cache(maxsize=1)
+def async_http_client() -> httpx.AsyncClient:
+    """The process-wide async httpx pool for OpenAI."""
+    stats = _stats["openai"]
+
+    async def on_request(request: httpx.Request):
+        stats.requests += 1
+        request.extensions["trace"] = stats.atrace
+
+    return openai.DefaultAsyncHttpxClient(
+        http2=http2_available(), limits=_limits(), event_hooks={"request": [on_request]}
+    )
+
+
+@lru_cache(maxsize=1)
+def sync_http_client() -> httpx.Client:
+    """The process-wide sync httpx pool for OpenAI embeddings (shared by threads)."""
+    stats = _stats["openai_sync"]
+
+    def on_request(request: httpx.Request):
+        stats.requests += 1
+        request.extensions["trace"] = stats.trace
+
+    return openai.DefaultHttpxClient(
+        http2=http2_available(), limits=_limits(), event_hooks={"request": [on_request]}
+    )
+
+
+@lru_cache(maxsize=1)
+def openai_client() -> openai.AsyncOpenAI:
+    """The process-wide AsyncOpenAI client (OPENAI_BASE_URL is honored)."""
+    return openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=async_http_client())
+
+
+def _trace_config() -> aiohttp.TraceConfig:
+    stats = _stats["aiohttp"]
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params):
+        stats.requests += 1
+
+    async def on_connection_create_end(session, context, params):
+        stats.connections += 1
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    return trace_config
+
+
+def http_session() -> aiohttp.ClientSession:
+    """The process-wide aiohttp session (created on first use, in the running loop)."""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=HTTP_MAX_CONNECTIONS,
+                keepalive_timeout=HTTP_KEEPALIVE_SECS,
+                ttl_dns_cache=300,
+            ),
+            trace_configs=[_trace_config()],
+        )
+    return _session
+
+
+def _openai_models_url() -> str:
+    return str(openai_client().base_url.join("models"))
+
+
+def _openai_headers() -> dict:
+    return {"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY', '')}"}
+
+
+async def warm_up(urls: Iterable[str] = ()) -> Dict[str, float]:
+    """Opens the OpenAI connections (async and sync pools) and one to each of urls.
+
+    Any response counts: the point is the DNS lookup and handshakes. Returns
+    seconds per target; targets that failed or timed out are left out.
+    """
+    timings: Dict[str, float] = {}
+
+    async def timed(name: str, coroutine):
+        started_at = time.monotonic()
+        try:
+            await coroutine
+            timings[name] = round(time.monotonic() - started_at, 3)
+        except Exception as e:
+            logger.debug(f"Warm-up of {name} failed: {e}")
+
+    async def head(url: str):
+        async with http_session().head(url, allow_redirects=False) as response:
+            await response.read()
+
+    targets = [
+        timed("openai", async_http_client().get(_openai_models_url(), headers=_openai_headers())),
+        timed(
+            "openai_sync",
+            asyncio.to_thread(sync_http_client().get, _openai_models_url(), headers=_openai_headers()),
+        ),
+        *(timed(url, head(url)) for url in urls),
+    ]
+    try:
+        await asyncio.wait_for(asyncio.gather(*targets), HTTP_WARMUP_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.debug(f"HTTP warm-up exceeded {HTTP_WARMUP_TIMEOUT}s")
+    logger.debug(f"HTTP warm-up: {timings}")
+    return timings
+
+
+def stats() -> Dict[str, dict]:
+    """Connection reuse per client that has been used."""
+    return {name: s.summary() for name, s in _stats.items() if s.requests}
+
+
+async def close():
+    """Closes every shared client (at process exit)."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+    if async_http_client.cache_info().currsize:
+        await async_http_client().aclose()
+    if sync_http_client.cache_info().currsize:
+        sync_http_client().close()
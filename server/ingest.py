@@ -0,0 +1,641 @@
+"""
+Incremental knowledge base ingestion.
+
+Builds and updates the Qdrant collection the bot searches (waterdrop_faq_qdrant)
+from source documents:
+- PDF manuals (pymupdf), one section per page
+- Markdown, one section per heading
+- CSV FAQs with question/answer columns (and optionally a product model column)
+
+Sections are split into overlapping chunks of about CHUNK_TOKENS tokens. Every
+chunk gets a content hash (embedding model + text + metadata) that doubles as
+its Qdrant point id, so only chunks the collection does not already hold are
+embedded. Embeddings are requested in batches of EMBED_BATCH_SIZE inputs,
+EMBED_CONCURRENCY at a time, backing off on rate limits and server errors
+(honoring Retry-After). Points that no longer belong to any source are deleted.
+
+A manifest next to the collection records each source file's hash and point
+ids. Files whose hash is unchanged are skipped without being parsed, and the
+manifest is rewritten after every flush, so an interrupted run picks up where
+it stopped.
+
+Points the manifest does not know about (a collection built by another tool,
+such as the shipped waterdrop_faq_qdrant, whose LangChain points have random
+ids) would never be matched or pruned, so ingesting into a non-empty collection
+without a manifest is refused. --rebuild adopts such a collection: the sources
+are ingested alongside the existing points, and once every file is in the
+manifest all points it does not list are deleted (an interrupted rebuild is
+finished by the next run).
+
+Qdrant's local mode locks its directory: stop the bots (or ingest into a copy)
+first. Re-export the NumPy index afterwards if KB_BACKEND=numpy:
+    python ingest.py --source ./docs --qdrant ./waterdrop_faq_qdrant --collection waterdrop_faq
+    python ingest.py --source ./docs --dry-run
+    python ingest.py --source ./docs --rebuild      # first run against a collection built elsewhere
+    python vector_index.py export --qdrant ./waterdrop_faq_qdrant --out ./waterdrop_faq_index
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import random
+import re
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+from dotenv import load_dotenv
+from loguru import logger
+
+from context_packing import count_tokens, split_sentences
+from product_models import extract_models
+from vector_index import ROUTING_FIELD, routing_models
+
+load_dotenv(override=True)
+
+# Must match the query embedding model in tool.py
+EMBEDDING_MODEL = "text-embedding-3-large"
+EMBEDDING_DIMS = 3072
+
+# Chunk size and the tokens of trailing sentences repeated at the start of the next chunk
+CHUNK_TOKENS = int(os.getenv("INGEST_CHUNK_TOKENS", "400"))
+CHUNK_OVERLAP = int(os.getenv("INGEST_CHUNK_OVERLAP", "60"))
+# Inputs per embeddings request, requests in flight, and a cap on tokens per request
+EMBED_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+EMBED_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "4"))
+EMBED_BATCH_TOKENS = 250_000
+# Attempts per embeddings request before the run fails
+EMBED_ATTEMPTS = 8
+
+SOURCE_EXTENSIONS = {".pdf": "pdf", ".md": "markdown", ".markdown": "markdown", ".csv": "csv"}
+
+MANIFEST_FILE = "ingest_manifest.json"
+MANIFEST_VERSION = 1
+
+# Point ids are UUIDs derived from the chunk hash
+POINT_NAMESPACE = uuid.UUID("5b8f7c2e-3a61-4d1e-9f0a-7c54e2b1d9a3")
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+
+
+@dataclass
+class Section:
+    """A piece of a source document, before chunking."""
+
+    text: str
+    metadata: Dict[str, object]
+
+
+@dataclass
+class Chunk:
+    """One point of the collection."""
+
+    point_id: str
+    text: str
+    metadata: Dict[str, object]
+
+
+@dataclass
+class IngestStats:
+    files: int = 0
+    unchanged_files: int = 0
+    removed_files: int = 0
+    chunks: int = 0
+    reused_chunks: int = 0
+    embedded_chunks: int = 0
+    deleted_points: int = 0
+    embedding_requests: int = 0
+    embedding_tokens: int = 0
+    retries: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(text: str, metadata: dict) -> str:
+    """Point id for a chunk: the same text and metadata always map to the same point."""
+    key = json.dumps([EMBEDDING_MODEL, " ".join(text.split()), metadata], sort_keys=True, default=str)
+    return str(uuid.uuid5(POINT_NAMESPACE, hashlib.sha256(key.encode()).hexdigest()))
+
+
+def iter_source_files(roots: List[str]) -> Iterator[str]:
+    """Source files under the given files or directories, in a stable order."""
+    for root in roots:
+        if os.path.isfile(root):
+            yield root
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if os.path.splitext(name)[1].lower() in SOURCE_EXTENSIONS:
+                    yield os.path.join(dirpath, name)
+
+
+def load_pdf(path: str) -> Iterator[Section]:
+    import fitz  # pymupdf
+
+    with fitz.open(path) as doc:
+        title = (doc.metadata or {}).get("title") or os.path.splitext(os.path.basename(path))[0]
+        for page in doc:
+            text = page.get_text("text")
+            if text.strip():
+                # Hyphenated line breaks, then the remaining layout line breaks
+                text = re.sub(r"-\n(?=[a-z])", "", text)
+                text = re.sub(r"(?<![.!?:])\n(?!\n)", " ", text)
+                yield Section(text, {"title": title, "page": page.number + 1})
+
+
+def load_markdown(path: str) -> Iterator[Section]:
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    title = os.path.splitext(os.path.basename(path))[0]
+    headings: List[str] = []
+    body: List[str] = []
+
+    def section() -> Optional[Section]:
+        text = "\n".join(body).strip()
+        if not text:
+            return None
+        return Section(text, {"title": " > ".join(headings) or title})
+
+    for line in lines:
+        match = _HEADING_RE.match(line)
+        if not match:
+            body.append(line)
+            continue
+        current = section()
+        if current:
+            yield current
+        body = []
+        level = len(match.group(1))
+        headings = headings[: level - 1] + [match.group(2)]
+    current = section()
+    if current:
+        yield current
+
+
+def load_csv(path: str) -> Iterator[Section]:
+    """FAQ rows: question and answer columns (q/a accepted), plus an optional model column."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        columns = {name.strip().lower(): name for name in reader.fieldnames or []}
+        question = columns.get("question") or columns.get("q")
+        answer = columns.get("answer") or columns.get("a")
+        model = columns.get("product_model") or columns.get("model")
+        if not question or not answer:
+            raise ValueError(f"{path}: expected question and answer columns, got {reader.fieldnames}")
+        for row in reader:
+            q, a = (row.get(question) or "").strip(), (row.get(answer) or "").strip()
+            if not q or not a:
+                continue
+            metadata: Dict[str, object] = {"title": q}
+            if model and row.get(model):
+                metadata["models"] = extract_models(row[model])
+            yield Section(f"Q: {q}\nA: {a}", metadata)
+
+
+LOADERS = {"pdf": load_pdf, "markdown": load_markdown, "csv": load_csv}
+
+
+def chunk_text(text: str, max_tokens: int = CHUNK_TOKENS, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Splits text into chunks of whole sentences, each starting with the previous one's tail."""
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    fresh = False
+    for sentence in split_sentences(text):
+        tokens = count_tokens(sentence)
+        if fresh and size + tokens > max_tokens:
+            chunks.append(" ".join(current))
+            carry: List[str] = []
+            carried = 0
+            for previous in reversed(current):
+                previous_tokens = count_tokens(previous)
+                if carried + previous_tokens > overlap:
+                    break
+                carry.insert(0, previous)
+                carried += previous_tokens
+            current, size = carry, carried
+        current.append(sentence)
+        size += tokens
+        fresh = True
+    if fresh:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def file_chunks(path: str, source: str, model_field: str) -> List[Chunk]:
+    """Chunks of one source file, with the metadata the bot's retrieval expects."""
+    loader = LOADERS[SOURCE_EXTENSIONS[os.path.splitext(path)[1].lower()]]
+    chunks = []
+    for section in loader(path):
+        models = section.metadata.pop("models", None)
+        for text in chunk_text(section.text):
+            metadata = {"source": source, **section.metadata}
+            # Model routing: the model column, else models the chunk or its title names
+            chunk_models = models or extract_models(f"{section.metadata.get('title', '')} {text}")
+            if chunk_models:
+                metadata[model_field] = chunk_models
+            chunks.append(Chunk(chunk_id(text, metadata), text, metadata))
+    return chunks
+
+
+def load_manifest(path: str) -> dict:
+    if os.path.exists(path):
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+        logger.warning(f"Ignoring manifest {path} from another version")
+    return {"version": MANIFEST_VERSION, "files": {}}
+
+
+def save_manifest(manifest: dict, path: str):
+    """Writes the manifest atomically, so an interrupted run never leaves a partial one."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".manifest-", dir=directory)
+    with os.fdopen(fd, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _under(source: str, root: str) -> bool:
+    root = os.path.relpath(root)
+    return root == "." or source == root or source.startswith(root + os.sep)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for name in ("retry-after-ms", "retry-after"):
+        value = headers.get(name)
+        try:
+            if value is not None:
+                return float(value) / (1000 if name.endswith("ms") else 1)
+        except ValueError:
+            pass
+    return None
+
+
+class Embedder:
+    """Embeds chunk texts in concurrent batches, backing off when rate limited.
+
+    Args:
+        stats: Run statistics that requests, tokens and retries are added to
+        batch_size: Inputs per embeddings request
+        concurrency: Requests in flight
+        client: AsyncOpenAI client (one is created if not given)
+    """
+
+    def __init__(self, stats: IngestStats, batch_size: int = EMBED_BATCH_SIZE,
+                 concurrency: int = EMBED_CONCURRENCY, client=None):
+        from openai import AsyncOpenAI
+
+        # Retries are handled here, where they can be counted and spread out
+        self._client = client or AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+        self._stats = stats
+        self._batch_size = batch_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def batches(self, texts: List[str]) -> List[List[int]]:
+        """Indexes of texts per request, within both the input and token limits."""
+        batches: List[List[int]] = []
+        tokens = 0
+        for i, text in enumerate(texts):
+            text_tokens = count_tokens(text)
+            if not batches or len(batches[-1]) >= self._batch_size or tokens + text_tokens > EMBED_BATCH_TOKENS:
+                batches.append([])
+                tokens = 0
+            batches[-1].append(i)
+            tokens += text_tokens
+        return batches
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+
+        async def run(batch: List[int]):
+            result = await self._request([texts[i] for i in batch])
+            for i, vector in zip(batch, result):
+                vectors[i] = vector
+
+        await asyncio.gather(*(run(batch) for batch in self.batches(texts)))
+        return vectors
+
+    async def _request(self, inputs: List[str]) -> List[List[float]]:
+        import openai
+
+        async with self._semaphore:
+            for attempt in range(EMBED_ATTEMPTS):
+                try:
+                    response = await self._client.embeddings.create(model=EMBEDDING_MODEL, input=inputs)
+                    self._stats.embedding_requests += 1
+                    if response.usage:
+                        self._stats.embedding_tokens += response.usage.total_tokens
+                    return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+                except (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError) as e:
+                    if attempt == EMBED_ATTEMPTS - 1:
+                        raise
+                    # Exponential backoff with full jitter, unless the server says how long
+                    delay = _retry_after(e) or random.uniform(0, min(60.0, 2.0 ** attempt))
+                    self._stats.retries += 1
+                    logger.warning(f"Embeddings request failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+
+
+class Ingester:
+    """Brings a Qdrant collection in line with a set of source files.
+
+    Args:
+        qdrant_path: Qdrant local-mode directory
+        collection: Collection name
+        manifest_path: Manifest file (defaults to MANIFEST_FILE inside qdrant_path)
+        model_field: Metadata field for the chunk's product models
+        batch_size: Inputs per embeddings request
+        concurrency: Embeddings requests in flight; batch_size * concurrency chunks are
+            buffered before they are embedded, upserted and recorded
+        dry_run: Only report what would change
+    """
+
+    def __init__(self, qdrant_path: str, collection: str, manifest_path: Optional[str] = None,
+                 model_field: str = "product_model", batch_size: int = EMBED_BATCH_SIZE,
+                 concurrency: int = EMBED_CONCURRENCY, dry_run: bool = False):
+        self.collection = collection
+        self.manifest_path = manifest_path or os.path.join(qdrant_path, MANIFEST_FILE)
+        self.manifest = load_manifest(self.manifest_path)
+        self.model_field = model_field
+        self.flush_chunks = batch_size * concurrency
+        self.dry_run = dry_run
+        self.stats = IngestStats()
+        self._batch_size = batch_size
+        self._concurrency = concurrency
+        self._embedder: Optional[Embedder] = None
+        self._qdrant_path = qdrant_path
+        self._client = None
+        # Files parsed but not yet flushed: source -> (file hash, chunks)
+        self._pending: Dict[str, tuple] = {}
+        self._pending_chunks = 0
+
+    def _point_count(self) -> int:
+        return self._qdrant().count(self.collection, exact=True).count
+
+    def _foreign_ids(self) -> list:
+        """Ids (as Qdrant returns them) of points no manifest file lists."""
+        live = self._live_ids(set())
+        foreign, offset = [], None
+        while True:
+            points, offset = self._qdrant().scroll(
+                self.collection, limit=1024, offset=offset, with_payload=False, with_vectors=False
+            )
+            foreign.extend(point.id for point in points if str(point.id) not in live)
+            if offset is None:
+                return foreign
+
+    def _qdrant(self):
+        if self._client is None:
+            from qdrant_client import QdrantClient
+            from qdrant_client import models
+
+            os.makedirs(self._qdrant_path, exist_ok=True)
+            self._client = QdrantClient(path=self._qdrant_path)
+            if not self._client.collection_exists(self.collection):
+                self._client.create_collection(
+                    self.collection,
+                    vectors_config=models.VectorParams(size=EMBEDDING_DIMS, distance=models.Distance.COSINE),
+                )
+        return self._client
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def _existing(self, ids: List[str]) -> set:
+        """Ids already in the collection (e.g. upserted by an interrupted run)."""
+        found = set()
+        for start in range(0, len(ids), 1024):
+            points = self._qdrant().retrieve(
+                self.collection, ids[start:start + 1024], with_payload=False, with_vectors=False
+            )
+            found.update(str(point.id) for point in points)
+        return found
+
+    def _live_ids(self, exclude: set) -> set:
+        """Point ids recorded for every manifest file except the given ones."""
+        return {
+            point_id
+            for source, entry in self.manifest["files"].items()
+            if source not in exclude
+            for point_id in entry["points"]
+        }
+
+    async def run(self, roots: List[str], prune: bool = True, rebuild: bool = False) -> IngestStats:
+        started_at = time.monotonic()
+        if self.manifest.get("rebuilding"):
+            logger.info("Finishing an interrupted --rebuild")
+            rebuild = True
+        elif rebuild or not self.manifest["files"]:
+            existing = self._point_count()
+            if existing and not rebuild:
+                raise RuntimeError(
+                    f"{self.collection} already holds {existing} points that {self.manifest_path} does not "
+                    "list; they would be kept next to re-embedded duplicates. Run with --rebuild to replace them"
+                )
+        if rebuild and not self.dry_run:
+            self.manifest["rebuilding"] = True
+            self._save()
+        seen = set()
+        for path in iter_source_files(roots):
+            source = os.path.relpath(path)
+            seen.add(source)
+            self.stats.files += 1
+            digest = file_hash(path)
+            entry = self.manifest["files"].get(source)
+            if entry and entry["sha256"] == digest:
+                self.stats.unchanged_files += 1
+                continue
+            try:
+                chunks = file_chunks(path, source, self.model_field)
+            except Exception as e:
+                logger.error(f"Skipping {source}: {e}")
+                self.stats.errors.append(f"{source}: {e}")
+                continue
+            self._pending[source] = (digest, chunks)
+            self._pending_chunks += len(chunks)
+            if self._pending_chunks >= self.flush_chunks:
+                await self.flush()
+        await self.flush()
+
+        if prune:
+            # Only files under the roots given this run count as removed
+            removed = [s for s in self.manifest["files"] if s not in seen and any(_under(s, r) for r in roots)]
+            if removed:
+                stale = {p for s in removed for p in self.manifest["files"][s]["points"]}
+                self._delete(stale - self._live_ids(set(removed)))
+                for source in removed:
+                    logger.info(f"Removed {source}")
+                    if not self.dry_run:
+                        del self.manifest["files"][source]
+                self.stats.removed_files += len(removed)
+                self._save()
+
+        if rebuild and not self.stats.errors:
+            foreign = self._foreign_ids()
+            logger.info(f"Rebuild: deleting {len(foreign)} points no source produced")
+            self.stats.deleted_points += len(foreign)
+            if foreign and not self.dry_run:
+                from qdrant_client import models
+
+                for start in range(0, len(foreign), 1024):
+                    self._qdrant().delete(
+                        self.collection, points_selector=models.PointIdsList(points=foreign[start:start + 1024])
+                    )
+            if not self.dry_run:
+                self.manifest.pop("rebuilding", None)
+                self._save()
+
+        logger.info(f"Ingested in {time.monotonic() - started_at:.1f}s: {self.summary()}")
+        return self.stats
+
+    async def flush(self):
+        """Embeds and upserts the buffered files' new chunks, then records the files."""
+        if not self._pending:
+            return
+        pending, self._pending, self._pending_chunks = self._pending, {}, 0
+
+        chunks: Dict[str, Chunk] = {}
+        for _, file_chunk_list in pending.values():
+            for chunk in file_chunk_list:
+                chunks.setdefault(chunk.point_id, chunk)
+        self.stats.chunks += sum(len(c) for _, c in pending.values())
+
+        known = self._live_ids(set())
+        unknown = [point_id for point_id in chunks if point_id not in known]
+        if unknown and not self.dry_run:
+            known |= self._existing(unknown)
+        new = [chunks[point_id] for point_id in chunks if point_id not in known]
+        self.stats.reused_chunks += len(chunks) - len(new)
+
+        if new and not self.dry_run:
+            from qdrant_client import models
+
+            if self._embedder is None:
+                self._embedder = Embedder(self.stats, self._batch_size, self._concurrency)
+            vectors = await self._embedder.embed([chunk.text for chunk in new])
+            self._qdrant().upsert(
+                self.collection,
+                points=[
+                    models.PointStruct(
+                        id=chunk.point_id,
+                        vector=vector,
+                        payload={
+                            "page_content": chunk.text,
+                            "metadata": chunk.metadata,
+                            # Canonical models the Qdrant backend filters on
+                            ROUTING_FIELD: routing_models(
+                                {"page_content": chunk.text, "metadata": chunk.metadata}, self.model_field
+                            ),
+                        },
+                    )
+                    for chunk, vector in zip(new, vectors)
+                ],
+            )
+        self.stats.embedded_chunks += len(new)
+
+        # Points the changed files had before and no longer have
+        stale = set()
+        for source in pending:
+            if source in self.manifest["files"]:
+                stale |= set(self.manifest["files"][source]["points"])
+        stale -= set(chunks)
+        stale -= self._live_ids(set(pending))
+        self._delete(stale)
+
+        for source, (digest, file_chunk_list) in pending.items():
+            logger.info(f"{source}: {len(file_chunk_list)} chunks")
+            if not self.dry_run:
+                self.manifest["files"][source] = {
+                    "sha256": digest,
+                    "points": [chunk.point_id for chunk in file_chunk_list],
+                    "ingested": time.time(),
+                }
+        self._save()
+
+    def _delete(self, point_ids: set):
+        if not point_ids:
+            return
+        self.stats.deleted_points += len(point_ids)
+        if self.dry_run:
+            return
+        from qdrant_client import models
+
+        self._qdrant().delete(self.collection, points_selector=models.PointIdsList(points=sorted(point_ids)))
+
+    def _save(self):
+        if self.dry_run:
+            return
+        self.manifest.update(collection=self.collection, embedding_model=EMBEDDING_MODEL)
+        save_manifest(self.manifest, self.manifest_path)
+
+    def summary(self) -> dict:
+        stats = self.stats
+        return {
+            "files": stats.files,
+            "unchanged_files": stats.unchanged_files,
+            "removed_files": stats.removed_files,
+            "chunks": stats.chunks,
+            "reused_chunks": stats.reused_chunks,
+            "embedded_chunks": stats.embedded_chunks,
+            "deleted_points": stats.deleted_points,
+            "embedding_requests": stats.embedding_requests,
+            "embedding_tokens": stats.embedding_tokens,
+            "retries": stats.retries,
+            "errors": len(stats.errors),
+        }
+
+
+async def main_async(args) -> int:
+    ingester = Ingester(
+        args.qdrant,
+        args.collection,
+        manifest_path=args.manifest,
+        model_field=os.getenv("KB_MODEL_FIELD", "product_model"),
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        dry_run=args.dry_run,
+    )
+    try:
+        stats = await ingester.run(args.source, prune=not args.no_prune, rebuild=args.rebuild)
+    except RuntimeError as e:
+        logger.error(str(e))
+        return 1
+    finally:
+        ingester.close()
+    print(json.dumps(ingester.summary(), indent=2))
+    return 1 if stats.errors else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally ingest documents into the knowledge base")
+    parser.add_argument("--source", nargs="+", required=True, help="Source files or directories (PDF, Markdown, CSV)")
+    parser.add_argument("--qdrant", default="./waterdrop_faq_qdrant", help="Qdrant local-mode directory")
+    parser.add_argument("--collection", default="waterdrop_faq", help="Collection name")
+    parser.add_argument("--manifest", help=f"Manifest file (default: <qdrant>/{MANIFEST_FILE})")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="Inputs per embeddings request")
+    parser.add_argument("--concurrency", type=int, default=EMBED_CONCURRENCY, help="Embeddings requests in flight")
+    parser.add_argument("--no-prune", action="store_true", help="Keep points of source files that were removed")
+    parser.add_argument(
+        "--rebuild", action="store_true", help="Replace points the manifest does not list (collections built elsewhere)"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without embedding or writing")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main_async(args)))
@@ -0,0 +1,157 @@
+#
+# Copyright (c) 2024–2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Per-turn Voice Latency Observer.
+
+The pipeline runs with ``enable_metrics``, so the LLM and TTS services already
+emit time-to-first-byte metrics frames, but nothing collected them. This
+observer watches the session's frames and times each stage of a turn (see
+``turn_metrics.STAGES``). A turn starts when the user stops speaking. The
+spans go into histograms that the bot reports to server.py and logs when the
+session ends, along with the prompt tokens the LLM was sent per turn.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from pipecat.frames.frames import (
+    BotStartedSpeakingFrame,
+    FunctionCallInProgressFrame,
+    FunctionCallResultFrame,
+    MetricsFrame,
+    TranscriptionFrame,
+    UserStartedSpeakingFrame,
+    UserStoppedSpeakingFrame,
+)
+from pipecat.metrics.metrics import LLMUsageMetricsData, TTFBMetricsData
+from pipecat.observers.base_observer import BaseObserver, FramePushed
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+from turn_metrics import StageHistograms
+
+# Frame ids remembered to count each frame once as it hops between processors
+SEEN_FRAMES = 256
+
+
+class TurnLatencyObserver(BaseObserver):
+    """Times the stages of each turn into histograms.
+
+    Args:
+        llm: The session's LLM service (its TTFB metrics are ``llm_ttft``)
+        tts: The session's TTS service (its TTFB metrics are ``tts_ttfb``)
+    """
+
+    def __init__(self, llm: FrameProcessor, tts: FrameProcessor):
+        super().__init__()
+        self._llm_name = llm.name
+        self._tts_name = tts.name
+        self._seen: "OrderedDict[int, None]" = OrderedDict()
+        # Whole session, for the log line at the end
+        self.session = StageHistograms()
+        # Since the last report to the server
+        self._unreported = StageHistograms()
+        self._user_stopped_at: Optional[float] = None
+        # A final transcription arrived while the user was still speaking
+        self._transcribed_early = False
+        self._done: set[str] = set()
+        self._tool_started: Dict[str, float] = {}
+        self._turns = 0
+        # Prompt tokens of every LLM call in the current turn, and of each finished turn
+        self._turn_tokens = 0
+        self._prompt_tokens: List[int] = []
+
+    async def on_push_frame(self, data: FramePushed):
+        if data.direction != FrameDirection.DOWNSTREAM:
+            return
+        frame = data.frame
+        if frame.id in self._seen:
+            return
+        self._seen[frame.id] = None
+        if len(self._seen) > SEEN_FRAMES:
+            self._seen.popitem(last=False)
+
+        now = time.monotonic()
+        if isinstance(frame, UserStartedSpeakingFrame):
+            # Nothing until the next stop belongs to the previous turn
+            self._user_stopped_at = None
+            self._transcribed_early = False
+        elif isinstance(frame, UserStoppedSpeakingFrame):
+            self._user_stopped_at = now
+            self._done.clear()
+            self._turns += 1
+            self._end_turn_tokens()
+            if self._transcribed_early:
+                # The transcription was ready before VAD's stop: no wait on STT
+                self._transcribed_early = False
+                self._once_per_turn("stt", 0.0)
+        elif isinstance(frame, TranscriptionFrame):
+            if self._user_stopped_at is None:
+                self._transcribed_early = True
+            else:
+                self._since_user_stopped("stt", now)
+        elif isinstance(frame, BotStartedSpeakingFrame):
+            self._since_user_stopped("first_audio", now)
+        elif isinstance(frame, FunctionCallInProgressFrame):
+            self._tool_started[frame.tool_call_id] = now
+        elif isinstance(frame, FunctionCallResultFrame):
+            started = self._tool_started.pop(frame.tool_call_id, None)
+            if started is not None:
+                self._observe("tool", now - started)
+        elif isinstance(frame, MetricsFrame):
+            for metric in frame.data:
+                if isinstance(metric, LLMUsageMetricsData) and metric.processor == self._llm_name:
+                    self._turn_tokens += metric.value.prompt_tokens
+                if not isinstance(metric, TTFBMetricsData) or not metric.value:
+                    continue
+                if metric.processor == self._llm_name:
+                    self._once_per_turn("llm_ttft", metric.value)
+                elif metric.processor == self._tts_name:
+                    self._once_per_turn("tts_ttfb", metric.value)
+
+    def _since_user_stopped(self, stage: str, now: float):
+        if self._user_stopped_at is not None:
+            self._once_per_turn(stage, now - self._user_stopped_at)
+
+    def _once_per_turn(self, stage: str, seconds: float):
+        # Only the first occurrence gates the turn (e.g. the first TTS sentence);
+        # outside a turn (the greeting) there is nothing to attribute it to
+        if self._user_stopped_at is None or stage in self._done:
+            return
+        self._done.add(stage)
+        self._observe(stage, seconds)
+
+    def _end_turn_tokens(self):
+        if self._turn_tokens:
+            self._prompt_tokens.append(self._turn_tokens)
+            self._turn_tokens = 0
+
+    def _observe(self, stage: str, seconds: float):
+        self.session.observe(stage, seconds)
+        self._unreported.observe(stage, seconds)
+        logger.trace(f"Turn {self._turns} {stage}: {seconds * 1000:.0f}ms")
+
+    def take_report(self) -> Optional[Dict]:
+        """Histograms recorded since the last report, or None if there is nothing new."""
+        if self._unreported.empty():
+            return None
+        report = self._unreported.to_dict()
+        self._unreported = StageHistograms()
+        return report
+
+    def stats(self) -> Dict:
+        """Turns seen, p50/p95/p99 per stage and prompt tokens per turn for the whole session."""
+        self._end_turn_tokens()
+        tokens = self._prompt_tokens
+        prompt_tokens = {
+            "avg": round(sum(tokens) / len(tokens)),
+            "max": max(tokens),
+            "last": tokens[-1],
+            "total": sum(tokens),
+        } if tokens else {}
+        return {"turns": self._turns, **self.session.summary(), "prompt_tokens": prompt_tokens}
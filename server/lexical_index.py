@@ -0,0 +1,225 @@
+"""
+Hybrid lexical + dense retrieval for the knowledge base.
+
+Model numbers, part numbers and error codes ("G3P600", "TDS", "E3") match
+poorly with dense embeddings, and every dense query costs a remote embedding
+call. This module builds an in-process BM25 inverted index over the same
+chunks as the vector store and provides HybridRetriever, which:
+- Answers queries that are mostly identifiers from BM25 alone (no embedding call)
+- Otherwise fuses dense and BM25 rankings with reciprocal rank fusion (RRF)
+- Keeps latency and hit-quality counters per path
+"""
+import math
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict, PrivateAttr
+
+from product_models import canonicalize_models
+from vector_index import partition_rows
+
+_WORD_RE = re.compile(r"[A-Za-z0-9]+(?:-[A-Za-z0-9]+)*")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "at", "be", "but", "by", "can", "do", "does", "for", "from",
+    "how", "i", "if", "in", "is", "it", "my", "of", "on", "or", "so", "that", "the", "this",
+    "to", "was", "what", "when", "where", "which", "why", "with", "you", "your",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased terms with model numbers canonicalized. Hyphenated identifiers
+    are indexed whole and by part, so "WD-G3P600-W" also matches "g3p600".
+    """
+    terms = []
+    for match in _WORD_RE.finditer(canonicalize_models(text or "")):
+        word = match.group(0).lower()
+        if word in STOPWORDS:
+            continue
+        terms.append(word)
+        if "-" in word:
+            # Skip the shared "wd" prefix and one-letter colour codes, which match everything
+            terms.extend(
+                part for part in word.split("-")
+                if len(part) > 1 and part != "wd" and part not in STOPWORDS
+            )
+    return terms
+
+
+def identifier_ratio(text: str) -> float:
+    """
+    Fraction of a query's content words that look like identifiers: anything
+    containing a digit (models, part numbers, error codes) or an all-caps
+    acronym such as "TDS".
+    """
+    words = [w for w in _WORD_RE.findall(text or "") if w.lower() not in STOPWORDS]
+    if not words:
+        return 0.0
+    identifiers = [w for w in words if any(c.isdigit() for c in w) or (len(w) > 1 and w.isupper())]
+    return len(identifiers) / len(words)
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index of chunk payloads.
+    """
+
+    def __init__(self, payloads: List[dict], model_field: str = "product_model", k1: float = 1.5, b: float = 0.75):
+        self.payloads = payloads
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = []
+        for row, payload in enumerate(payloads):
+            terms = tokenize(payload.get("page_content", ""))
+            lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self.postings.setdefault(term, []).append((row, tf))
+        self.lengths = lengths
+        self.avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+        count = len(payloads)
+        self.idf = {
+            term: math.log(1 + (count - len(rows) + 0.5) / (len(rows) + 0.5))
+            for term, rows in self.postings.items()
+        }
+        self.partitions, self.shared_rows = partition_rows(payloads, model_field)
+
+    def rows_for_models(self, models: Optional[List[str]]) -> Optional[set]:
+        known = [self.partitions[m] for m in (models or []) if m in self.partitions]
+        if not known:
+            return None
+        return set(np.concatenate(known + [self.shared_rows]).tolist())
+
+    def search(self, query: str, k: int = 4, models: Optional[List[str]] = None) -> List[Tuple[int, float]]:
+        """
+        Returns (row, BM25 score) pairs for the k best-matching rows.
+        """
+        allowed = self.rows_for_models(models)
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for row, tf in self.postings[term]:
+                if allowed is not None and row not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[row] / (self.avg_length or 1.0))
+                scores[row] = scores.get(row, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def document(self, row: int) -> Document:
+        payload = self.payloads[row]
+        metadata = dict(payload.get("metadata") or {})
+        metadata.setdefault("_id", payload["id"])
+        return Document(page_content=payload.get("page_content", ""), metadata=metadata)
+
+
+def _doc_key(doc: Document) -> str:
+    return str(doc.metadata.get("_id") or hash(doc.page_content))
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int, rrf_k: int = 60) -> List[Document]:
+    """
+    Merges ranked lists: each document scores sum(1 / (rrf_k + rank)) over the lists it appears in.
+    """
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = _doc_key(doc)
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return [docs[key] for key in ordered[:k]]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Dense + BM25 retriever with a lexical-only fast path for identifier queries.
+
+    Search kwargs: models restricts both halves to those product models; the
+    dense half gets dense_model_kwargs(models) (a payload filter or partition).
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vector_store: Any
+    lexical: BM25Index
+    dense_model_kwargs: Any = None
+    k: int = 4
+    fetch_k: int = 12
+    rrf_k: int = 60
+    identifier_threshold: float = 0.5
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _stats: Dict[str, Dict[str, float]] = PrivateAttr(default_factory=dict)
+
+    def _record(self, path: str, ms: float, results: int, **quality: float):
+        with self._lock:
+            stats = self._stats.setdefault(path, {"queries": 0, "empty": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats["queries"] += 1
+            stats["empty"] += 0 if results else 1
+            stats["total_ms"] += ms
+            stats["max_ms"] = max(stats["max_ms"], ms)
+            for name, value in quality.items():
+                stats[name] = stats.get(name, 0.0) + value
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Per-path query counts, empty results, average/max latency and hit quality:
+        mean top BM25 score for the lexical path, and mean dense/lexical top-k
+        overlap for the hybrid path.
+        """
+        with self._lock:
+            report = {}
+            for path, stats in self._stats.items():
+                queries = stats["queries"] or 1
+                report[path] = {
+                    "queries": stats["queries"],
+                    "empty": stats["empty"],
+                    "avg_ms": round(stats["total_ms"] / queries, 2),
+                    "max_ms": round(stats["max_ms"], 2),
+                }
+                for name in ("top_score", "overlap"):
+                    if name in stats:
+                        report[path][f"avg_{name}"] = round(stats[name] / queries, 3)
+            return report
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+        models: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        start = time.perf_counter()
+
+        # Identifier-heavy queries: BM25 alone, skipping the embedding round-trip
+        if identifier_ratio(query) >= self.identifier_threshold:
+            hits = self.lexical.search(query, self.k, models)
+            if hits:
+                docs = [self.lexical.document(row) for row, _ in hits]
+                self._record("lexical", (time.perf_counter() - start) * 1000, len(docs), top_score=hits[0][1])
+                return docs
+
+        dense_kwargs = dict(kwargs)
+        if models and self.dense_model_kwargs:
+            dense_kwargs.update(self.dense_model_kwargs(models))
+        dense = self.vector_store.similarity_search(query, k=self.fetch_k, **dense_kwargs)
+        lexical = [self.lexical.document(row) for row, _ in self.lexical.search(query, self.fetch_k, models)]
+        docs = reciprocal_rank_fusion([dense, lexical], self.k, self.rrf_k)
+
+        dense_top = {_doc_key(d) for d in dense[: self.k]}
+        lexical_top = {_doc_key(d) for d in lexical[: self.k]}
+        overlap = len(dense_top & lexical_top) / self.k if self.k else 0.0
+        self._record("hybrid", (time.perf_counter() - start) * 1000, len(docs), overlap=overlap)
+        return docs
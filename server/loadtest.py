@@ -0,0 +1,703 @@
+#
+# Copyright (c) 2024–2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Voice Session Load Test.
+
+Starts sessions on server.py at a target rate through /connect or /start and
+plays the caller in each one, against local stand-ins for Daily
+(``daily_rest_stub.py``), OpenAI and Cartesia (``service_stubs.py``), so a
+capacity number costs no API money and no real rooms.
+
+Rooms from the Daily stub point at this script's websocket server, and bots
+join them with a websocket transport instead of Daily's. Each caller:
+- streams 16kHz audio in real time: silence, and for each utterance a
+  synthetic voiced signal the bot's Silero VAD detects as speech
+- sends the utterance's transcription once it has finished speaking, the way
+  Daily's transcription would
+- times the bot's first audio after the end of each utterance, and waits for
+  the bot to finish speaking before the next one
+
+The report covers sessions per host, startup latency (API response, bot join,
+greeting), per-turn latency by concurrent session count, and RSS/CPU per
+session. The capacity figure is the highest concurrency at which every turn
+percentile stayed within ``--slo-ms`` and no session failed; with a fixed
+build, host and stub latencies it is repeatable, so runs can be compared.
+
+Usage:
+    # Everything in one go: stubs in-process, server.py as a child process
+    python loadtest.py --spawn-server --rate 0.5 --sessions 40 --turns 3 [--json report.json]
+
+    # Against a server started separately
+    python daily_rest_stub.py --transport-url ws://127.0.0.1:9300 &
+    python service_stubs.py &
+    LOADTEST=1 DAILY_API_URL=http://127.0.0.1:9100/v1 DAILY_API_KEY=stub \\
+    OPENAI_BASE_URL=http://127.0.0.1:9200/v1 OPENAI_API_KEY=stub CARTESIA_API_KEY=stub \\
+    CARTESIA_WS_URL=ws://127.0.0.1:9200/tts/websocket \\
+    CARTESIA_HTTP_URL=http://127.0.0.1:9200/tts/bytes python server.py &
+    python loadtest.py --server http://127.0.0.1:17860 --caller-port 9300
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+import numpy as np
+from aiohttp import WSMsgType, web
+from dotenv import dotenv_values, find_dotenv
+
+import pipecat.frames.protobufs.frames_pb2 as frame_protos
+from pipecat.frames.frames import (
+    OutputAudioRawFrame,
+    TranscriptionFrame,
+    TransportMessageUrgentFrame,
+)
+from pipecat.serializers.protobuf import ProtobufFrameSerializer
+
+from daily_rest_stub import DailyRESTStub
+from service_stubs import ServiceStubs
+from session_supervisor import HostMonitor
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Settings a .env file must not set for --spawn-server: server.py and the bots
+# load .env over their environment, so these would send traffic to real
+# services or fill the shared caches with stub vectors and audio
+UNSAFE_DOTENV_KEYS = (
+    "DAILY_API_URL",
+    "DAILY_SAMPLE_ROOM_URL",
+    "OPENAI_BASE_URL",
+    "CARTESIA_WS_URL",
+    "CARTESIA_HTTP_URL",
+    "EMBEDDING_CACHE_PATH",
+    "TTS_CACHE_DIR",
+)
+
+# Caller audio: 16kHz mono sent in 20ms frames, like a WebRTC client
+CALLER_SAMPLE_RATE = 16000
+CALLER_CHUNK_SECONDS = 0.02
+
+# What the callers say, in turn. Lines naming a model make the LLM stub call
+# the knowledge base tool, as the real model would
+CALLER_SCRIPT = [
+    "My WD-G3P800-B is leaking from the bottom, what should I do?",
+    "How often do I need to replace the filter?",
+    "The WD-A1 shows a red light after I changed the filter.",
+    "Is that covered by the warranty?",
+    "The water from my WD-RO-G3 tastes strange.",
+]
+
+# Seconds of caller speech per character of the utterance
+SPEECH_SECONDS_PER_CHAR = 0.05
+
+# Formants (Hz) of a few vowels, cycled through one syllable at a time
+VOWELS = ((730, 1090, 2440), (270, 2290, 3010), (300, 870, 2240), (530, 1840, 2480), (570, 840, 2410))
+SYLLABLE_SECONDS = 0.2
+
+
+def caller_speech(seconds: float, seed: int = 0) -> bytes:
+    """Synthetic voiced speech (16-bit mono PCM) that Silero VAD classifies as speech.
+
+    A glottal-like harmonic series with a wandering pitch, shaped by vowel
+    formants that change every syllable, with a syllable-rate envelope.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * CALLER_SAMPLE_RATE)) / CALLER_SAMPLE_RATE
+    f0 = 120 + 20 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / CALLER_SAMPLE_RATE
+    syllable = int(SYLLABLE_SECONDS * CALLER_SAMPLE_RATE)
+    wave = np.zeros_like(t)
+    for start in range(0, len(t), syllable):
+        span = slice(start, start + syllable)
+        formants = VOWELS[rng.integers(len(VOWELS))]
+        for k in range(1, 30):
+            frequency = k * f0[span]
+            gain = 0.02 + sum(
+                np.exp(-(((frequency - f) / bandwidth) ** 2))
+                for f, bandwidth in zip(formants, (90, 110, 150))
+            )
+            wave[span] += gain * np.sin(k * phase[span]) / k
+    wave *= np.sin(np.pi * (np.arange(len(t)) % syllable) / syllable) ** 0.5
+    wave *= 0.3 / max(np.abs(wave).max(), 1e-9)
+    return (wave * 32767).astype(np.int16).tobytes()
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    return round(float(np.percentile(values, q)), 1) if values else None
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@dataclass
+class SessionResult:
+    """What one simulated caller saw."""
+
+    index: int
+    status: str = "pending"  # ok, refused, error or timeout
+    error: Optional[str] = None
+    http_status: Optional[int] = None
+    concurrency: int = 0  # sessions in a call when this one failed or joined
+    api_ms: Optional[float] = None  # /connect (or /start) response
+    join_ms: Optional[float] = None  # bot connected to the caller
+    greeting_ms: Optional[float] = None  # first greeting audio
+    turn_ms: List[float] = field(default_factory=list)  # end of utterance -> first bot audio
+    turn_concurrency: List[int] = field(default_factory=list)
+    call_seconds: float = 0.0
+
+
+class Call:
+    """The caller's side of one bot websocket connection."""
+
+    def __init__(self, ws: web.WebSocketResponse):
+        self.ws = ws
+        self.closed = asyncio.Event()
+        self.last_audio_at = 0.0
+        self._audio = asyncio.Event()
+        # Serialized frames waiting to be sent, one per audio tick
+        self._speech: List[bytes] = []
+        self._spoken: Optional[asyncio.Future] = None
+
+    async def receive(self):
+        async for msg in self.ws:
+            if msg.type != WSMsgType.BINARY:
+                continue
+            if frame_protos.Frame.FromString(msg.data).WhichOneof("frame") == "audio":
+                self.last_audio_at = time.monotonic()
+                self._audio.set()
+        self.closed.set()
+
+    def next_chunk(self, silence: bytes) -> bytes:
+        if not self._speech:
+            return silence
+        chunk = self._speech.pop(0)
+        if not self._speech and self._spoken and not self._spoken.done():
+            self._spoken.set_result(time.monotonic())
+        return chunk
+
+    async def speak(self, chunks: List[bytes]) -> float:
+        """Queue an utterance's audio frames; returns when the last one was sent."""
+        self._spoken = asyncio.get_running_loop().create_future()
+        self._speech = list(chunks)
+        return await self._spoken
+
+    async def first_audio(self, timeout: float) -> float:
+        """Wait for bot audio that arrives after this call; returns its time."""
+        self._audio.clear()
+        audio = asyncio.create_task(self._audio.wait())
+        closed = asyncio.create_task(self.closed.wait())
+        await asyncio.wait([audio, closed], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        audio.cancel()
+        closed.cancel()
+        if not self._audio.is_set():
+            raise ConnectionError("bot hung up") if self.closed.is_set() else asyncio.TimeoutError()
+        return self.last_audio_at
+
+    async def bot_finished(self, quiet: float, timeout: float):
+        """Wait until the bot has been silent for ``quiet`` seconds."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() - self.last_audio_at < quiet:
+            if self.closed.is_set():
+                raise ConnectionError("bot hung up")
+            if time.monotonic() > deadline:
+                raise asyncio.TimeoutError("bot kept talking")
+            await asyncio.sleep(0.05)
+
+    async def send(self, data: bytes):
+        if not self.ws.closed:
+            await self.ws.send_bytes(data)
+
+
+class CallerServer:
+    """Websocket server the stub's rooms point at; one connection per bot.
+
+    A single ticker sends every call's next 20ms of caller audio, so the
+    harness itself stays cheap at hundreds of sessions.
+    """
+
+    def __init__(self, serializer: ProtobufFrameSerializer, silence: bytes):
+        self._serializer = serializer
+        self._silence = silence
+        self._calls: Dict[str, asyncio.Future] = {}
+        self._ticker: Optional[asyncio.Task] = None
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/{room}", self.handle)
+        return app
+
+    def expect(self, room: str) -> asyncio.Future:
+        """Future resolved with the Call once the bot joins ``room``."""
+        return self._calls.setdefault(room, asyncio.get_running_loop().create_future())
+
+    def hang_up(self, room: str):
+        self._calls.pop(room, None)
+
+    async def handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        call = Call(ws)
+        joined = self.expect(request.match_info["room"])
+        if joined.done():
+            # A second bot in the same room
+            await ws.close()
+            return ws
+        joined.set_result(call)
+        await call.receive()
+        return ws
+
+    def start(self):
+        self._ticker = asyncio.create_task(self._tick())
+
+    async def stop(self):
+        if self._ticker:
+            self._ticker.cancel()
+
+    async def _tick(self):
+        next_at = time.monotonic()
+        while True:
+            next_at += CALLER_CHUNK_SECONDS
+            calls = [f.result() for f in self._calls.values() if f.done() and not f.cancelled()]
+            for call in calls:
+                if not call.closed.is_set():
+                    try:
+                        await call.send(call.next_chunk(self._silence))
+                    except ConnectionError:
+                        pass
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+
+
+class LoadTest:
+    """Starts sessions at a target rate and plays the caller in each.
+
+    Args:
+        server_url: server.py base URL
+        caller: Websocket server the bots join
+        args: Parsed command line options
+    """
+
+    def __init__(self, server_url: str, caller: CallerServer, args: argparse.Namespace):
+        self.server_url = server_url.rstrip("/")
+        self.caller = caller
+        self.args = args
+        self.serializer = ProtobufFrameSerializer()
+        self.results: List[SessionResult] = []
+        self.in_call = 0
+        self.peak_in_call = 0
+        self.samples: List[Dict[str, Any]] = []
+        self._utterances: Dict[int, List[bytes]] = {}
+
+    async def prepare(self):
+        """Pre-serialize the caller's utterances, so sessions only send bytes."""
+        for i, line in enumerate(CALLER_SCRIPT):
+            audio = caller_speech(len(line) * SPEECH_SECONDS_PER_CHAR, seed=i)
+            self._utterances[i] = await self._audio_chunks(audio)
+
+    async def _audio_chunks(self, audio: bytes) -> List[bytes]:
+        size = int(CALLER_SAMPLE_RATE * CALLER_CHUNK_SECONDS) * 2
+        return [
+            await self.serializer.serialize(
+                OutputAudioRawFrame(
+                    audio=audio[i:i + size], sample_rate=CALLER_SAMPLE_RATE, num_channels=1
+                )
+            )
+            for i in range(0, len(audio), size)
+        ]
+
+    async def run(self, http: aiohttp.ClientSession):
+        sampler = asyncio.create_task(self._sample(http))
+        tasks = []
+        started = time.monotonic()
+        for i in range(self.args.sessions):
+            # Fixed schedule, so a slow server doesn't lower the offered rate
+            await asyncio.sleep(max(0.0, started + i / self.args.rate - time.monotonic()))
+            result = SessionResult(index=i)
+            self.results.append(result)
+            tasks.append(asyncio.create_task(self._session(http, result)))
+        await asyncio.gather(*tasks)
+        sampler.cancel()
+
+    async def _session(self, http: aiohttp.ClientSession, result: SessionResult):
+        args = self.args
+        requested_at = time.monotonic()
+        room = None
+        try:
+            body = {"audio_only": True} if args.audio_only else {}
+            if args.endpoint == "start":
+                body["language"] = "en"
+            async with http.post(f"{self.server_url}/{args.endpoint}", json=body) as response:
+                result.http_status = response.status
+                data = await response.json(content_type=None)
+            result.api_ms = (time.monotonic() - requested_at) * 1000
+            if response.status != 200:
+                result.status = "refused" if response.status in (400, 503) else "error"
+                result.error = str(data)[:200]
+                result.concurrency = self.in_call
+                return
+
+            room = data["room_url"].rstrip("/").rsplit("/", 1)[-1]
+            call: Call = await asyncio.wait_for(self.caller.expect(room), args.join_timeout)
+            result.join_ms = (time.monotonic() - requested_at) * 1000
+            self.in_call += 1
+            self.peak_in_call = max(self.peak_in_call, self.in_call)
+            result.concurrency = self.in_call
+            joined_at = time.monotonic()
+            try:
+                await self._converse(call, result, requested_at)
+                result.status = "ok"
+            finally:
+                self.in_call -= 1
+                result.call_seconds = time.monotonic() - joined_at
+                await call.ws.close()
+        except asyncio.TimeoutError as e:
+            result.status = "timeout"
+            result.error = str(e) or "no response from the bot"
+            result.concurrency = result.concurrency or self.in_call
+        except Exception as e:
+            result.status = "error"
+            result.error = repr(e)[:200]
+            result.concurrency = result.concurrency or self.in_call
+        finally:
+            if room:
+                self.caller.hang_up(room)
+
+    async def _converse(self, call: Call, result: SessionResult, requested_at: float):
+        args = self.args
+        await call.send(await self.serializer.serialize(TransportMessageUrgentFrame(message={
+            "label": "rtvi-ai",
+            "type": "client-ready",
+            "id": uuid.uuid4().hex,
+            "data": {"version": "0.3.0", "about": {"library": "loadtest"}},
+        })))
+        greeted_at = await call.first_audio(args.turn_timeout)
+        result.greeting_ms = (greeted_at - requested_at) * 1000
+        await call.bot_finished(args.quiet_secs, args.turn_timeout)
+
+        for turn in range(args.turns):
+            await asyncio.sleep(args.think_secs)
+            line = (result.index + turn) % len(CALLER_SCRIPT)
+            concurrency = self.in_call
+            spoken_at = await call.speak(self._utterances[line])
+            await asyncio.sleep(args.stt_delay_ms / 1000)
+            await call.send(await self.serializer.serialize(TranscriptionFrame(
+                text=CALLER_SCRIPT[line],
+                user_id="caller",
+                timestamp=datetime.now(timezone.utc).isoformat(),
+            )))
+            answered_at = await call.first_audio(args.turn_timeout)
+            result.turn_ms.append((answered_at - spoken_at) * 1000)
+            result.turn_concurrency.append(concurrency)
+            await call.bot_finished(args.quiet_secs, args.turn_timeout)
+
+    async def _sample(self, http: aiohttp.ClientSession):
+        """Every second: the server's session stats, and the process tree's RSS and CPU."""
+        while True:
+            sample: Dict[str, Any] = {"t": time.monotonic(), "in_call": self.in_call}
+            try:
+                async with http.get(f"{self.server_url}/sessions") as response:
+                    sample.update(await response.json())
+            except (aiohttp.ClientError, ValueError):
+                pass
+            if self.args.server_pid:
+                sample.update(process_tree_usage(self.args.server_pid))
+            self.samples.append(sample)
+            await asyncio.sleep(1.0)
+
+
+def process_tree_usage(pid: int) -> Dict[str, float]:
+    """RSS of a process and its descendants, and their CPU seconds so far.
+
+    CPU includes children the tree has already reaped (cutime/cstime), so
+    bots that finished during the run still count.
+    """
+    parents: Dict[int, int] = {}
+    cpu: Dict[int, float] = {}
+    ticks = os.sysconf("SC_CLK_TCK")
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        parents[int(entry)] = int(fields[1])
+        # utime, stime, cutime, cstime
+        cpu[int(entry)] = sum(int(v) for v in fields[11:15]) / ticks
+    tree = {pid}
+    for _ in range(4):
+        tree |= {p for p, parent in parents.items() if parent in tree}
+    return {
+        "tree_rss_mb": round(sum(HostMonitor.rss_mb(p) or 0 for p in tree), 1),
+        "tree_cpu_seconds": round(sum(cpu.get(p, 0.0) for p in tree), 2),
+        "tree_processes": len(tree),
+    }
+
+
+def summarize(test: LoadTest, slo_ms: float, elapsed: float) -> Dict[str, Any]:
+    results = test.results
+    statuses: Dict[str, int] = {}
+    for r in results:
+        statuses[r.status] = statuses.get(r.status, 0) + 1
+    ok = [r for r in results if r.status == "ok"]
+
+    def stats(values: List[float]) -> Dict[str, Any]:
+        return {"n": len(values), "p50": percentile(values, 50), "p95": percentile(values, 95),
+                "p99": percentile(values, 99)}
+
+    by_level: Dict[int, List[float]] = {}
+    for r in results:
+        for ms, level in zip(r.turn_ms, r.turn_concurrency):
+            by_level.setdefault(level, []).append(ms)
+    first_failure = min((r.concurrency for r in results if r.status not in ("ok", "pending")),
+                        default=None)
+    # Highest concurrency with every level up to it within the SLO and no failures
+    capacity = 0
+    for level in sorted(by_level):
+        if percentile(by_level[level], 95) > slo_ms:
+            break
+        if first_failure is not None and level >= first_failure:
+            break
+        capacity = level
+
+    samples = test.samples
+    rss = [s["session_rss_mb"] for s in samples if s.get("session_rss_mb")]
+    host_cpu = [s["host_cpu"] for s in samples if s.get("host_cpu") is not None]
+    tree = [s for s in samples if "tree_cpu_seconds" in s]
+    per_session: Dict[str, Any] = {
+        "rss_mb": round(sum(rss) / len(rss), 1) if rss else None,
+        "host_cpu_peak": max(host_cpu) if host_cpu else None,
+    }
+    session_seconds = sum(r.call_seconds for r in results)
+    if len(tree) >= 2 and session_seconds:
+        per_session["cpu_cores"] = round(
+            (tree[-1]["tree_cpu_seconds"] - tree[0]["tree_cpu_seconds"]) / session_seconds, 3
+        )
+        loaded = [s["tree_rss_mb"] / s["in_call"] for s in tree if s["in_call"]]
+        per_session["tree_rss_mb"] = round(sum(loaded) / len(loaded), 1) if loaded else None
+
+    return {
+        "sessions": {"requested": len(results), **statuses, "peak_in_call": test.peak_in_call},
+        "elapsed_seconds": round(elapsed, 1),
+        "startup_ms": {
+            "api": stats([r.api_ms for r in results if r.api_ms is not None]),
+            "join": stats([r.join_ms for r in results if r.join_ms is not None]),
+            "greeting": stats([r.greeting_ms for r in results if r.greeting_ms is not None]),
+        },
+        "turn_ms": stats([ms for r in ok for ms in r.turn_ms]),
+        "turn_ms_by_concurrency": {level: stats(by_level[level]) for level in sorted(by_level)},
+        "capacity": {"sessions": capacity, "slo_p95_ms": slo_ms},
+        "per_session": per_session,
+        "errors": sorted({r.error for r in results if r.error})[:10],
+    }
+
+
+def server_stage_quantiles(metrics_text: str) -> Dict[str, Dict[str, float]]:
+    """Per-stage quantiles from server.py's /metrics (reported by the bots)."""
+    stages: Dict[str, Dict[str, float]] = {}
+    for line in metrics_text.splitlines():
+        if not line.startswith("voice_turn_stage_latency_seconds_quantile{"):
+            continue
+        labels, value = line.split("} ")
+        parsed = dict(item.split("=") for item in labels.split("{", 1)[1].split(","))
+        stage, q = parsed["stage"].strip('"'), float(parsed["quantile"].strip('"'))
+        stages.setdefault(stage, {})[f"p{int(q * 100)}_ms"] = round(float(value) * 1000)
+    return stages
+
+
+def print_report(report: Dict[str, Any]):
+    def line(label: str, s: Dict[str, Any]):
+        print(f"  {label:<22} n={s['n']:<5} p50={s['p50']}  p95={s['p95']}  p99={s['p99']}")
+
+    sessions = report["sessions"]
+    print(f"\nSessions: {json.dumps(sessions)} in {report['elapsed_seconds']}s")
+    print("Startup latency (ms, from the request):")
+    for name, s in report["startup_ms"].items():
+        line(name, s)
+    print("Turn latency (ms, end of caller speech -> first bot audio):")
+    line("all", report["turn_ms"])
+    for level, s in report["turn_ms_by_concurrency"].items():
+        line(f"{level} in call", s)
+    for stage, q in report.get("server_stages", {}).items():
+        print(f"  bot {stage:<18} {q}")
+    print(f"Per session: {report['per_session']}")
+    capacity = report["capacity"]
+    print(f"\nCapacity: {capacity['sessions']} concurrent sessions per host "
+          f"(turn p95 <= {capacity['slo_p95_ms']:.0f}ms, no failures)")
+    for error in report["errors"]:
+        print(f"  error: {error}")
+
+
+async def wait_healthy(http: aiohttp.ClientSession, url: str, proc: subprocess.Popen, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server.py exited with {proc.returncode}")
+        try:
+            async with http.get(f"{url}/health") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError("server.py did not become healthy")
+
+
+async def start_site(app: web.Application, port: int) -> web.AppRunner:
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    serializer = ProtobufFrameSerializer()
+    silence = await serializer.serialize(OutputAudioRawFrame(
+        audio=bytes(int(CALLER_SAMPLE_RATE * CALLER_CHUNK_SECONDS) * 2),
+        sample_rate=CALLER_SAMPLE_RATE,
+        num_channels=1,
+    ))
+    caller = CallerServer(serializer, silence)
+    runners = [await start_site(caller.app(), args.caller_port)]
+    caller.start()
+
+    server = None
+    server_url = args.server
+    try:
+        if args.spawn_server:
+            dotenv_path = find_dotenv(os.path.join(SERVER_DIR, ".env"))
+            unsafe = [k for k, v in dotenv_values(dotenv_path).items()
+                      if k in UNSAFE_DOTENV_KEYS and v] if dotenv_path else []
+            if unsafe:
+                raise SystemExit(f"{dotenv_path} sets {', '.join(unsafe)}, which would override "
+                                 "the stubs; move it aside or start server.py yourself")
+            daily_port, services_port, server_port = free_port(), free_port(), free_port()
+            daily = DailyRESTStub(
+                latency_ms=args.daily_latency_ms,
+                transport_url=f"ws://127.0.0.1:{args.caller_port}",
+            )
+            services = ServiceStubs(
+                llm_ttft_ms=args.llm_ttft_ms,
+                tokens_per_sec=args.tokens_per_sec,
+                embedding_ms=args.embedding_ms,
+                tts_ttfb_ms=args.tts_ttfb_ms,
+            )
+            runners.append(await start_site(daily.app(), daily_port))
+            runners.append(await start_site(services.app(), services_port))
+            services_url = f"127.0.0.1:{services_port}"
+            env = {
+                **os.environ,
+                # Lets bots join the harness's ws:// rooms with a websocket transport
+                "LOADTEST": "1",
+                "DAILY_API_URL": f"http://127.0.0.1:{daily_port}/v1",
+                "DAILY_API_KEY": "stub",
+                "DAILY_SAMPLE_ROOM_URL": "",
+                "OPENAI_BASE_URL": f"http://{services_url}/v1",
+                "OPENAI_API_KEY": "stub",
+                "CARTESIA_API_KEY": "stub",
+                "CARTESIA_WS_URL": f"ws://{services_url}/tts/websocket",
+                "CARTESIA_HTTP_URL": f"http://{services_url}/tts/bytes",
+            }
+            server = subprocess.Popen(
+                [sys.executable, "server.py", "--host", "127.0.0.1", "--port", str(server_port),
+                 "--log-level", "warning"],
+                cwd=SERVER_DIR,
+                env=env,
+                stdout=None if args.verbose else subprocess.DEVNULL,
+                stderr=None if args.verbose else subprocess.DEVNULL,
+            )
+            args.server_pid = server.pid
+            server_url = f"http://127.0.0.1:{server_port}"
+
+        timeout = aiohttp.ClientTimeout(total=args.join_timeout)
+        async with aiohttp.ClientSession(timeout=timeout) as http:
+            if server:
+                await wait_healthy(http, server_url, server, args.startup_timeout)
+                # Let the bot and room pools fill before offering load
+                await asyncio.sleep(args.warmup_secs)
+
+            test = LoadTest(server_url, caller, args)
+            await test.prepare()
+            print(f"Starting {args.sessions} sessions at {args.rate}/s against {server_url}")
+            started = time.monotonic()
+            await test.run(http)
+            report = summarize(test, args.slo_ms, time.monotonic() - started)
+            try:
+                async with http.get(f"{server_url}/metrics") as response:
+                    report["server_stages"] = server_stage_quantiles(await response.text())
+            except aiohttp.ClientError:
+                pass
+        return report
+    finally:
+        await caller.stop()
+        if server and server.poll() is None:
+            # Lets the server's lifespan shut the bots and pools down
+            server.send_signal(signal.SIGINT)
+            try:
+                await asyncio.to_thread(server.wait, 30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        for runner in runners:
+            await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test server.py with simulated callers")
+    parser.add_argument("--server", default="http://127.0.0.1:17860", help="server.py URL")
+    parser.add_argument("--server-pid", type=int, help="server.py PID, for process tree RSS/CPU")
+    parser.add_argument("--spawn-server", action="store_true",
+                        help="Run the stubs in-process and server.py as a child process")
+    parser.add_argument("--caller-port", type=int, default=9300,
+                        help="Port of the websocket server bots join")
+    parser.add_argument("--endpoint", choices=["connect", "start"], default="connect")
+    parser.add_argument("--rate", type=float, default=0.5, help="New sessions per second")
+    parser.add_argument("--sessions", type=int, default=20, help="Sessions to start")
+    parser.add_argument("--turns", type=int, default=3, help="Caller utterances per session")
+    parser.add_argument("--think-secs", type=float, default=1.0, help="Pause before each utterance")
+    parser.add_argument("--quiet-secs", type=float, default=1.5,
+                        help="Bot silence that ends its reply")
+    parser.add_argument("--stt-delay-ms", type=float, default=150,
+                        help="Delay of the transcription after the end of speech")
+    parser.add_argument("--audio-only", action="store_true", help="Sessions without avatar video")
+    parser.add_argument("--slo-ms", type=float, default=2000, help="Turn latency p95 target")
+    parser.add_argument("--join-timeout", type=float, default=60, help="Seconds for a bot to join")
+    parser.add_argument("--turn-timeout", type=float, default=20, help="Seconds for a bot to answer")
+    parser.add_argument("--startup-timeout", type=float, default=120,
+                        help="Seconds for a spawned server.py to become healthy")
+    parser.add_argument("--warmup-secs", type=float, default=5,
+                        help="Wait after a spawned server.py is healthy")
+    parser.add_argument("--daily-latency-ms", type=float, default=150, help="Daily stub delay")
+    parser.add_argument("--llm-ttft-ms", type=float, default=350, help="LLM stub first token delay")
+    parser.add_argument("--tokens-per-sec", type=float, default=80, help="LLM stub token rate")
+    parser.add_argument("--embedding-ms", type=float, default=60, help="Embeddings stub delay")
+    parser.add_argument("--tts-ttfb-ms", type=float, default=150, help="TTS stub first audio delay")
+    parser.add_argument("--json", help="Also write the report to this file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show server.py's output")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    print_report(report)
+    if args.json:
+        report["options"] = {k: v for k, v in vars(args).items() if k != "json"}
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#
+# Copyright (c) 2024–2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Speculative Knowledge Base Retrieval.
+
+A knowledge base lookup normally starts only after the LLM has streamed a
+complete ``search_knowledge_base`` call, so retrieval latency stacks on top of
+the LLM round-trips. ``RetrievalPrefetcher`` sits between the transport input
+and the context aggregator, watches the user's transcriptions and, as soon as
+an utterance names a product model and describes a problem, starts the lookup
+in the background. When the tool call arrives, a matching prefetch is returned
+instead of searching again.
+
+Final transcriptions prefetch at once. Interim transcriptions only once the
+user pauses (no newer interim for ``debounce`` seconds), and a lookup for a
+newer version of an utterance replaces the earlier one if that is still in
+flight, so one utterance costs about one embedding request and one search on
+the shared retrieval threads. At most ``max_prefetches`` are kept.
+
+Each session has its own prefetcher and cache. Hit rate and time saved are
+available from ``stats()``.
+"""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from pipecat.frames.frames import Frame, InterimTranscriptionFrame, TranscriptionFrame
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+from lexical_index import tokenize
+from product_models import canonicalize_models, extract_models
+from turn_metrics import LatencyHistogram
+
+# Symptoms, error codes and support topics that signal a problem worth looking up.
+# Everyday words ("light", "change", "can't", "return") are only matched in a
+# symptom phrase, since every false positive costs an embedding request and a search
+PROBLEM_RE = re.compile(
+    r"\b(leak\w*|drip\w*|noisy|noise|beep\w*|flashing|blinking|"
+    r"(?:red|yellow|orange|indicator|filter|warning) lights?|error(?: code)?|[ef]-?\d{1,2}|"
+    r"(?:not|won'?t|doesn'?t|does not|will not) (?:work\w*|turn\w* on|dispens\w*|heat\w*|start\w*)|"
+    r"smell\w*|odou?r|(?:tastes?|tasting) (?:bad|weird|strange|funny|off|like)|cloudy|bubbl\w*|"
+    r"(?:low|water) pressure|(?:low|slow|weak) flow|flow is (?:\w+ )?(?:slow|weak|low)|no water|"
+    r"tds|ppm|filter life|filters? last|filter change|(?:chang|replac)\w* (?:the |my |a )?(?:\w+ )?filters?|"
+    r"replacement filters?|waste ?water|down the drain|reset|flush\w*|install\w*|"
+    r"descal\w*|warranty|refund)\b",
+    re.IGNORECASE,
+)
+
+
+def is_lookup_utterance(text: str) -> bool:
+    """Whether an utterance describes a problem the bot will likely search for."""
+    return bool(PROBLEM_RE.search(text or ""))
+
+
+def overlap(a: List[str], b: List[str]) -> float:
+    """Jaccard overlap between two term lists."""
+    a, b = set(a), set(b)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class Prefetch:
+    """One speculative lookup and its eventual result."""
+
+    query: str
+    models: List[str]
+    terms: List[str]
+    started_at: float
+    task: asyncio.Task
+    finished_at: Optional[float] = None
+    used: bool = False
+    # A tool call is waiting for it, so it must not be replaced
+    awaited: bool = False
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+@dataclass
+class PrefetchStats:
+    started: int = 0
+    replaced: int = 0
+    hits: int = 0
+    misses: int = 0
+    saved_secs: float = 0.0
+    # Time tool calls spent waiting on an in-flight prefetch, in fixed buckets
+    waits: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+
+class RetrievalPrefetcher(FrameProcessor):
+    """Prefetches retrieval results from user transcriptions.
+
+    Args:
+        search: Coroutine ``search(query, models)`` returning the documents the
+            tool would return for that query
+        min_overlap: Minimum term overlap between the tool's query and the
+            prefetched utterance for the prefetch to be reused
+        max_age: Seconds a prefetch stays usable
+        debounce: Seconds without a newer interim transcription before an
+            interim one is prefetched
+        max_prefetches: Prefetches kept for later tool calls
+    """
+
+    def __init__(
+        self,
+        search,
+        min_overlap: float = 0.2,
+        max_age: float = 60.0,
+        debounce: float = 0.3,
+        max_prefetches: int = 8,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self._search = search
+        self._min_overlap = min_overlap
+        self._max_age = max_age
+        self._debounce = debounce
+        self._max_prefetches = max_prefetches
+        self._prefetches: List[Prefetch] = []
+        self._debounce_task: Optional[asyncio.Task] = None
+        self._last_model: Optional[str] = None
+        self._stats = PrefetchStats()
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        """Watch transcriptions and start lookups; frames pass through unchanged.
+
+        Args:
+            frame: The incoming frame to process
+            direction: The direction of frame flow in the pipeline
+        """
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, (TranscriptionFrame, InterimTranscriptionFrame)):
+            if self._debounce_task:
+                self._debounce_task.cancel()
+                self._debounce_task = None
+            if isinstance(frame, TranscriptionFrame):
+                self._maybe_prefetch(frame.text)
+            else:
+                self._debounce_task = asyncio.create_task(self._prefetch_after_pause(frame.text))
+
+        await self.push_frame(frame, direction)
+
+    async def _prefetch_after_pause(self, text: str):
+        await asyncio.sleep(self._debounce)
+        self._debounce_task = None
+        self._maybe_prefetch(text)
+
+    def _maybe_prefetch(self, text: str):
+        models = extract_models(text)
+        if models:
+            self._last_model = models[-1]
+        elif self._last_model:
+            models = [self._last_model]
+
+        if not models or not is_lookup_utterance(text):
+            return
+
+        query = canonicalize_models(text)
+        terms = tokenize(query)
+        # Transcripts repeat; only start a new lookup when the utterance moved on
+        for prefetch in self._prefetches:
+            if prefetch.models == models and overlap(prefetch.terms, terms) >= 0.8:
+                return
+
+        # An earlier version of this utterance that is still being looked up is superseded
+        superseded = [p for p in self._prefetches if not p.task.done() and not p.awaited]
+        for prefetch in superseded:
+            prefetch.task.cancel()
+            self._prefetches.remove(prefetch)
+        self._stats.replaced += len(superseded)
+
+        started_at = time.monotonic()
+        task = asyncio.create_task(self._search(query, models))
+        prefetch = Prefetch(query=query, models=models, terms=terms, started_at=started_at, task=task)
+        task.add_done_callback(lambda t: self._on_prefetch_done(prefetch, t))
+        self._prefetches.append(prefetch)
+        self._expire()
+        self._stats.started += 1
+        logger.debug(f"Prefetching knowledge base results for: {query}")
+
+    def _on_prefetch_done(self, prefetch: Prefetch, task: asyncio.Task):
+        prefetch.finished_at = time.monotonic()
+        if not task.cancelled() and task.exception():
+            logger.warning(f"Prefetch failed for '{prefetch.query}': {task.exception()}")
+
+    def _expire(self):
+        now = time.monotonic()
+        self._prefetches = [p for p in self._prefetches if now - p.started_at <= self._max_age]
+        del self._prefetches[: -self._max_prefetches]
+
+    async def lookup(self, query: str, models: List[str], timeout: float) -> Optional[Any]:
+        """Returns prefetched documents matching a tool call, or None on a miss.
+
+        Waits for an in-flight prefetch (up to timeout) rather than starting a
+        second lookup for the same question.
+        """
+        self._expire()
+        terms = tokenize(canonicalize_models(query))
+        candidates = [p for p in self._prefetches if not models or p.models == models]
+        best = max(candidates, key=lambda p: overlap(p.terms, terms), default=None)
+        if best is None or overlap(best.terms, terms) < self._min_overlap:
+            self._stats.misses += 1
+            return None
+
+        waited_from = time.monotonic()
+        best.awaited = True
+        try:
+            docs = await asyncio.wait_for(asyncio.shield(best.task), timeout)
+        except Exception:
+            self._stats.misses += 1
+            return None
+        finally:
+            best.awaited = False
+        waited = time.monotonic() - waited_from
+        if docs is None:
+            # The prefetch itself ran out of its retrieval budget
+            self._stats.misses += 1
+            return None
+
+        self._stats.hits += 1
+        self._stats.waits.observe(waited)
+        # Time saved: the part of the lookup that ran before the tool call arrived
+        self._stats.saved_secs += max(0.0, (best.duration or 0.0) - waited)
+        best.used = True
+        return docs
+
+    def stats(self) -> Dict[str, Any]:
+        """Prefetch counts, hit rate and time saved."""
+        stats = self._stats
+        lookups = stats.hits + stats.misses
+        return {
+            "prefetches": stats.started,
+            "replaced": stats.replaced,
+            "hits": stats.hits,
+            "misses": stats.misses,
+            "hit_rate": round(stats.hits / lookups, 3) if lookups else 0.0,
+            "saved_secs": round(stats.saved_secs, 3),
+            "avg_wait_secs": round(stats.waits.total / stats.waits.count, 3) if stats.waits.count else 0.0,
+            "p95_wait_secs": round(stats.waits.quantile(0.95) or 0.0, 3),
+        }
+
+    async def cleanup(self):
+        await super().cleanup()
+        pending = [p.task for p in self._prefetches if not p.task.done()]
+        if self._debounce_task:
+            pending.append(self._debounce_task)
+            self._debounce_task = None
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        logger.info(f"Retrieval prefetch: {self.stats()}")
@@ -0,0 +1,89 @@
+"""
+Product model number recognition and canonicalization.
+
+Customers rarely say the full catalogue name ("WD-G3P600-W"); they say "A1",
+"g3p600" or "ro-g2". These helpers map what they say onto the canonical
+names in VALID_WATERDROP_MODELS.
+"""
+import re
+from typing import Dict, List, Optional
+
+from prompts import VALID_WATERDROP_MODELS
+
+# Hyphenated alphanumeric tokens, e.g. "WD-A1", "g3p600", "RO-G2P600-W", "WD A1"
+_TOKEN_RE = re.compile(r"(?:WD\s+)?[A-Za-z0-9]+(?:-[A-Za-z0-9]+)*", re.IGNORECASE)
+
+# Name of the system message that context_compaction.py puts in place of older turns;
+# it carries the product model those turns named
+SUMMARY_NAME = "conversation_summary"
+
+
+def _aliases(model: str) -> List[str]:
+    """
+    All spellings a customer might use for one canonical model.
+    """
+    bare = model[len("WD-"):]
+    aliases = [model, bare, model.replace("-", ""), bare.replace("-", "")]
+    # Colour/variant suffixes (-W, -B, -C) are often left off
+    head, _, suffix = bare.rpartition("-")
+    if head and len(suffix) == 1:
+        aliases += [head, head.replace("-", ""), f"WD-{head}"]
+    return aliases
+
+
+def _build_alias_map() -> Dict[str, str]:
+    candidates: Dict[str, set] = {}
+    for model in VALID_WATERDROP_MODELS:
+        for alias in _aliases(model):
+            candidates.setdefault(alias.upper(), set()).add(model)
+    # Drop aliases that could mean more than one model (e.g. "G3" for WD-G3-W / WD-G3-B)
+    return {alias: models.pop() for alias, models in candidates.items() if len(models) == 1}
+
+
+MODEL_ALIASES = _build_alias_map()
+
+
+def canonical_model(token: str) -> Optional[str]:
+    """
+    Returns the canonical model name for a single token, or None if it is not a model.
+    """
+    return MODEL_ALIASES.get(re.sub(r"\s+", "-", token.strip()).upper())
+
+
+def extract_models(text: str) -> List[str]:
+    """
+    Returns the canonical models mentioned in text, in order of first mention.
+    """
+    found = []
+    for match in _TOKEN_RE.finditer(text or ""):
+        model = canonical_model(match.group(0))
+        if model and model not in found:
+            found.append(model)
+    return found
+
+
+def canonicalize_models(text: str) -> str:
+    """
+    Rewrites every model mention in text to its canonical name ("A1" -> "WD-A1").
+    """
+    def replace(match: re.Match) -> str:
+        return canonical_model(match.group(0)) or match.group(0)
+
+    return _TOKEN_RE.sub(replace, text or "")
+
+
+def latest_model_in_messages(messages: List[dict]) -> Optional[str]:
+    """
+    Returns the most recently mentioned model in a conversation's user messages
+    (or the summary of compacted earlier turns).
+    """
+    for message in reversed(messages or []):
+        if message.get("role") != "user" and message.get("name") != SUMMARY_NAME:
+            continue
+        content = message.get("content")
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        models = extract_models(content if isinstance(content, str) else "")
+        if models:
+            return models[-1]
+    return None
@@ -0,0 +1,515 @@
+"""
+Offline retrieval benchmark for the waterdrop_faq knowledge base.
+
+Runs a labeled query set through the same retriever stack search_knowledge_base
+uses (tool.py: model routing, Qdrant or NumPy backend, quantization, hybrid
+BM25). For each backend configuration it reports:
+- recall@k and MRR against the labeled chunks, overall and per query kind
+- p50/p99 search latency
+- resident memory added by loading and searching the configuration
+
+The query set (benchmarks/retrieval_queries.json) has three kinds of query:
+- "model": a product model and little else ("what filters does the G3P800 take")
+- "symptom": a problem with no model ("my faucet is dripping")
+- "followup": a question whose model only appears earlier in the conversation
+  ("history"), routed the way the bot routes it
+
+Query embeddings come from a recorded-vector fixture instead of the OpenAI
+API, so runs are offline, repeatable and usable as a regression gate:
+    python retrieval_bench.py record             # once, needs OPENAI_API_KEY
+    python retrieval_bench.py label              # fill in expected chunk ids from "match" rules
+    python retrieval_bench.py run --write-baseline benchmarks/retrieval_baseline.json
+    python retrieval_bench.py run --baseline benchmarks/retrieval_baseline.json   # exits 1 on regression
+
+The production query set ships unlabeled, without a vector fixture or a
+baseline: it is a scaffold until someone runs record and label against the
+production collection, reviews the labels and commits all three. "match" rules
+are keyword rules, which favor the BM25/hybrid configurations, so review should
+add the chunks a good dense search returns that no rule picked up.
+
+--synthetic runs the same queries against a small self-contained knowledge base
+instead (benchmarks/synthetic_kb.json: hand-written chunks and hand-labeled
+expected ids), embedded with HashedEmbeddings into a temporary collection. It
+needs no API key or production data, so recall and MRR are always measured and
+gated against the committed baseline (latency is machine-dependent, hence
+--max-slowdown 0):
+    python retrieval_bench.py run --synthetic --baseline benchmarks/synthetic_baseline.json --max-slowdown 0
+"""
+import argparse
+import gc
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from embedding_cache import normalize_query
+from product_models import extract_models, latest_model_in_messages
+from vector_index import PAYLOADS_FILE, ROUTING_FIELD, chunk_models, routing_models, scroll_collection
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+QUERIES_FILE = os.path.join(BENCH_DIR, "retrieval_queries.json")
+FIXTURE_FILE = os.path.join(BENCH_DIR, "query_vectors.npz")
+SYNTHETIC_FILE = os.path.join(BENCH_DIR, "synthetic_kb.json")
+SYNTHETIC_BASELINE = os.path.join(BENCH_DIR, "synthetic_baseline.json")
+
+QDRANT_PATH = "./waterdrop_faq_qdrant"
+COLLECTION = "waterdrop_faq"
+
+# Backend configurations: load_vector_store() overrides plus create_retriever(hybrid=)
+CONFIGS = {
+    "qdrant": {"backend": "qdrant"},
+    "qdrant-hybrid": {"backend": "qdrant", "hybrid": True},
+    "numpy": {"backend": "numpy"},
+    "numpy-int8": {"backend": "numpy", "quantization": "int8"},
+    "numpy-binary": {"backend": "numpy", "quantization": "binary"},
+    "numpy-d256": {"backend": "numpy", "coarse_dims": 256},
+    "numpy-d512": {"backend": "numpy", "coarse_dims": 512},
+    "numpy-hybrid": {"backend": "numpy", "hybrid": True},
+}
+
+
+@dataclass
+class BenchQuery:
+    id: str
+    kind: str
+    query: str
+    history: List[str] = field(default_factory=list)
+    expected: List[str] = field(default_factory=list)
+    match: Dict = field(default_factory=dict)
+
+    def models(self) -> List[str]:
+        """
+        Models the search is routed to, as search_knowledge_base routes them:
+        those in the query, else the latest one mentioned in the conversation.
+        """
+        models = extract_models(self.query)
+        if not models and self.history:
+            model = latest_model_in_messages([{"role": "user", "content": h} for h in self.history])
+            models = [model] if model else []
+        return models
+
+
+def load_queries(path: str = QUERIES_FILE) -> List[BenchQuery]:
+    with open(path) as f:
+        return [BenchQuery(**q) for q in json.load(f)["queries"]]
+
+
+def save_queries(queries: List[BenchQuery], path: str = QUERIES_FILE):
+    with open(path) as f:
+        data = json.load(f)
+    data["queries"] = [q.__dict__ for q in queries]
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def fixture_key(text: str) -> str:
+    """
+    Key of a recorded vector: the text CachedEmbeddings sends to the embedding
+    model (normalize_query), lowercased like its cache keys.
+    """
+    return normalize_query(text).lower()
+
+
+class RecordedEmbeddings(Embeddings):
+    """
+    Embeddings served from a recorded-vector fixture instead of the OpenAI API.
+    Raises KeyError for any text that was not recorded, so a changed query set
+    can't silently fall back to the network.
+    """
+
+    def __init__(self, path: str = FIXTURE_FILE):
+        data = np.load(path)
+        self.model = str(data["model"])
+        self._vectors = {str(key): vector for key, vector in zip(data["keys"], data["vectors"])}
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self._vectors.get(fixture_key(text))
+        if vector is None:
+            raise KeyError(f"No recorded vector for {text!r}; run `python retrieval_bench.py record`")
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+class HashedEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words vectors for the synthetic knowledge base: each
+    word (minus STOPWORDS) is hashed to a signed dimension, so texts that share
+    words score higher. Crude next to a real model, but stable across runs and
+    machines, which is what a committed baseline needs.
+    """
+
+    STOPWORDS = frozenset(
+        "a an and are at be by can do does for from has have how i in is it its my of on or "
+        "so that the there's this to what when where which while with".split()
+    )
+
+    def __init__(self, dims: int = 1024):
+        self.dims = dims
+        self.model = f"hashed-bow-{dims}"
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = np.zeros(self.dims, dtype=np.float32)
+        for word in re.findall(r"[a-z0-9]+", text.lower()):
+            if word in self.STOPWORDS:
+                continue
+            digest = zlib.crc32(word.encode())
+            vector[digest % self.dims] += 1.0 if digest & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+def build_synthetic_collection(path: str, persist_path: str, collection: str, embeddings: Embeddings) -> int:
+    """
+    Writes the synthetic knowledge base's chunks into a new local Qdrant
+    collection, payloads shaped like ingest.py's. Returns the number of chunks.
+    """
+    from qdrant_client import QdrantClient
+    from qdrant_client import models as qdrant_models
+
+    from tool import KB_MODEL_FIELD
+
+    with open(path) as f:
+        chunks = json.load(f)["chunks"]
+    vectors = embeddings.embed_documents([chunk["page_content"] for chunk in chunks])
+    client = QdrantClient(path=persist_path)
+    try:
+        client.create_collection(
+            collection,
+            vectors_config=qdrant_models.VectorParams(size=len(vectors[0]), distance=qdrant_models.Distance.COSINE),
+        )
+        client.upsert(
+            collection,
+            points=[
+                qdrant_models.PointStruct(
+                    id=int(chunk["id"]),
+                    vector=vector,
+                    payload={
+                        "page_content": chunk["page_content"],
+                        "metadata": chunk["metadata"],
+                        ROUTING_FIELD: routing_models(chunk, KB_MODEL_FIELD),
+                    },
+                )
+                for chunk, vector in zip(chunks, vectors)
+            ],
+        )
+    finally:
+        client.close()
+    return len(chunks)
+
+
+def record_fixture(queries: List[BenchQuery], path: str = FIXTURE_FILE) -> int:
+    """
+    Embeds every benchmark query with the production embedding model and saves
+    the vectors. Returns the number of vectors recorded.
+    """
+    from langchain_openai import OpenAIEmbeddings
+
+    from tool import EMBEDDING_MODEL
+
+    texts = {fixture_key(q.query): normalize_query(q.query) for q in queries}
+    keys = sorted(texts)
+    vectors = OpenAIEmbeddings(model=EMBEDDING_MODEL).embed_documents([texts[key] for key in keys])
+    np.savez(
+        path,
+        model=np.array(EMBEDDING_MODEL),
+        keys=np.array(keys),
+        vectors=np.asarray(vectors, dtype=np.float32),
+    )
+    return len(keys)
+
+
+def load_payloads(persist_path: str = QDRANT_PATH, collection: str = COLLECTION) -> List[dict]:
+    """
+    Every chunk's id/page_content/metadata, from the NumPy export if there is one.
+    """
+    from tool import KB_NUMPY_INDEX
+
+    path = os.path.join(KB_NUMPY_INDEX, PAYLOADS_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    from qdrant_client import QdrantClient
+
+    client = QdrantClient(path=persist_path)
+    try:
+        return [payload for payload, _ in scroll_collection(client, collection, with_vectors=False)]
+    finally:
+        client.close()
+
+
+def matches(payload: dict, rule: Dict, model_field: str) -> bool:
+    """
+    Whether a chunk satisfies a query's "match" rule:
+    - models: the chunk belongs to one of them (or is shared, with "shared": true)
+    - terms: every term appears in the chunk text
+    - any: at least one of these appears in the chunk text
+    """
+    text = payload.get("page_content", "").lower()
+    if not all(term.lower() in text for term in rule.get("terms", [])):
+        return False
+    if rule.get("any") and not any(term.lower() in text for term in rule["any"]):
+        return False
+    if "models" in rule:
+        models = chunk_models(payload, model_field)
+        if not models:
+            return bool(rule.get("shared"))
+        return bool(set(models) & set(rule["models"]))
+    return True
+
+
+def label_queries(queries: List[BenchQuery], payloads: List[dict], overwrite: bool = False) -> List[tuple]:
+    """
+    Sets each query's expected chunk ids from its match rule. Returns
+    (query id, number of chunks) for every query that was labeled.
+    """
+    from tool import KB_MODEL_FIELD
+
+    labeled = []
+    for query in queries:
+        if not query.match or (query.expected and not overwrite):
+            continue
+        query.expected = [p["id"] for p in payloads if matches(p, query.match, KB_MODEL_FIELD)]
+        labeled.append((query.id, len(query.expected)))
+    return labeled
+
+
+def routed_search(retriever, query: str, models: List[str]):
+    """
+    Synchronous equivalent of bot-openai.py's fetch_documents: search the
+    model's chunks plus shared ones, falling back to the whole collection.
+    """
+    from tool import model_search_kwargs
+
+    search_kwargs = model_search_kwargs(retriever, models)
+    docs = retriever.invoke(query, **search_kwargs)
+    if docs == [] and search_kwargs:
+        docs = retriever.invoke(query)
+    return docs
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        import resource
+
+        # Peak rather than current RSS, but still shows which configs grow memory
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def score(ranked_ids: List[str], expected: List[str], k: int) -> tuple[float, float]:
+    """
+    recall@k (out of min(k, relevant chunks)) and reciprocal rank of the first relevant chunk.
+    """
+    relevant = set(expected)
+    hits = sum(1 for chunk_id in ranked_ids[:k] if chunk_id in relevant)
+    recall = hits / min(k, len(relevant))
+    rank = next((i + 1 for i, chunk_id in enumerate(ranked_ids) if chunk_id in relevant), None)
+    return recall, 1 / rank if rank else 0.0
+
+
+def run_config(
+    name: str,
+    queries: List[BenchQuery],
+    embeddings: Embeddings,
+    k: int = 4,
+    repeat: int = 5,
+    stores: Optional[dict] = None,
+    persist_path: str = QDRANT_PATH,
+    collection: str = COLLECTION,
+    numpy_index: Optional[str] = None,
+) -> dict:
+    """
+    Loads one configuration and measures quality, latency and memory.
+    stores caches vector stores across configurations (Qdrant's local mode
+    allows only one client per storage directory in a process).
+    persist_path/collection/numpy_index point it at another knowledge base
+    (--synthetic); numpy_index defaults to KB_NUMPY_INDEX.
+    """
+    from tool import create_embeddings, create_retriever, load_vector_store
+
+    settings = dict(CONFIGS[name])
+    hybrid = settings.pop("hybrid", False)
+    stores = stores if stores is not None else {}
+    key = json.dumps(settings, sort_keys=True)
+
+    gc.collect()
+    rss_before = rss_mb()
+    if key not in stores:
+        stores[key] = load_vector_store(
+            persist_path,
+            collection,
+            embeddings=create_embeddings(embeddings),
+            quantization=settings.get("quantization"),
+            coarse_dims=settings.get("coarse_dims"),
+            backend=settings["backend"],
+            numpy_index=numpy_index,
+        )
+    retriever = create_retriever(stores[key], k=k, hybrid=hybrid)
+
+    per_kind: Dict[str, List[tuple]] = {}
+    latencies = []
+    for attempt in range(repeat + 1):
+        for query in queries:
+            models = query.models()
+            start = time.perf_counter()
+            docs = routed_search(retriever, query.query, models)
+            elapsed = time.perf_counter() - start
+            # The first pass warms the embedding cache and touches the index pages
+            if attempt == 0:
+                if query.expected:
+                    ranked = [str(doc.metadata.get("_id")) for doc in docs]
+                    per_kind.setdefault(query.kind, []).append(score(ranked, query.expected, k))
+                continue
+            latencies.append(elapsed)
+    rss_added = rss_mb() - rss_before
+
+    def summarize(scores: List[tuple]) -> dict:
+        return {
+            "queries": len(scores),
+            f"recall@{k}": round(float(np.mean([s[0] for s in scores])), 4) if scores else None,
+            "mrr": round(float(np.mean([s[1] for s in scores])), 4) if scores else None,
+        }
+
+    all_scores = [s for scores in per_kind.values() for s in scores]
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "config": name,
+        **summarize(all_scores),
+        "by_kind": {kind: summarize(scores) for kind, scores in sorted(per_kind.items())},
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+        "rss_mb": round(rss_added, 1),
+    }
+
+
+def regressions(report: List[dict], baseline: List[dict], k: int, max_recall_drop: float, max_slowdown: float) -> List[str]:
+    """
+    Differences from a baseline report that should fail the run. max_slowdown=0
+    compares quality only (baselines recorded on another machine).
+    """
+    previous = {r["config"]: r for r in baseline}
+    failures = []
+    for result in report:
+        base = previous.get(result["config"])
+        if not base:
+            continue
+        for metric in (f"recall@{k}", "mrr"):
+            if base.get(metric) is not None and result[metric] is not None:
+                if result[metric] < base[metric] - max_recall_drop:
+                    failures.append(f"{result['config']}: {metric} {base[metric]} -> {result[metric]}")
+        if max_slowdown and result["p99_ms"] > base["p99_ms"] * max_slowdown:
+            failures.append(f"{result['config']}: p99 {base['p99_ms']}ms -> {result['p99_ms']}ms")
+    return failures
+
+
+def print_report(report: List[dict], k: int):
+    print(f"{'config':<15} {'recall@' + str(k):>9} {'mrr':>7} {'p50 ms':>9} {'p99 ms':>9} {'rss MB':>8}")
+    for r in report:
+        recall = "-" if r[f"recall@{k}"] is None else f"{r[f'recall@{k}']:.3f}"
+        mrr = "-" if r["mrr"] is None else f"{r['mrr']:.3f}"
+        print(f"{r['config']:<15} {recall:>9} {mrr:>7} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['rss_mb']:>8.1f}")
+        for kind, s in r["by_kind"].items():
+            print(f"  {kind:<13} {s[f'recall@{k}']:>9.3f} {s['mrr']:>7.3f}   ({s['queries']} queries)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline retrieval benchmark")
+    parser.add_argument("--queries", default=QUERIES_FILE, help="Labeled query set")
+    parser.add_argument("--fixture", default=FIXTURE_FILE, help="Recorded query vectors (.npz)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("record", help="Embed the query set and save the vectors (needs OPENAI_API_KEY)")
+
+    label_parser = subparsers.add_parser("label", help="Fill in expected chunk ids from each query's match rule")
+    label_parser.add_argument("--overwrite", action="store_true", help="Relabel queries that already have chunks")
+
+    run_parser = subparsers.add_parser("run", help="Benchmark backend configurations")
+    run_parser.add_argument("--configs", default=",".join(CONFIGS), help="Comma-separated configurations")
+    run_parser.add_argument("-k", type=int, default=4, help="Results per query")
+    run_parser.add_argument("--repeat", type=int, default=5, help="Timed passes over the query set")
+    run_parser.add_argument("--baseline", help="Fail if recall/MRR drop or p99 grows relative to this report")
+    run_parser.add_argument("--max-recall-drop", type=float, default=0.02)
+    run_parser.add_argument(
+        "--max-slowdown", type=float, default=1.5, help="Allowed p99 ratio to the baseline (0: don't compare latency)"
+    )
+    run_parser.add_argument(
+        "--synthetic", action="store_true", help=f"Search the self-contained knowledge base in {SYNTHETIC_FILE}"
+    )
+    run_parser.add_argument("--write-baseline", help="Save the report as a baseline")
+
+    args = parser.parse_args()
+    synthetic = getattr(args, "synthetic", False)
+    queries = load_queries(SYNTHETIC_FILE if synthetic else args.queries)
+
+    if args.command == "record":
+        count = record_fixture(queries, args.fixture)
+        print(f"Recorded {count} query vectors to {args.fixture}")
+
+    elif args.command == "label":
+        labeled = label_queries(queries, load_payloads(), overwrite=args.overwrite)
+        save_queries(queries, args.queries)
+        for query_id, count in labeled:
+            print(f"{query_id:<28} {count} chunk(s){'  <- no match, check the rule' if not count else ''}")
+
+    elif args.command == "run":
+        unlabeled = [q.id for q in queries if not q.expected]
+        if unlabeled:
+            print(f"{len(unlabeled)} unlabeled queries are timed but not scored: {', '.join(unlabeled)}")
+        if len(unlabeled) == len(queries):
+            print("No query is labeled: recall and MRR are not measured, a baseline only gates p99 latency")
+        stores: dict = {}
+        report = []
+        # NumPy first: exporting the index needs the Qdrant directory before the Qdrant config locks it
+        names = sorted(args.configs.split(","), key=lambda n: CONFIGS[n]["backend"] != "numpy")
+        with tempfile.TemporaryDirectory(prefix="retrieval-bench-") as tmp_dir:
+            kb = {}
+            if synthetic:
+                embeddings = HashedEmbeddings()
+                kb = {
+                    "persist_path": os.path.join(tmp_dir, "qdrant"),
+                    "collection": "synthetic",
+                    "numpy_index": os.path.join(tmp_dir, "index"),
+                }
+                build_synthetic_collection(SYNTHETIC_FILE, kb["persist_path"], kb["collection"], embeddings)
+            else:
+                embeddings = RecordedEmbeddings(args.fixture)
+            for name in names:
+                report.append(run_config(name, queries, embeddings, k=args.k, repeat=args.repeat, stores=stores, **kb))
+            for store in stores.values():
+                client = getattr(store, "client", None)
+                if client is not None:
+                    client.close()
+        print_report(report, args.k)
+
+        if args.write_baseline:
+            with open(args.write_baseline, "w") as f:
+                json.dump(report, f, indent=2)
+                f.write("\n")
+        if args.baseline:
+            with open(args.baseline) as f:
+                failures = regressions(report, json.load(f), args.k, args.max_recall_drop, args.max_slowdown)
+            for failure in failures:
+                print(f"REGRESSION {failure}")
+            if failures:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
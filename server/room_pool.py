@@ -0,0 +1,215 @@
+#
+# Copyright (c) 2024–2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Pre-created Daily Room Pool.
+
+Every /connect used to create a room and mint a token with two serial Daily
+REST calls, and the bot minted another token before joining. This module
+keeps rooms that already exist and have a token, so a connect takes one from
+memory and the bot joins with the token the server hands it.
+
+The pool:
+- Creates rooms with an expiry (``exp``) and mints a token valid until then
+- Hands out only rooms with at least ``min_remaining`` seconds left, so a
+  session never outlives its room or token; older ones are discarded
+- Refills itself in the background, backing off while the API is failing
+- Deletes the rooms it still holds on shutdown
+- Tracks pool size, hit/miss counts and creation latency
+
+Point ``DAILY_API_URL`` at ``daily_rest_stub.py`` to run it without Daily.
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from pipecat.transports.services.helpers.daily_rest import (
+    DailyRESTHelper,
+    DailyRoomParams,
+    DailyRoomProperties,
+)
+
+# Seconds a pooled room (and its token) stays valid after it is created
+ROOM_TTL = float(os.getenv("ROOM_POOL_TTL", str(2 * 60 * 60)))
+
+# Seconds a room must still be valid for when it is handed out (the longest session)
+ROOM_MIN_REMAINING = float(os.getenv("ROOM_POOL_MIN_REMAINING", str(60 * 60)))
+
+# Longest wait between refill attempts while room creation keeps failing
+MAX_BACKOFF = 60.0
+
+
+@dataclass
+class DailyRoom:
+    """A Daily room with a token that can join it."""
+
+    url: str
+    token: str
+    expires_at: float
+
+    def remaining(self) -> float:
+        return self.expires_at - time.time()
+
+
+class DailyRoomPool:
+    """Keeps ``size`` ready Daily rooms, each with a pre-minted token.
+
+    Args:
+        rest: Daily REST helper used to create rooms and tokens
+        size: Number of ready rooms to keep. 0 disables the pool.
+        room_ttl: Seconds each room and token is valid for
+        min_remaining: Seconds a room must still be valid for when handed out
+    """
+
+    def __init__(
+        self,
+        rest: DailyRESTHelper,
+        size: int,
+        room_ttl: float = ROOM_TTL,
+        min_remaining: float = ROOM_MIN_REMAINING,
+    ):
+        self.size = size
+        self.room_ttl = max(room_ttl, min_remaining + 60)
+        self.min_remaining = min_remaining
+        self._rest = rest
+        self._rooms: List[DailyRoom] = []
+        self._creating = 0
+        self._refill = asyncio.Event()
+        self._refill_task: Optional[asyncio.Task] = None
+        self._backoff = 0.0
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._errors = 0
+        self._create_ms: List[float] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    async def start(self):
+        """Start the background refill loop."""
+        if not self.enabled:
+            return
+        self._refill_task = asyncio.create_task(self._refill_loop())
+        self._refill.set()
+
+    async def stop(self):
+        """Stop refilling and delete the rooms nobody used."""
+        if self._refill_task:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+        rooms, self._rooms = self._rooms, []
+        results = await asyncio.gather(
+            *(self._rest.delete_room_by_url(room.url) for room in rooms), return_exceptions=True
+        )
+        failed = sum(isinstance(r, Exception) for r in results)
+        if rooms:
+            print(f"Deleted {len(rooms) - failed}/{len(rooms)} unused pooled rooms")
+
+    def acquire(self) -> Optional[DailyRoom]:
+        """Take a ready room, or None on a pool miss (the caller creates one itself)."""
+        if not self.enabled:
+            return None
+        self._discard_expiring()
+        self._refill.set()
+        if not self._rooms:
+            self._misses += 1
+            return None
+        self._hits += 1
+        # Oldest first, so rooms are used well before they expire
+        return self._rooms.pop(0)
+
+    async def create(self) -> DailyRoom:
+        """Create a room and mint its token (two REST calls).
+
+        Raises:
+            Exception: If room creation or token generation fails
+        """
+        start = time.monotonic()
+        expires_at = time.time() + self.room_ttl
+        room = await self._rest.create_room(
+            DailyRoomParams(properties=DailyRoomProperties(exp=expires_at))
+        )
+        if not room.url:
+            raise Exception("No URL in room creation response")
+        token = await self._rest.get_token(room.url, expiry_time=self.room_ttl)
+        if not token:
+            raise Exception(f"Failed to get token for room: {room.url}")
+        self._record_create((time.monotonic() - start) * 1000)
+        return DailyRoom(url=room.url, token=token, expires_at=expires_at)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size, hit/miss counts and room creation latency."""
+        latencies = self._create_ms
+        return {
+            "enabled": self.enabled,
+            "target_size": self.size,
+            "ready": len(self._rooms),
+            "creating": self._creating,
+            "hits": self._hits,
+            "misses": self._misses,
+            "expired": self._expired,
+            "errors": self._errors,
+            "create_ms": {
+                "last": round(latencies[-1], 2) if latencies else None,
+                "avg": round(sum(latencies) / len(latencies), 2) if latencies else None,
+                "max": round(max(latencies), 2) if latencies else None,
+            },
+        }
+
+    def _record_create(self, ms: float):
+        self._create_ms.append(ms)
+        # Keep a bounded window of recent creations
+        if len(self._create_ms) > 1000:
+            del self._create_ms[:-1000]
+
+    def _discard_expiring(self):
+        fresh = [room for room in self._rooms if room.remaining() >= self.min_remaining]
+        self._expired += len(self._rooms) - len(fresh)
+        self._rooms = fresh
+
+    async def _refill_loop(self):
+        # Rooms expire on their own, so no need to delete the discarded ones
+        check_interval = min(60.0, (self.room_ttl - self.min_remaining) / 2)
+        while True:
+            # Wake on demand, and periodically to replace rooms close to expiry
+            try:
+                await asyncio.wait_for(self._refill.wait(), check_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._refill.clear()
+            if self._backoff:
+                await asyncio.sleep(self._backoff)
+            self._discard_expiring()
+            missing = self.size - len(self._rooms) - self._creating
+            if missing <= 0:
+                continue
+            self._creating += missing
+            results = await asyncio.gather(
+                *(self._create_pooled() for _ in range(missing)), return_exceptions=True
+            )
+            if any(isinstance(r, Exception) for r in results):
+                self._backoff = min(MAX_BACKOFF, self._backoff * 2 or 1.0)
+                self._refill.set()
+            else:
+                self._backoff = 0.0
+
+    async def _create_pooled(self):
+        try:
+            self._rooms.append(await self.create())
+        except Exception as e:
+            self._errors += 1
+            print(f"Failed to create pooled room: {e!r}")
+            raise
+        finally:
+            self._creating -= 1
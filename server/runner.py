@@ -12,8 +12,19 @@ import aiohttp
 from pipecat.transports.services.helpers.daily_rest import DailyRESTHelper
 
 
-async def configure(aiohttp_session: aiohttp.ClientSession):
-    """Configure the Daily room and Daily REST helper."""
+async def configure(
+    aiohttp_session: aiohttp.ClientSession, url: str | None = None, token: str | None = None
+):
+    """Configure the Daily room and Daily REST helper.
+
+    A meeting token is only minted when the server did not hand one over, so a
+    bot started by server.py joins without a Daily REST round-trip.
+
+    Args:
+        aiohttp_session: Session used for Daily REST calls
+        url: Room URL handed over by the server; overrides -u/--url
+        token: Meeting token handed over by the server; overrides -t/--token
+    """
     parser = argparse.ArgumentParser(description="Daily AI SDK Bot Sample")
     parser.add_argument(
         "-u", "--url", type=str, required=False, help="URL of the Daily room to join"
@@ -25,10 +36,14 @@ async def configure(aiohttp_session: aiohttp.ClientSession):
         required=False,
         help="Daily API Key (needed to create an owner token for the room)",
     )
+    parser.add_argument(
+        "-t", "--token", type=str, required=False, help="Meeting token for the room (skips creating one)"
+    )
 
     args, unknown = parser.parse_known_args()
 
-    url = args.url or os.getenv("DAILY_SAMPLE_ROOM_URL")
+    url = url or args.url or os.getenv("DAILY_SAMPLE_ROOM_URL")
+    token = token or args.token
     key = args.apikey or os.getenv("DAILY_API_KEY")
 
     if not url:
@@ -36,6 +51,9 @@ async def configure(aiohttp_session: aiohttp.ClientSession):
             "No Daily room specified. use the -u/--url option from the command line, or set DAILY_SAMPLE_ROOM_URL in your environment to specify a Daily room URL."
         )
 
+    if token:
+        return (url, token)
+
     if not key:
         raise Exception(
             "No Daily API key specified. use the -k/--apikey option from the command line, or set DAILY_API_KEY in your environment to specify a Daily API key, available from https://dashboard.daily.co/developers."
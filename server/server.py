@@ -21,6 +21,7 @@ Requirements:
 """
 
 import argparse
+import asyncio
 import os
 import subprocess
 from contextlib import asynccontextmanager
@@ -30,11 +31,18 @@ import aiohttp
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse
+from loguru import logger
 from typing import Optional
 import json
 
-from pipecat.transports.services.helpers.daily_rest import DailyRESTHelper, DailyRoomParams
+from pipecat.transports.services.helpers.daily_rest import DailyRESTHelper
+
+from bot_pool import BotWorkerPool
+from room_pool import DailyRoomPool
+from session_supervisor import AdmissionError, SessionSupervisor
+from turn_metrics import PrometheusText, StageHistograms
+import worker_ipc
 
 # Load environment variables from .env file
 load_dotenv(override=True)
@@ -42,22 +50,85 @@ load_dotenv(override=True)
 # Maximum number of bot instances allowed per room
 MAX_BOTS_PER_ROOM = 1
 
-# Dictionary to track bot processes: {pid: (process, room_url)}
-bot_procs = {}
+# Running bot sessions by session id and room, reaped as they end.
+# Cold-started bots use their pid as session id; pooled workers may host several sessions.
+supervisor = SessionSupervisor(max_per_room=MAX_BOTS_PER_ROOM)
 
 # Store Daily API helpers
 daily_helpers = {}
 
+# Number of idle, pre-initialized bot workers to keep (0 = cold start every session)
+BOT_POOL_SIZE = int(os.getenv("BOT_POOL_SIZE", "0"))
+
+# Concurrent sessions hosted by each pooled worker process
+BOT_SESSIONS_PER_WORKER = int(os.getenv("BOT_SESSIONS_PER_WORKER", "1"))
+
+# Pool of pre-warmed bot workers, created in lifespan()
+bot_pool: Optional[BotWorkerPool] = None
+
+# Number of ready Daily rooms (with tokens) to keep for /connect (0 = create on demand)
+ROOM_POOL_SIZE = int(os.getenv("ROOM_POOL_SIZE", "0"))
+
+# Pool of pre-created Daily rooms, created in lifespan()
+room_pool: Optional[DailyRoomPool] = None
+
+# Directory bot processes run from
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# CPU threads each bot process may use for VAD inference. Every process shares one
+# Silero session between its sessions, so this bounds VAD threads to one budget per process
+VAD_THREADS_PER_WORKER = int(os.getenv("VAD_THREADS_PER_WORKER", "1"))
 
-def cleanup():
-    """Cleanup function to terminate all bot processes.
 
-    Called during server shutdown.
+def bot_kb_backend() -> str:
+    """KB_BACKEND for bot processes, resolved once at startup (lifespan).
+
+    Qdrant's local mode lets only one process open its storage folder. With
+    KB_BACKEND=auto the bots use the NumPy export of the collection whenever
+    more than one bot process can run at a time (a worker pool, or more than one
+    session per host), and Qdrant otherwise. An explicit backend is kept as is.
     """
-    for entry in bot_procs.values():
-        proc = entry[0]
-        proc.terminate()
-        proc.wait()
+    backend = os.getenv("KB_BACKEND", "qdrant").lower().strip() or "qdrant"
+    concurrent = BOT_POOL_SIZE > 0 or supervisor.max_sessions != 1
+    if backend == "auto":
+        backend = "numpy" if concurrent else "qdrant"
+        logger.info(f"KB_BACKEND=auto: bots use KB_BACKEND={backend}")
+    elif backend == "qdrant" and concurrent:
+        logger.warning(
+            "KB_BACKEND=qdrant allows only one bot process at a time, but more can run "
+            "(BOT_POOL_SIZE > 0 or MAX_SESSIONS other than 1); set KB_BACKEND=numpy or auto"
+        )
+    return backend
+
+
+# Environment for bot processes: the server's plus their thread budget, and asking
+# them to report turn latencies on stdout. lifespan() adds the knowledge base backend
+BOT_ENV = {
+    **os.environ,
+    "VAD_THREADS": str(VAD_THREADS_PER_WORKER),
+    "OMP_NUM_THREADS": str(VAD_THREADS_PER_WORKER),
+    "BOT_REPORT_METRICS": "1",
+}
+
+# Turn stage latencies reported by every bot since the server started
+turn_latency = StageHistograms()
+
+# Stdout readers for cold-started bots
+bot_event_tasks: set[asyncio.Task] = set()
+
+
+def record_bot_metrics(event: Dict[str, Any]):
+    """Merge a bot's ``metrics`` event into the server-wide histograms."""
+    stages = event.get("stages")
+    if isinstance(stages, dict):
+        turn_latency.merge(stages)
+
+
+async def read_bot_events(proc: subprocess.Popen):
+    """Collect a cold-started bot's metrics events until it exits."""
+    async for event in worker_ipc.read_events(proc.stdout):
+        if event.get("event") == worker_ipc.METRICS:
+            record_bot_metrics(event)
 
 
 def get_bot_file():
@@ -78,17 +149,31 @@ async def lifespan(app: FastAPI):
 
     - Creates aiohttp session
     - Initializes Daily API helper
+    - Resolves the bots' knowledge base backend
+    - Starts the pre-warmed bot worker pool and the Daily room pool
     - Cleans up resources on shutdown
     """
+    global bot_pool, room_pool
     aiohttp_session = aiohttp.ClientSession()
     daily_helpers["rest"] = DailyRESTHelper(
         daily_api_key=os.getenv("DAILY_API_KEY", ""),
         daily_api_url=os.getenv("DAILY_API_URL", "https://api.daily.co/v1"),
         aiohttp_session=aiohttp_session,
     )
+    BOT_ENV["KB_BACKEND"] = bot_kb_backend()
+    bot_pool = BotWorkerPool(
+        size=BOT_POOL_SIZE,
+        command=["python3", "-m", get_bot_file()],
+        cwd=BOT_DIR,
+        sessions_per_worker=BOT_SESSIONS_PER_WORKER,
+        env=BOT_ENV,
+        on_metrics=record_bot_metrics,
+    )
+    room_pool = DailyRoomPool(daily_helpers["rest"], size=ROOM_POOL_SIZE)
+    await asyncio.gather(bot_pool.start(), room_pool.start())
     yield
+    await asyncio.gather(bot_pool.stop(), room_pool.stop(), supervisor.shutdown())
     await aiohttp_session.close()
-    cleanup()
 
 
 # Initialize FastAPI app with lifespan manager
@@ -109,14 +194,16 @@ app.add_middleware(
 )
 
 
-async def create_room_and_token() -> tuple[str, str]:
+async def create_room_and_token() -> tuple[str, str, bool]:
     """Helper function to create a Daily room and generate an access token.
     
     First tries to use environment variables for room URL and token.
-    If not available, creates a new room.
+    If not available, takes a ready room from the room pool, or creates a new
+    room when the pool is empty.
 
     Returns:
-        tuple[str, str]: A tuple containing (room_url, token)
+        tuple[str, str, bool]: A tuple containing (room_url, token, minted), where
+        minted is True for an owner token the server created itself
 
     Raises:
         HTTPException: If room creation or token generation fails
@@ -127,25 +214,20 @@ async def create_room_and_token() -> tuple[str, str]:
     
     if room_url and token:
         print(f"Using existing room from environment: {room_url}")
-        return room_url, token
+        return room_url, token, False
         
-    # If no room URL in env, create a new room
+    # If no room URL in env, use a pre-created room
+    room = room_pool.acquire()
+    if room:
+        print(f"Using pooled room: {room.url} (valid for {room.remaining() / 60:.0f} min)")
+        return room.url, room.token, True
+
+    # The pool is empty or disabled: create a new room
     print("Creating new Daily room...")
     try:
-        room = await daily_helpers["rest"].create_room(DailyRoomParams())
-        if not room.url:
-            raise Exception("No URL in room creation response")
-            
-        room_url = room.url
-        print(f"Created new room: {room_url}")
-        
-        # Get token for the new room
-        token = await daily_helpers["rest"].get_token(room_url)
-        if not token:
-            raise Exception(f"Failed to get token for room: {room_url}")
-            
-        print(f"Got token for room: {room_url}")
-        return room_url, token
+        room = await room_pool.create()
+        print(f"Created new room: {room.url}")
+        return room.url, room.token, True
         
     except Exception as e:
         print(f"Error creating room: {str(e)}")
@@ -155,6 +237,45 @@ async def create_room_and_token() -> tuple[str, str]:
         )
 
 
+def admission_refused(error: AdmissionError) -> JSONResponse:
+    """Response for a refused session: 400 for a full room, 503 when the host is at capacity."""
+    if error.kind == "room":
+        return JSONResponse(status_code=400, content={"error": str(error)})
+    return JSONResponse(
+        status_code=503,
+        content={"error": f"Server at capacity: {error}"},
+        headers={"Retry-After": "5"},
+    )
+
+
+def session_id_of(proc) -> str:
+    """Session id for a bot handle: the pooled session id, or the pid of a cold-started bot."""
+    return getattr(proc, "session_id", None) or str(proc.pid)
+
+
+async def launch_bot(cmd: list[str], handoff: Dict[str, Any]):
+    """Run a bot session, preferring a pre-warmed worker over a cold start.
+
+    Args:
+        cmd: Command used to cold start the bot if the pool has no free slot
+        handoff: Session parameters handed to a pooled worker
+
+    Returns:
+        subprocess.Popen | PooledSession: Handle for the process running the session
+    """
+    proc = await bot_pool.acquire(handoff) if bot_pool else None
+    if proc is not None:
+        print(f"Handed session {proc.session_id} to pre-warmed worker: {proc.pid}")
+        return proc
+
+    print(f"Starting bot with command: {' '.join(cmd)}")
+    proc = subprocess.Popen(cmd, cwd=BOT_DIR, env=BOT_ENV, stdout=subprocess.PIPE)
+    reader = asyncio.create_task(read_bot_events(proc))
+    bot_event_tasks.add(reader)
+    reader.add_done_callback(bot_event_tasks.discard)
+    return proc
+
+
 @app.post("/start")
 async def start_agent(request: Request):
     """Endpoint for starting a voice agent session.
@@ -177,22 +298,21 @@ async def start_agent(request: Request):
         # Use provided room_url and token or create new ones
         room_url = data.get("room_url") or os.getenv("DAILY_SAMPLE_ROOM_URL")
         token = data.get("token") or os.getenv("DAILY_SAMPLE_ROOM_TOKEN")
+        # Only an owner token the server minted is handed to the bot; with any other
+        # token the bot mints its own (transcription needs owner rights)
+        minted = False
         
         if not room_url or not token:
             # Fall back to creating a new room if env vars not set
-            room_url, token = await create_room_and_token()
+            room_url, token, minted = await create_room_and_token()
             
         print(f"Using room URL: {room_url}")
 
-        # Check if there is already an existing process running in this room
-        num_bots_in_room = sum(
-            1 for proc in bot_procs.values() if proc[1] == room_url and proc[0].poll() is None
-        )
-        if num_bots_in_room >= MAX_BOTS_PER_ROOM:
-            return JSONResponse(
-                status_code=400,
-                content={"error": f"Max bot limit reached for room: {room_url}"}
-            )
+        # Refuse if the room already has a bot or the host has no headroom left
+        try:
+            reservation = supervisor.admit(room_url)
+        except AdmissionError as e:
+            return admission_refused(e)
 
         # Start the bot process with configuration from the request
         try:
@@ -200,30 +320,41 @@ async def start_agent(request: Request):
             cmd = [
                 "python3", "-m", bot_file,
                 "--url", room_url,
-                "--token", token,
                 "--language", data.get("language", "en"),
                 "--llm-provider", "openai"  # Force OpenAI provider
             ]
+            if minted:
+                cmd.extend(["--token", token])
             
             # Add TTS voice if provided
+            voice = None
             if "tts_model" in data and "voice" in data["tts_model"]:
-                cmd.extend(["--tts-voice", data["tts_model"]["voice"]])
-                
-            print(f"Starting bot with command: {' '.join(cmd)}")
-            
-            proc = subprocess.Popen(
-                cmd,
-                cwd=os.path.dirname(os.path.abspath(__file__)),
-            )
-            bot_procs[proc.pid] = (proc, room_url)
+                voice = data["tts_model"]["voice"]
+                cmd.extend(["--tts-voice", voice])
+
+            # Video output options (resolution, fps) or audio only
+            video = {"audio_only": True} if data.get("audio_only") else data.get("video")
+            if video:
+                cmd.extend(["--video", json.dumps(video)])
+
+            proc = await launch_bot(cmd, {
+                "room_url": room_url,
+                "token": token if minted else None,
+                "language": data.get("language", "en"),
+                "voice": voice,
+                "video": video,
+            })
+            supervisor.register(reservation, session_id_of(proc), proc, room_url)
             
             return {
                 "room_url": room_url,
                 "token": token,
-                "bot_pid": proc.pid
+                "bot_pid": proc.pid,
+                "session_id": session_id_of(proc)
             }
             
         except Exception as e:
+            supervisor.release(reservation)
             print(f"Failed to start bot: {str(e)}")
             return JSONResponse(
                 status_code=500,
@@ -255,9 +386,13 @@ async def rtvi_connect(request: Request) -> Dict[Any, Any]:
             "tts": "cartesia",
             "stt": "deepgram"
         },
-        "config": [...]
+        "config": [...],
+        "audio_only": false
     }
 
+    A config entry {"service": "video", "width": 640, "height": 360, "fps": 15}
+    sets the avatar video output for the session.
+
     Returns:
         Dict[Any, Any]: Authentication bundle containing room_url and token
 
@@ -271,8 +406,18 @@ async def rtvi_connect(request: Request) -> Dict[Any, Any]:
         print(f"Error parsing request data: {e}")
         data = {}
 
+    # Every connection gets a new room, so only host limits apply
+    try:
+        reservation = supervisor.admit()
+    except AdmissionError as e:
+        return admission_refused(e)
+
     print("Creating room for RTVI connection")
-    room_url, token = await create_room_and_token()
+    try:
+        room_url, token, minted = await create_room_and_token()
+    except Exception:
+        supervisor.release(reservation)
+        raise
     print(f"Room URL: {room_url}")
 
     # Start the bot process
@@ -281,26 +426,36 @@ async def rtvi_connect(request: Request) -> Dict[Any, Any]:
         cmd = [
             "python3", "-m", bot_file,
             "--url", room_url,
-            "--token", token,
             "--language", "en"  # Default to English
         ]
+        if minted:
+            cmd.extend(["--token", token])
         
         # Add additional parameters from the request if available
+        voice = None
+        video = {"audio_only": True} if data and data.get("audio_only") else None
         if data and "config" in data:
             for config in data["config"]:
                 if config["service"] == "llm" and "model" in config:
                     cmd.extend(["--llm-model", config["model"]])
                 elif config["service"] == "tts" and "voice" in config:
-                    cmd.extend(["--tts-voice", config["voice"]])
-
-        print(f"Starting bot with command: {' '.join(cmd)}")
-        
-        proc = subprocess.Popen(
-            cmd,
-            cwd=os.path.dirname(os.path.abspath(__file__)),
-        )
-        bot_procs[proc.pid] = (proc, room_url)
+                    voice = config["voice"]
+                    cmd.extend(["--tts-voice", voice])
+                elif config["service"] == "video" and not video:
+                    video = {k: v for k, v in config.items() if k != "service"}
+        if video:
+            cmd.extend(["--video", json.dumps(video)])
+
+        proc = await launch_bot(cmd, {
+            "room_url": room_url,
+            "token": token if minted else None,
+            "language": "en",
+            "voice": voice,
+            "video": video,
+        })
+        supervisor.register(reservation, session_id_of(proc), proc, room_url)
     except Exception as e:
+        supervisor.release(reservation)
         print(f"Failed to start bot: {str(e)}")
         raise HTTPException(
             status_code=500,
@@ -311,16 +466,17 @@ async def rtvi_connect(request: Request) -> Dict[Any, Any]:
     return {
         "room_url": room_url,
         "token": token,
-        "bot_pid": proc.pid
+        "bot_pid": proc.pid,
+        "session_id": session_id_of(proc)
     }
 
 
 @app.get("/status/{pid}")
-def get_status(pid: int):
-    """Get the status of a specific bot process.
+def get_status(pid: str):
+    """Get the status of a specific bot session.
 
     Args:
-        pid (int): Process ID of the bot
+        pid (str): Session id of the bot (the process ID for cold-started bots)
 
     Returns:
         JSONResponse: Status information for the bot
@@ -328,15 +484,14 @@ def get_status(pid: int):
     Raises:
         HTTPException: If the specified bot process is not found
     """
-    # Look up the subprocess
-    proc = bot_procs.get(pid)
+    # Look up the session (running, or recently finished)
+    session = supervisor.get(pid)
 
-    # If the subprocess doesn't exist, return an error
-    if not proc:
+    # If the session doesn't exist, return an error
+    if not session:
         raise HTTPException(status_code=404, detail=f"Bot with process id: {pid} not found")
 
-    # Check the status of the subprocess
-    status = "running" if proc[0].poll() is None else "finished"
+    status = "running" if session.running else "finished"
     return JSONResponse({"bot_id": pid, "status": status})
 
 
@@ -346,6 +501,77 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics: turn stage latency histograms (with p50/p95/p99), sessions and pools"""
+    text = PrometheusText()
+    text.histograms(
+        "voice_turn_stage_latency_seconds",
+        "Latency of each stage of a conversational turn, reported by the bots",
+        turn_latency,
+    )
+
+    sessions = supervisor.stats()
+    text.metric("voice_active_sessions", "gauge", "Bot sessions running",
+                [({}, sessions["active_sessions"])])
+    text.metric("voice_sessions_starting", "gauge", "Admitted sessions whose bot is being started",
+                [({}, sessions["starting"])])
+    text.metric("voice_sessions_admitted_total", "counter", "Sessions admitted",
+                [({}, sessions["admitted"])])
+    text.metric("voice_sessions_rejected_total", "counter", "Sessions refused, by limit hit",
+                [({"reason": reason}, n) for reason, n in sessions["rejected"].items()])
+    text.metric("voice_session_rss_megabytes", "gauge", "Average resident memory per running session",
+                [({}, sessions["session_rss_mb"])])
+    text.metric("voice_host_cpu_utilization", "gauge", "Host CPU utilization (0-1)",
+                [({}, sessions["host_cpu"])])
+    text.metric("voice_host_available_megabytes", "gauge", "Host memory available",
+                [({}, sessions["host_available_mb"])])
+
+    if bot_pool and bot_pool.enabled:
+        pool = bot_pool.stats()
+        text.metric("voice_bot_pool_workers", "gauge", "Pre-warmed bot worker processes",
+                    [({}, pool["workers"])])
+        text.metric("voice_bot_pool_idle_slots", "gauge", "Free session slots on ready workers",
+                    [({}, pool["idle"])])
+        text.metric("voice_bot_pool_starting", "gauge", "Bot workers starting up",
+                    [({}, pool["starting"])])
+        text.metric("voice_bot_pool_requests_total", "counter", "Session handoffs by pool outcome",
+                    [({"result": "hit"}, pool["hits"]), ({"result": "miss"}, pool["misses"])])
+
+    if room_pool and room_pool.enabled:
+        rooms = room_pool.stats()
+        text.metric("voice_room_pool_ready", "gauge", "Pre-created Daily rooms ready",
+                    [({}, rooms["ready"])])
+        text.metric("voice_room_pool_requests_total", "counter", "Room requests by pool outcome",
+                    [({"result": "hit"}, rooms["hits"]), ({"result": "miss"}, rooms["misses"])])
+        text.metric("voice_room_pool_errors_total", "counter", "Failed room creations",
+                    [({}, rooms["errors"])])
+
+    return PlainTextResponse(text.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/sessions")
+async def session_stats():
+    """Active sessions, admission counters and host CPU/memory headroom"""
+    return supervisor.stats()
+
+
+@app.get("/pool")
+async def pool_stats():
+    """Pre-warmed bot worker pool size, hit/miss counts and handoff latency"""
+    if not bot_pool:
+        return {"enabled": False}
+    return bot_pool.stats()
+
+
+@app.get("/room-pool")
+async def room_pool_stats():
+    """Pre-created Daily room pool size, hit/miss counts and room creation latency"""
+    if not room_pool:
+        return {"enabled": False}
+    return room_pool.stats()
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time communication with the frontend"""
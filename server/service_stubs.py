@@ -0,0 +1,345 @@
+#
+# Copyright (c) 2024–2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Local Stand-ins for the OpenAI and Cartesia APIs.
+
+Serves the endpoints the bots call, with configurable latency and no API
+spend, so load tests measure this server rather than the providers:
+- ``POST /v1/chat/completions``: streamed OpenAI-style completions. A user
+  turn that names a product model (WD-*) gets a ``search_knowledge_base``
+  tool call first, like the real assistant; anything else gets a short
+  answer streamed after ``llm_ttft_ms`` at ``tokens_per_sec``
+- ``POST /v1/embeddings``: deterministic unit vectors (a hash of the input)
+- ``GET /tts/websocket``: Cartesia's streaming TTS protocol, answering each
+  sentence with quiet PCM (about 60ms per character) and word timestamps
+  after ``tts_ttfb_ms``
+- ``POST /tts/bytes``: the same audio for Cartesia's HTTP API
+
+Usage:
+    python service_stubs.py [--port 9200] [--llm-ttft-ms 350] [--tts-ttfb-ms 150]
+    OPENAI_BASE_URL=http://localhost:9200/v1 \\
+    CARTESIA_WS_URL=ws://localhost:9200/tts/websocket \\
+    CARTESIA_HTTP_URL=http://localhost:9200/tts/bytes python server.py
+
+GET /_stats returns request counts per endpoint.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import re
+import secrets
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+import numpy as np
+from aiohttp import WSMsgType, web
+
+# Words of the canned answer; a reply is the first ``answer_words`` of these
+ANSWER = (
+    "Thanks for your patience. Based on our support guide, turn off the water supply, "
+    "reseat the filter until it clicks, then flush it for five minutes. If the issue "
+    "continues, I can help you arrange a replacement under warranty."
+).split()
+
+GREETING = "Hi, I'm the Waterdrop support assistant. How can I help you today?"
+
+MODEL_PATTERN = re.compile(r"\bWD-[A-Z0-9-]+", re.IGNORECASE)
+
+# Seconds of speech per character of text, and the synthesized tone's level
+SECONDS_PER_CHAR = 0.06
+TONE_AMPLITUDE = 600
+
+# Cartesia audio is sent in frames of this many seconds
+TTS_CHUNK_SECONDS = 0.1
+
+
+class ServiceStubs:
+    """OpenAI and Cartesia stand-ins.
+
+    Args:
+        llm_ttft_ms: Delay before the first streamed token (or tool call)
+        tokens_per_sec: Rate of the streamed answer after the first token
+        answer_words: Length of each streamed answer
+        embedding_ms: Delay of every embeddings request
+        tts_ttfb_ms: Delay before the first audio chunk of a Cartesia context
+    """
+
+    def __init__(
+        self,
+        llm_ttft_ms: float = 350,
+        tokens_per_sec: float = 80,
+        answer_words: int = 30,
+        embedding_ms: float = 60,
+        tts_ttfb_ms: float = 150,
+    ):
+        self.llm_ttft = llm_ttft_ms / 1000
+        self.token_interval = 1 / tokens_per_sec if tokens_per_sec > 0 else 0
+        self.answer_words = answer_words
+        self.embedding_latency = embedding_ms / 1000
+        self.tts_ttfb = tts_ttfb_ms / 1000
+        self.requests = Counter()
+        self.tts_contexts = 0
+        self.tts_cancelled = 0
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_post("/v1/embeddings", self.embeddings)
+        app.router.add_get("/tts/websocket", self.tts_websocket)
+        app.router.add_post("/tts/bytes", self.tts_bytes)
+        app.router.add_get("/_stats", self.stats)
+        return app
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        self.requests[f"{request.method} {request.path}"] += 1
+        return await handler(request)
+
+    #
+    # OpenAI
+    #
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        messages: List[Dict[str, Any]] = body.get("messages", [])
+        last = messages[-1] if messages else {}
+        user_turns = sum(m.get("role") == "user" for m in messages)
+
+        tool_call = None
+        words = GREETING.split() if not user_turns else ANSWER[: self.answer_words]
+        if body.get("tools") and last.get("role") == "user":
+            query = _text(last.get("content"))
+            if MODEL_PATTERN.search(query):
+                tool_call = {
+                    "index": 0,
+                    "id": f"call_{secrets.token_hex(12)}",
+                    "type": "function",
+                    "function": {
+                        "name": "search_knowledge_base",
+                        "arguments": json.dumps({"query": query}),
+                    },
+                }
+        created = int(time.time())
+        completion_id = f"chatcmpl-{secrets.token_hex(12)}"
+
+        def chunk(delta: Dict[str, Any], finish_reason=None) -> Dict[str, Any]:
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body.get("model", "gpt-4o"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        if not body.get("stream"):
+            await asyncio.sleep(self.llm_ttft)
+            if tool_call:
+                message = {"role": "assistant", "content": None, "tool_calls": [tool_call]}
+            else:
+                message = {"role": "assistant", "content": " ".join(words)}
+            return web.json_response(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": body.get("model", "gpt-4o"),
+                    "choices": [{
+                        "index": 0,
+                        "message": message,
+                        "finish_reason": "tool_calls" if tool_call else "stop",
+                    }],
+                    "usage": _usage(messages, 20 if tool_call else len(words)),
+                }
+            )
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+
+        async def send(data: Dict[str, Any]):
+            await response.write(f"data: {json.dumps(data)}\n\n".encode())
+
+        await asyncio.sleep(self.llm_ttft)
+        if tool_call:
+            await send(chunk({"role": "assistant", "content": None, "tool_calls": [tool_call]}))
+            await send(chunk({}, "tool_calls"))
+            completion_tokens = 20
+        else:
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(self.token_interval)
+                    await send(chunk({"content": " " + word}))
+                else:
+                    await send(chunk({"role": "assistant", "content": word}))
+            await send(chunk({}, "stop"))
+            completion_tokens = len(words)
+        if (body.get("stream_options") or {}).get("include_usage"):
+            await send({**chunk({}), "choices": [], "usage": _usage(messages, completion_tokens)})
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def embeddings(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        inputs = body.get("input", [])
+        if not isinstance(inputs, list) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        dims = int(body.get("dimensions") or 3072)
+        await asyncio.sleep(self.embedding_latency)
+        data = []
+        for i, item in enumerate(inputs):
+            vector = _unit_vector(json.dumps(item), dims)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode()
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        tokens = sum(len(json.dumps(item)) // 4 for item in inputs)
+        return web.json_response(
+            {
+                "object": "list",
+                "data": data,
+                "model": body.get("model", "text-embedding-3-large"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            }
+        )
+
+    #
+    # Cartesia
+    #
+
+    async def tts_websocket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        # Sentences of a context are answered in order, each after the previous one
+        contexts: Dict[str, asyncio.Task] = {}
+        cancelled: set[str] = set()
+
+        async def synthesize(previous, message: Dict[str, Any]):
+            context_id = message["context_id"]
+            if previous:
+                await asyncio.gather(previous, return_exceptions=True)
+            else:
+                self.tts_contexts += 1
+                await asyncio.sleep(self.tts_ttfb)
+            if context_id in cancelled or ws.closed:
+                return
+            text = message.get("transcript", "")
+            if text.strip():
+                rate = message.get("output_format", {}).get("sample_rate") or 24000
+                words = text.split()
+                step = len(text) * SECONDS_PER_CHAR / len(words)
+                await ws.send_json({
+                    "type": "timestamps",
+                    "context_id": context_id,
+                    "word_timestamps": {
+                        "words": words,
+                        "start": [i * step for i in range(len(words))],
+                        "end": [(i + 1) * step for i in range(len(words))],
+                    },
+                })
+                audio = _speech(text, rate)
+                chunk_bytes = int(rate * TTS_CHUNK_SECONDS) * 2
+                for start in range(0, len(audio), chunk_bytes):
+                    if context_id in cancelled:
+                        return
+                    await ws.send_json({
+                        "type": "chunk",
+                        "context_id": context_id,
+                        "data": base64.b64encode(audio[start:start + chunk_bytes]).decode(),
+                        "done": False,
+                    })
+            if not message.get("continue"):
+                await ws.send_json({"type": "done", "context_id": context_id, "done": True})
+                contexts.pop(context_id, None)
+
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            message = json.loads(msg.data)
+            context_id = message.get("context_id")
+            if message.get("cancel"):
+                cancelled.add(context_id)
+                self.tts_cancelled += 1
+                continue
+            contexts[context_id] = asyncio.create_task(
+                synthesize(contexts.get(context_id), message)
+            )
+        for task in contexts.values():
+            task.cancel()
+        return ws
+
+    async def tts_bytes(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await asyncio.sleep(self.tts_ttfb)
+        rate = body.get("output_format", {}).get("sample_rate") or 24000
+        return web.Response(body=_speech(body.get("transcript", ""), rate))
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "requests": dict(self.requests),
+                "tts_contexts": self.tts_contexts,
+                "tts_cancelled": self.tts_cancelled,
+                "time": time.time(),
+            }
+        )
+
+
+def _text(content) -> str:
+    # Message content is a string or a list of typed parts
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def _usage(messages: List[Dict[str, Any]], completion_tokens: int) -> Dict[str, int]:
+    prompt_tokens = sum(len(_text(m.get("content"))) for m in messages) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _unit_vector(text: str, dims: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dims).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def _speech(text: str, sample_rate: int) -> bytes:
+    """A quiet 220Hz tone as long as the text would take to say (16-bit mono PCM)."""
+    t = np.arange(int(len(text) * SECONDS_PER_CHAR * sample_rate)) / sample_rate
+    return (TONE_AMPLITUDE * np.sin(2 * np.pi * 220 * t)).astype(np.int16).tobytes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-ins for the OpenAI and Cartesia APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--llm-ttft-ms", type=float, default=350, help="Delay before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=80, help="Streamed answer rate")
+    parser.add_argument("--embedding-ms", type=float, default=60, help="Embeddings request delay")
+    parser.add_argument("--tts-ttfb-ms", type=float, default=150, help="Delay before the first audio")
+    args = parser.parse_args()
+
+    stubs = ServiceStubs(
+        llm_ttft_ms=args.llm_ttft_ms,
+        tokens_per_sec=args.tokens_per_sec,
+        embedding_ms=args.embedding_ms,
+        tts_ttfb_ms=args.tts_ttfb_ms,
+    )
+    print(f"OpenAI stub on http://{args.host}:{args.port}/v1, "
+          f"Cartesia stub on ws://{args.host}:{args.port}/tts/websocket")
+    web.run_app(stubs.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
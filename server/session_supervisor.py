@@ -0,0 +1,349 @@
+#
+# Copyright (c) 2024–2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Bot Session Supervisor.
+
+server.py used to keep every bot it started in a plain dict that was never
+pruned. Each /start found room occupancy by calling ``poll()`` on every
+process, and shutdown terminated and waited on bots one at a time. The
+supervisor replaces that dict:
+- Reaps sessions as they end. Cold-started bots are watched through a pidfd
+  on the event loop, which is how asyncio's own PidfdChildWatcher works; a
+  thread blocked in ``wait()`` is the fallback where pidfds are unavailable.
+  Pooled sessions end on the worker's ``session_ended`` event.
+- Keeps a room -> sessions index, so room occupancy is a dict lookup
+- Admits new sessions only while the host has CPU and memory headroom
+- Terminates all bots in parallel on shutdown
+
+Finished sessions are kept in a bounded list so /status can still report
+them as finished.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Set
+
+# Most concurrent sessions on this host (0 = no fixed limit, headroom only)
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "0"))
+
+# Refuse new sessions while host CPU utilization (0-1, all cores) is above this
+ADMISSION_MAX_CPU = float(os.getenv("ADMISSION_MAX_CPU", "0.85"))
+
+# Memory that must stay available after admitting a session, in MB
+ADMISSION_MIN_FREE_MB = int(os.getenv("ADMISSION_MIN_FREE_MB", "512"))
+
+# Assumed RSS of a new session until running sessions have been measured, in MB
+ADMISSION_SESSION_MB = int(os.getenv("ADMISSION_SESSION_MB", "400"))
+
+# Finished sessions remembered for /status
+FINISHED_HISTORY = 1000
+
+# Seconds bots get to exit after SIGTERM on shutdown before they are killed
+SHUTDOWN_TIMEOUT = float(os.getenv("BOT_SHUTDOWN_TIMEOUT", "10"))
+
+
+class AdmissionError(Exception):
+    """A session was refused because a room or host limit has been reached.
+
+    ``kind`` is "room" when the room is full, otherwise the host limit hit
+    ("sessions", "cpu" or "memory").
+    """
+
+    def __init__(self, message: str, kind: str):
+        super().__init__(message)
+        self.kind = kind
+
+
+@dataclass
+class BotSession:
+    """A tracked bot session and its process handle (Popen or PooledSession)."""
+
+    session_id: str
+    proc: Any
+    room_url: str
+    started_at: float = field(default_factory=time.monotonic)
+    returncode: Optional[int] = None
+
+    @property
+    def running(self) -> bool:
+        return self.returncode is None
+
+
+class HostMonitor:
+    """CPU utilization and available memory from /proc.
+
+    CPU is measured between successive readings (at most once a second), so it
+    reflects recent load rather than the 1-minute load average. On hosts
+    without /proc every reading is None and admission falls back to
+    MAX_SESSIONS alone.
+    """
+
+    def __init__(self):
+        self._cpu_times: Optional[tuple[int, int]] = self._read_cpu_times()
+        self._cpu_read_at = time.monotonic()
+        self._cpu: Optional[float] = None
+
+    @staticmethod
+    def _read_cpu_times() -> Optional[tuple[int, int]]:
+        try:
+            with open("/proc/stat") as f:
+                values = [int(v) for v in f.readline().split()[1:]]
+        except (OSError, ValueError):
+            return None
+        # idle + iowait
+        idle = values[3] + (values[4] if len(values) > 4 else 0)
+        return idle, sum(values)
+
+    def cpu_utilization(self) -> Optional[float]:
+        now = time.monotonic()
+        if now - self._cpu_read_at >= 1.0:
+            times = self._read_cpu_times()
+            if times and self._cpu_times:
+                idle = times[0] - self._cpu_times[0]
+                total = times[1] - self._cpu_times[1]
+                if total > 0:
+                    self._cpu = 1 - idle / total
+            self._cpu_times, self._cpu_read_at = times, now
+        return self._cpu
+
+    @staticmethod
+    def available_mb() -> Optional[float]:
+        try:
+            with open("/proc/meminfo") as f:
+                for line in f:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) / 1024
+        except (OSError, ValueError):
+            pass
+        return None
+
+    @staticmethod
+    def rss_mb(pid: int) -> Optional[float]:
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                pages = int(f.read().split()[1])
+        except (OSError, ValueError, IndexError):
+            return None
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class SessionSupervisor:
+    """Tracks running bot sessions, reaps them and decides admission.
+
+    Args:
+        max_sessions: Most concurrent sessions (0 = no fixed limit)
+        max_per_room: Most concurrent sessions in one room
+        max_cpu: CPU utilization above which new sessions are refused
+        min_free_mb: Memory that must remain available after a new session
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = MAX_SESSIONS,
+        max_per_room: int = 1,
+        max_cpu: float = ADMISSION_MAX_CPU,
+        min_free_mb: int = ADMISSION_MIN_FREE_MB,
+    ):
+        self.max_sessions = max_sessions
+        self.max_per_room = max_per_room
+        self.max_cpu = max_cpu
+        self.min_free_mb = min_free_mb
+        self._sessions: Dict[str, BotSession] = {}
+        self._rooms: Dict[str, Set[str]] = {}
+        # Admitted but not yet registered, per room (a bot is being started)
+        self._pending: Dict[str, int] = {}
+        self._finished: "OrderedDict[str, BotSession]" = OrderedDict()
+        self._reapers: Set[asyncio.Task] = set()
+        self._monitor = HostMonitor()
+        self._admitted = 0
+        self._rejected: Dict[str, int] = {}
+
+    @property
+    def active(self) -> int:
+        return len(self._sessions)
+
+    def room_occupancy(self, room_url: str) -> int:
+        return len(self._rooms.get(room_url, ())) + self._pending.get(room_url, 0)
+
+    def admit(self, room_url: Optional[str] = None) -> str:
+        """Reserve a slot for a new session or refuse it.
+
+        Every successful call must be followed by ``register()`` or
+        ``release()`` with the returned reservation.
+
+        Args:
+            room_url: Room the session joins, if already known
+
+        Returns:
+            The reservation to pass to ``register()`` or ``release()``
+
+        Raises:
+            AdmissionError: If the room or the host is full
+        """
+        refusal = self._refusal(room_url)
+        if refusal:
+            kind, reason = refusal
+            self._rejected[kind] = self._rejected.get(kind, 0) + 1
+            raise AdmissionError(reason, kind)
+        key = room_url or ""
+        self._pending[key] = self._pending.get(key, 0) + 1
+        self._admitted += 1
+        return key
+
+    def release(self, reservation: str):
+        """Give back a slot reserved by ``admit()`` whose bot never started."""
+        if self._pending.get(reservation, 0) > 1:
+            self._pending[reservation] -= 1
+        else:
+            self._pending.pop(reservation, None)
+
+    def _refusal(self, room_url: Optional[str]) -> Optional[tuple[str, str]]:
+        """The kind of limit hit and a message for the client, or None to admit."""
+        if room_url and self.room_occupancy(room_url) >= self.max_per_room:
+            return "room", f"Max bot limit reached for room: {room_url}"
+        starting = sum(self._pending.values())
+        if self.max_sessions and self.active + starting >= self.max_sessions:
+            return "sessions", f"Max sessions reached on this host ({self.max_sessions})"
+        cpu = self._monitor.cpu_utilization()
+        if cpu is not None and cpu > self.max_cpu:
+            return "cpu", f"Host CPU at {cpu:.0%}"
+        available = self._monitor.available_mb()
+        # Bots being started have not allocated their memory yet
+        needed = self.min_free_mb + (starting + 1) * self._session_mb()
+        if available is not None and available < needed:
+            return "memory", f"Host memory low ({available:.0f} MB available)"
+        return None
+
+    def _session_mb(self) -> float:
+        """Measured RSS per running session, or the configured estimate."""
+        rss, sessions = self._rss()
+        return rss / sessions if sessions else ADMISSION_SESSION_MB
+
+    def _rss(self) -> tuple[float, int]:
+        # Pooled sessions can share a worker process; count each process once
+        by_pid: Dict[int, int] = {}
+        for session in self._sessions.values():
+            by_pid[session.proc.pid] = by_pid.get(session.proc.pid, 0) + 1
+        rss, sessions = 0.0, 0
+        for pid, count in by_pid.items():
+            mb = self._monitor.rss_mb(pid)
+            if mb is not None:
+                rss += mb
+                sessions += count
+        return rss, sessions
+
+    def register(self, reservation: str, session_id: str, proc, room_url: str) -> BotSession:
+        """Track a started bot and reap it when it ends.
+
+        Args:
+            reservation: Returned by ``admit()`` for this session
+            session_id: Session id returned to the client
+            proc: subprocess.Popen or PooledSession
+            room_url: Room the session joined
+        """
+        self.release(reservation)
+        session = BotSession(session_id, proc, room_url)
+        self._sessions[session_id] = session
+        self._rooms.setdefault(room_url, set()).add(session_id)
+        task = asyncio.create_task(self._reap(session))
+        self._reapers.add(task)
+        task.add_done_callback(self._reapers.discard)
+        return session
+
+    def get(self, session_id: str) -> Optional[BotSession]:
+        return self._sessions.get(session_id) or self._finished.get(session_id)
+
+    async def _reap(self, session: BotSession):
+        try:
+            if hasattr(session.proc, "wait_async"):
+                returncode = await session.proc.wait_async()
+            else:
+                returncode = await wait_process(session.proc)
+        except asyncio.CancelledError:
+            return
+        self._finish(session, returncode)
+
+    def _finish(self, session: BotSession, returncode: Optional[int]):
+        session.returncode = returncode if returncode is not None else 0
+        self._sessions.pop(session.session_id, None)
+        room = self._rooms.get(session.room_url)
+        if room is not None:
+            room.discard(session.session_id)
+            if not room:
+                del self._rooms[session.room_url]
+        self._finished[session.session_id] = session
+        while len(self._finished) > FINISHED_HISTORY:
+            self._finished.popitem(last=False)
+        print(
+            f"Bot session {session.session_id} ended after "
+            f"{time.monotonic() - session.started_at:.0f}s (exit {session.returncode})"
+        )
+
+    async def shutdown(self, timeout: float = SHUTDOWN_TIMEOUT):
+        """Terminate every bot at once, then kill whatever is left after ``timeout``."""
+        sessions = list(self._sessions.values())
+        if not sessions:
+            return
+        # Several pooled sessions may share one worker; signal each process once
+        procs = {session.proc.pid: session.proc for session in sessions}
+        for proc in procs.values():
+            proc.terminate()
+        if self._reapers:
+            _, pending = await asyncio.wait(list(self._reapers), timeout=timeout)
+            if pending:
+                for proc in procs.values():
+                    if proc.poll() is None:
+                        proc.kill()
+                await asyncio.wait(pending, timeout=timeout)
+        print(f"Stopped {len(sessions)} bot session(s) in {len(procs)} process(es)")
+
+    def stats(self) -> Dict[str, Any]:
+        """Active sessions, rooms, admission counters and host headroom."""
+        rss, measured = self._rss()
+        cpu = self._monitor.cpu_utilization()
+        available = self._monitor.available_mb()
+        return {
+            "active_sessions": self.active,
+            "starting": sum(self._pending.values()),
+            "rooms": len(self._rooms),
+            "max_sessions": self.max_sessions or None,
+            "admitted": self._admitted,
+            "rejected": dict(self._rejected),
+            "session_rss_mb": round(rss / measured, 1) if measured else None,
+            "host_cpu": round(cpu, 3) if cpu is not None else None,
+            "host_available_mb": round(available) if available is not None else None,
+        }
+
+
+async def wait_process(proc) -> Optional[int]:
+    """Wait for a subprocess.Popen to exit without polling or blocking the event loop.
+
+    Returns:
+        The exit code, once the child has been reaped.
+    """
+    try:
+        fd = os.pidfd_open(proc.pid)
+    except (AttributeError, OSError):
+        # No pidfd support (or the child is already gone): block a thread instead
+        return await asyncio.to_thread(proc.wait)
+
+    loop = asyncio.get_running_loop()
+    exited = loop.create_future()
+
+    def on_exit():
+        if not exited.done():
+            exited.set_result(None)
+
+    loop.add_reader(fd, on_exit)
+    try:
+        await exited
+    finally:
+        loop.remove_reader(fd)
+        os.close(fd)
+    return proc.wait()
@@ -0,0 +1,205 @@
+#
+# Copyright (c) 2024–2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Shared Silero VAD.
+
+Every ``SileroVADAnalyzer()`` loads its own onnxruntime session, with its own
+model copy and thread pool. With dozens of sessions per host, the threads
+oversubscribe the cores and VAD latency goes up. This module keeps one
+session per bot process, sized by an explicit thread budget (``VAD_THREADS``,
+set by server.py for each worker), and batches inference across the
+process's sessions.
+
+Each analyzer keeps its own recurrent state and only the ONNX session is
+shared. Requests that arrive while a batch is running go into the next batch,
+so a lone session never waits for company. Per-frame VAD latency percentiles
+are available from ``stats()``.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import onnxruntime
+from loguru import logger
+
+from pipecat.audio.vad.silero import SileroOnnxModel, SileroVADAnalyzer
+from pipecat.audio.vad.vad_analyzer import VADAnalyzer, VADParams
+
+# Intra-op threads for the process-wide session (server.py sets this per worker)
+VAD_THREADS = int(os.getenv("VAD_THREADS", "1"))
+# Most analyzer requests answered by one inference call
+VAD_MAX_BATCH = int(os.getenv("VAD_MAX_BATCH", "32"))
+
+
+def silero_model_path() -> str:
+    from importlib import resources
+
+    return str(resources.files("pipecat.audio.vad.data").joinpath("silero_vad.onnx"))
+
+
+class _Request:
+    __slots__ = ("inputs", "outputs", "error", "done")
+
+    def __init__(self, inputs: Dict[str, np.ndarray]):
+        self.inputs = inputs
+        self.outputs: Optional[List[np.ndarray]] = None
+        self.error: Optional[Exception] = None
+        self.done = threading.Event()
+
+
+class SharedSileroSession:
+    """One Silero onnxruntime session that batches calls from many analyzers.
+
+    ``run()`` has the signature of ``InferenceSession.run`` so pipecat's
+    SileroOnnxModel can use it unchanged; it blocks the calling (transport
+    executor) thread until its batch has run.
+
+    Args:
+        threads: onnxruntime intra-op thread budget
+        max_batch: Most requests per inference call
+    """
+
+    def __init__(self, threads: int = VAD_THREADS, max_batch: int = VAD_MAX_BATCH):
+        opts = onnxruntime.SessionOptions()
+        opts.inter_op_num_threads = 1
+        opts.intra_op_num_threads = max(1, threads)
+        self._session = onnxruntime.InferenceSession(
+            silero_model_path(), providers=["CPUExecutionProvider"], sess_options=opts
+        )
+        self.threads = max(1, threads)
+        self._max_batch = max_batch
+        self._pending: List[_Request] = []
+        self._cond = threading.Condition()
+        self._runs = 0
+        self._requests = 0
+        self._thread = threading.Thread(target=self._batch_loop, name="vad-batch", daemon=True)
+        self._thread.start()
+        logger.debug(f"Loaded shared Silero VAD ({self.threads} thread(s))")
+
+    def run(self, output_names, inputs: Dict[str, np.ndarray]) -> List[np.ndarray]:
+        request = _Request(inputs)
+        with self._cond:
+            self._pending.append(request)
+            self._cond.notify()
+        request.done.wait()
+        if request.error:
+            raise request.error
+        return request.outputs
+
+    def _batch_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                batch = self._pending[: self._max_batch]
+                self._pending = self._pending[self._max_batch :]
+
+            # One call per sample rate (the model takes a single "sr")
+            groups: Dict[int, List[_Request]] = {}
+            for request in batch:
+                groups.setdefault(int(request.inputs["sr"]), []).append(request)
+            for sr, group in groups.items():
+                self._run_group(sr, group)
+
+    def _run_group(self, sr: int, group: List[_Request]):
+        try:
+            # Analyzers run with batch size 1, so rows and state columns stack directly
+            x = np.concatenate([r.inputs["input"] for r in group], axis=0)
+            state = np.concatenate([r.inputs["state"] for r in group], axis=1)
+            out, new_state = self._session.run(
+                None, {"input": x, "state": state, "sr": np.array(sr, dtype="int64")}
+            )
+            for i, request in enumerate(group):
+                request.outputs = [out[i : i + 1], new_state[:, i : i + 1]]
+        except Exception as e:
+            for request in group:
+                request.error = e
+        finally:
+            self._runs += 1
+            self._requests += len(group)
+            for request in group:
+                request.done.set()
+
+    def stats(self) -> Dict[str, float]:
+        """Inference calls, analyzer requests and average batch size."""
+        return {
+            "threads": self.threads,
+            "runs": self._runs,
+            "requests": self._requests,
+            "avg_batch": round(self._requests / self._runs, 2) if self._runs else 0.0,
+        }
+
+
+class _SharedSileroModel(SileroOnnxModel):
+    """Per-analyzer Silero state on top of the shared session."""
+
+    def __init__(self, session: SharedSileroSession):
+        self.session = session
+        self.reset_states()
+        self.sample_rates = [8000, 16000]
+
+
+class SharedSileroVADAnalyzer(SileroVADAnalyzer):
+    """SileroVADAnalyzer that uses the process-wide session instead of loading its own.
+
+    Args:
+        session: Shared session (defaults to the process-wide one)
+        sample_rate: Audio sample rate
+        params: VAD parameters
+    """
+
+    def __init__(
+        self,
+        *,
+        session: Optional[SharedSileroSession] = None,
+        sample_rate: Optional[int] = None,
+        params: Optional[VADParams] = None,
+    ):
+        VADAnalyzer.__init__(self, sample_rate=sample_rate, params=params)
+        self._model = _SharedSileroModel(session or shared_session())
+        self._last_reset_time = 0
+        self._latencies: deque = deque(maxlen=4096)
+        self._latencies_lock = threading.Lock()
+
+    def voice_confidence(self, buffer) -> float:
+        start = time.perf_counter()
+        confidence = super().voice_confidence(buffer)
+        with self._latencies_lock:
+            self._latencies.append(time.perf_counter() - start)
+        return confidence
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-frame VAD latency percentiles (ms) for this analyzer, plus the shared session stats."""
+        with self._latencies_lock:
+            latencies = np.array(self._latencies) * 1000
+        report: Dict[str, Any] = {"frames": len(latencies)}
+        if len(latencies):
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            report.update({"p50_ms": round(float(p50), 3), "p95_ms": round(float(p95), 3), "p99_ms": round(float(p99), 3)})
+        report["session"] = self._model.session.stats()
+        return report
+
+
+_shared_session: Optional[SharedSileroSession] = None
+_shared_lock = threading.Lock()
+
+
+def shared_session() -> SharedSileroSession:
+    """The process-wide session, created on first use."""
+    global _shared_session
+    with _shared_lock:
+        if _shared_session is None:
+            _shared_session = SharedSileroSession()
+        return _shared_session
+
+
+def create_vad_analyzer() -> SharedSileroVADAnalyzer:
+    """A VAD analyzer for one session; cheap once the shared session exists."""
+    return SharedSileroVADAnalyzer()
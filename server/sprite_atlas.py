@@ -0,0 +1,161 @@
+"""
+Raw RGB sprite atlas for the bot's avatar animation.
+
+Decoding assets/robot0*.png with PIL in every bot process costs startup time
+and keeps ~44 MB of identical bitmaps resident per process. The build step
+packs all frames into one uncompressed file:
+
+    header (64 bytes): magic, version, frame count, width, height, channels
+    frames:            count * height * width * channels bytes of RGB pixels
+
+Bot processes memory-map the atlas read-only, so every process on a host shares
+the same page-cache copy and frames are views into the mapping until they are
+first sent.
+
+Usage:
+    python sprite_atlas.py build [--assets ./assets] [--output ./assets/robot.atlas]
+"""
+import argparse
+import glob
+import mmap
+import os
+import re
+import struct
+from typing import List, Tuple
+
+from pipecat.frames.frames import OutputImageRawFrame
+
+MAGIC = b"SPRATLAS"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIIH")
+HEADER_SIZE = 64
+
+ATLAS_FILE = "robot.atlas"
+SPRITE_PATTERN = "robot0*.png"
+
+
+class AtlasImageFrame(OutputImageRawFrame):
+    """
+    OutputImageRawFrame whose pixels stay in the memory-mapped atlas until used.
+
+    daily-python's camera only accepts ``bytes`` (a memoryview is rejected), so
+    the first read of ``image`` copies the frame out of the mapping once and
+    later reads reuse that copy; the animation replays the same frames at the
+    full frame rate. Processes that never send a frame (audio-only sessions,
+    other output sizes) never hold its bytes.
+    """
+
+    def __init__(self, view: memoryview, size: Tuple[int, int], format: str = "RGB"):
+        self._view = view
+        self._bytes = None
+        super().__init__(image=b"", size=size, format=format)
+
+    @property
+    def image(self) -> bytes:
+        if self._bytes is None:
+            self._bytes = self._view.tobytes()
+        return self._bytes
+
+    @image.setter
+    def image(self, value: bytes):
+        # Set by the dataclass __init__; the pixels always come from the atlas
+        pass
+
+
+def sprite_paths(asset_dir: str) -> List[str]:
+    """
+    Sprite PNGs in animation order (robot01 ... robot025).
+    """
+    def frame_number(path: str) -> int:
+        return int(re.search(r"robot0(\d+)\.png$", path).group(1))
+
+    return sorted(glob.glob(os.path.join(asset_dir, SPRITE_PATTERN)), key=frame_number)
+
+
+def build_atlas(asset_dir: str, output_path: str) -> Tuple[int, Tuple[int, int]]:
+    """
+    Decodes the sprite PNGs once and writes the raw atlas.
+    Returns the frame count and frame size.
+    """
+    from PIL import Image
+
+    paths = sprite_paths(asset_dir)
+    if not paths:
+        raise FileNotFoundError(f"No {SPRITE_PATTERN} files in {asset_dir}")
+
+    size = None
+    tmp = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(b"\0" * HEADER_SIZE)
+        for path in paths:
+            with Image.open(path) as img:
+                img = img.convert("RGB")
+                if size is None:
+                    size = img.size
+                elif img.size != size:
+                    raise ValueError(f"{path} is {img.size}, expected {size}")
+                f.write(img.tobytes())
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, len(paths), size[0], size[1], 3))
+    os.replace(tmp, output_path)
+    return len(paths), size
+
+
+def is_stale(asset_dir: str, atlas_path: str) -> bool:
+    """
+    Whether the atlas is missing or older than any sprite PNG.
+    """
+    if not os.path.exists(atlas_path):
+        return True
+    built = os.path.getmtime(atlas_path)
+    return any(os.path.getmtime(path) > built for path in sprite_paths(asset_dir))
+
+
+def load_atlas(atlas_path: str) -> Tuple[List[memoryview], Tuple[int, int]]:
+    """
+    Maps the atlas read-only and returns one zero-copy view per frame plus the frame size.
+    """
+    with open(atlas_path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, count, width, height, channels = HEADER.unpack_from(mapping)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{atlas_path} is not a version {VERSION} sprite atlas")
+    frame_bytes = width * height * channels
+    if len(mapping) < HEADER_SIZE + count * frame_bytes:
+        raise ValueError(f"{atlas_path} is truncated")
+    data = memoryview(mapping)
+    views = [
+        data[HEADER_SIZE + i * frame_bytes : HEADER_SIZE + (i + 1) * frame_bytes]
+        for i in range(count)
+    ]
+    return views, (width, height)
+
+
+def load_sprite_frames(asset_dir: str) -> List[AtlasImageFrame]:
+    """
+    Avatar frames backed by the atlas, building it first if it is missing or stale.
+    """
+    atlas_path = os.path.join(asset_dir, ATLAS_FILE)
+    if is_stale(asset_dir, atlas_path):
+        build_atlas(asset_dir, atlas_path)
+    views, size = load_atlas(atlas_path)
+    return [AtlasImageFrame(view, size) for view in views]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the avatar sprite atlas")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Pack the sprite PNGs into a raw RGB atlas")
+    build.add_argument("--assets", default=os.path.join(os.path.dirname(__file__), "assets"))
+    build.add_argument("--output", default=None, help=f"Defaults to <assets>/{ATLAS_FILE}")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        output = args.output or os.path.join(args.assets, ATLAS_FILE)
+        count, size = build_atlas(args.assets, output)
+        print(f"Wrote {count} frames of {size[0]}x{size[1]} to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Cold start profile for the bot and the server.
+
+Imports each entry point in a fresh interpreter with ``python -X importtime``
+and reports:
+- wall time of the import (median over --repeat runs)
+- the modules it loaded and the packages their import time went to
+- its direct imports, by cumulative time, i.e. what to make lazy next
+- for the bot, the deferred initialization steps a pool worker runs before it
+  reports ready (knowledge base, sprites, transport/TTS modules, Silero)
+
+Like retrieval_bench.py it doubles as a regression gate:
+    python startup_profile.py
+    python startup_profile.py --write-baseline benchmarks/startup_baseline.json
+    python startup_profile.py --baseline benchmarks/startup_baseline.json   # exits 1 on regression
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Entry points and the zero-argument callables timed after the import
+TARGETS = {
+    "bot-openai.py": ["_load_knowledge_base", "avatar_frames", "import_session_modules", "shared_session"],
+    "server.py": [],
+}
+
+# Runs in the profiled interpreter: import the file as a module, then time each step
+CHILD = r"""
+import importlib.util, json, sys, time
+IMPORTED = "STARTUP_PROFILE_IMPORTED"
+path, steps = sys.argv[1], sys.argv[2:]
+preloaded = sorted(sys.modules)
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location("profiled_entry_point", path)
+module = importlib.util.module_from_spec(spec)
+sys.modules[spec.name] = module
+spec.loader.exec_module(module)
+result = {"import_ms": (time.perf_counter() - started) * 1000, "preloaded": preloaded, "steps": {}}
+print(IMPORTED, file=sys.stderr, flush=True)
+for step in steps:
+    step_started = time.perf_counter()
+    try:
+        getattr(module, step)()
+        result["steps"][step] = round((time.perf_counter() - step_started) * 1000, 1)
+    except Exception as e:
+        result["steps"][step] = f"{type(e).__name__}: {e}"
+print("STARTUP_PROFILE " + json.dumps(result), flush=True)
+"""
+
+# Written to stderr between the import and the steps
+IMPORTED = "STARTUP_PROFILE_IMPORTED"
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def parse_importtime(stderr: str, preloaded: set) -> List[dict]:
+    """(module, self µs, cumulative µs, depth) for each module the import loaded."""
+    modules = []
+    # Modules the steps import afterwards are part of the steps' time
+    for line in stderr.split(IMPORTED)[0].splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if not match or match.group(4) in preloaded:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules.append({
+            "module": name,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            # importtime indents nested imports by two spaces after one leading space
+            "depth": max(0, (len(indent) - 1) // 2),
+        })
+    return modules
+
+
+def profile_once(target: str, steps: List[str], timeout: float) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, os.path.join(SCRIPT_DIR, target), *steps],
+        cwd=SCRIPT_DIR,
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+    )
+    lines = [l for l in completed.stdout.splitlines() if l.startswith("STARTUP_PROFILE ")]
+    if not lines:
+        tail = "\n".join(completed.stderr.splitlines()[-5:])
+        raise RuntimeError(f"{target} did not import (exit {completed.returncode}):\n{tail}")
+    result = json.loads(lines[-1][len("STARTUP_PROFILE "):])
+    result["modules"] = parse_importtime(completed.stderr, set(result.pop("preloaded")))
+    return result
+
+
+def profile_target(target: str, steps: List[str], repeat: int = 3, top: int = 12, timeout: float = 300) -> dict:
+    """Profile of one entry point; the run with the median import time is reported."""
+    # The first run also writes .pyc files, which later runs (and real cold starts) reuse
+    profile_once(target, [], timeout)
+    runs = sorted((profile_once(target, steps, timeout) for _ in range(repeat)), key=lambda r: r["import_ms"])
+    run = runs[len(runs) // 2]
+
+    packages: Dict[str, int] = {}
+    for module in run["modules"]:
+        package = module["module"].split(".")[0]
+        packages[package] = packages.get(package, 0) + module["self_us"]
+    direct = [m for m in run["modules"] if m["depth"] == 0]
+
+    return {
+        "target": target,
+        "import_ms": round(statistics.median(r["import_ms"] for r in runs), 1),
+        "modules": len(run["modules"]),
+        "packages": {
+            name: round(us / 1000, 1)
+            for name, us in sorted(packages.items(), key=lambda p: -p[1])[:top]
+        },
+        "direct_imports": {
+            m["module"]: round(m["cumulative_us"] / 1000, 1)
+            for m in sorted(direct, key=lambda m: -m["cumulative_us"])[:top]
+        },
+        "steps": run["steps"],
+    }
+
+
+def regressions(report: List[dict], baseline: List[dict], max_slowdown: float, min_ms: float) -> List[str]:
+    """
+    Differences from a baseline report that should fail the run. Times must grow
+    by both max_slowdown and min_ms, so small imports do not fail on noise.
+    """
+    previous = {r["target"]: r for r in baseline}
+    failures = []
+
+    def check(name: str, before, after):
+        if not isinstance(before, (int, float)) or not isinstance(after, (int, float)):
+            return
+        if after > before * max_slowdown and after - before > min_ms:
+            failures.append(f"{name}: {before}ms -> {after}ms")
+
+    for result in report:
+        base = previous.get(result["target"])
+        if not base:
+            continue
+        check(f"{result['target']} import", base["import_ms"], result["import_ms"])
+        for step, ms in result["steps"].items():
+            check(f"{result['target']} {step}", base["steps"].get(step), ms)
+    return failures
+
+
+def print_report(report: List[dict]):
+    for r in report:
+        print(f"{r['target']}: import {r['import_ms']:.0f}ms, {r['modules']} modules")
+        print("  packages (self ms):   " + ", ".join(f"{k} {v:.0f}" for k, v in r["packages"].items()))
+        print("  direct imports (ms):  " + ", ".join(f"{k} {v:.0f}" for k, v in r["direct_imports"].items()))
+        for step, ms in r["steps"].items():
+            print(f"  {step:<24} {ms if isinstance(ms, str) else f'{ms:.0f}ms'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time and startup profile of the bot and server")
+    parser.add_argument("--targets", default=",".join(TARGETS), help="Comma-separated entry points")
+    parser.add_argument("--repeat", type=int, default=3, help="Profiled runs per entry point")
+    parser.add_argument("--no-steps", action="store_true", help="Only profile the imports")
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument("--baseline", help="Fail if import or startup steps got slower than this report")
+    parser.add_argument("--max-slowdown", type=float, default=1.25, help="Allowed ratio to the baseline")
+    parser.add_argument("--min-ms", type=float, default=50.0, help="Ignore slowdowns smaller than this")
+    parser.add_argument("--write-baseline", help="Save the report as a baseline")
+    args = parser.parse_args()
+
+    report = [
+        profile_target(target, [] if args.no_steps else TARGETS.get(target, []), repeat=args.repeat)
+        for target in args.targets.split(",")
+    ]
+    print_report(report)
+
+    for path in filter(None, (args.json, args.write_baseline)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = regressions(report, json.load(f), args.max_slowdown, args.min_ms)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
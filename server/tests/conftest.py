@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The bot modules import each other by name from the server directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
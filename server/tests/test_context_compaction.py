@@ -0,0 +1,139 @@
+from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContext
+
+from context_compaction import (
+    SUMMARY_PREFIX,
+    ContextCompactor,
+    PendingSummary,
+    compaction_cut,
+    is_summary,
+)
+from product_models import SUMMARY_NAME
+
+SYSTEM = {"role": "system", "content": "You are a support agent."}
+
+
+def user(text):
+    return {"role": "user", "content": text}
+
+
+def assistant(text):
+    return {"role": "assistant", "content": text}
+
+
+def conversation(turns):
+    messages = [SYSTEM]
+    for i in range(turns):
+        messages += [user(f"question {i}"), assistant(f"answer {i}")]
+    return messages
+
+
+def summary(text="Symptom: leak"):
+    return {"role": "system", "name": SUMMARY_NAME, "content": f"{SUMMARY_PREFIX}\n{text}"}
+
+
+def test_no_cut_until_there_are_more_user_turns_than_kept():
+    assert compaction_cut(conversation(3), keep_turns=3) is None
+    assert compaction_cut(conversation(4), keep_turns=3) == 3
+
+
+def test_cut_lands_on_a_user_message_after_tool_results():
+    messages = [
+        SYSTEM,
+        user("my filter leaks"),
+        {"role": "assistant", "tool_calls": [{"id": "1", "function": {"name": "kb", "arguments": "{}"}}]},
+        {"role": "tool", "tool_call_id": "1", "content": "Check the O-ring."},
+        assistant("Check the O-ring."),
+        user("still leaks"),
+        assistant("Replace it."),
+    ]
+    cut = compaction_cut(messages, keep_turns=1)
+    assert cut == 5
+    assert messages[cut]["role"] == "user"
+
+
+def test_zero_keep_turns_compacts_everything_after_the_system_prompt():
+    messages = conversation(2)
+    assert compaction_cut(messages, keep_turns=0) == len(messages)
+
+
+def test_a_lone_earlier_summary_is_not_summarized_again():
+    messages = [SYSTEM, summary(), user("next"), assistant("ok")]
+    assert compaction_cut(messages, keep_turns=1) is None
+    assert compaction_cut(messages, keep_turns=0) == 4
+
+
+def test_system_prompt_is_never_counted_as_a_turn():
+    messages = [user("system prompt sent as user"), user("a"), user("b")]
+    assert compaction_cut(messages, keep_turns=2) is None
+
+
+def compactor_with_summary(messages, cut, text="Symptom: leak"):
+    compactor = ContextCompactor(threshold=0, keep_turns=1)
+    compactor._pending = PendingSummary(replaced=list(messages[1:cut]), model=None, started_at=0, text=text)
+    return compactor
+
+
+def test_summary_replaces_the_summarized_turns():
+    messages = conversation(3)
+    context = OpenAILLMContext(messages)
+    compactor = compactor_with_summary(messages, cut=5)
+    context.add_message(user("new question"))
+
+    compactor._apply_summary(context)
+
+    result = context.get_messages()
+    assert result[0] is SYSTEM
+    assert is_summary(result[1])
+    assert result[1]["content"] == f"{SUMMARY_PREFIX}\nSymptom: leak"
+    assert [m["content"] for m in result[2:]] == ["question 2", "answer 2", "new question"]
+    assert compactor.stats()["compactions"] == 1
+    assert compactor._pending is None
+
+
+def test_summary_is_discarded_after_a_context_reset():
+    messages = conversation(3)
+    context = OpenAILLMContext(messages)
+    compactor = compactor_with_summary(messages, cut=5)
+    # Same content, new message objects: the context was replaced, not appended to
+    context.set_messages([dict(m) for m in messages])
+
+    compactor._apply_summary(context)
+
+    assert context.get_messages() == messages
+    assert compactor.stats()["discarded"] == 1
+    assert compactor.stats()["compactions"] == 0
+    assert compactor._pending is None
+
+
+def test_summary_is_discarded_when_the_context_shrank():
+    messages = conversation(3)
+    context = OpenAILLMContext(messages)
+    compactor = compactor_with_summary(messages, cut=5)
+    context.set_messages(messages[:3])
+
+    compactor._apply_summary(context)
+
+    assert len(context.get_messages()) == 3
+    assert compactor.stats()["discarded"] == 1
+
+
+def test_unfinished_summary_is_left_pending():
+    messages = conversation(3)
+    context = OpenAILLMContext(messages)
+    compactor = compactor_with_summary(messages, cut=5, text=None)
+
+    compactor._apply_summary(context)
+
+    assert context.get_messages() == messages
+    assert compactor._pending is not None
+
+
+def test_routed_model_is_kept_in_the_summary():
+    messages = conversation(3)
+    context = OpenAILLMContext(messages)
+    compactor = compactor_with_summary(messages, cut=5)
+    compactor._pending.model = "WD-G3P600"
+
+    compactor._apply_summary(context)
+
+    assert context.get_messages()[1]["content"] == f"{SUMMARY_PREFIX}\nProduct model: WD-G3P600\nSymptom: leak"
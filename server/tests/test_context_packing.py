@@ -0,0 +1,81 @@
+import pytest
+from langchain_core.documents import Document
+
+import context_packing
+from context_packing import ELLIPSIS, ResultPacker, count_tokens
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    # Four characters per token, so budgets don't depend on tiktoken being downloadable
+    monkeypatch.setattr(context_packing, "_encoding", lambda: None)
+
+
+def doc(text, **metadata):
+    return Document(page_content=text, metadata=metadata)
+
+
+FILTER = "Replace the filter every six months."
+HISTORY = "Our company was founded long ago in a big city."
+LIGHT = "The filter light resets once you replace it."
+
+
+def test_zero_budget_returns_chunks_unpacked():
+    docs = [doc("One. Two.", source="a"), doc("Three.")]
+    assert ResultPacker(budget=0).pack("anything", docs) == [
+        {"rank": 1, "content": "One. Two.", "metadata": {"source": "a"}},
+        {"rank": 2, "content": "Three.", "metadata": {}},
+    ]
+
+
+def test_sentences_cut_from_the_middle_are_joined_with_an_ellipsis():
+    packer = ResultPacker(budget=count_tokens(FILTER) + count_tokens(LIGHT))
+    results = packer.pack("replace filter", [doc(f"{FILTER} {HISTORY} {LIGHT}")])
+    assert results == [{"rank": 1, "content": f"{FILTER}{ELLIPSIS}{LIGHT}"}]
+
+
+def test_adjacent_sentences_are_joined_with_a_space_in_document_order():
+    packer = ResultPacker(budget=count_tokens(HISTORY) + count_tokens(LIGHT))
+    results = packer.pack("company founded light", [doc(f"{FILTER} {HISTORY} {LIGHT}")])
+    assert results[0]["content"] == f"{HISTORY} {LIGHT}"
+
+
+def test_selection_never_exceeds_the_budget():
+    budget = count_tokens(FILTER)
+    results = ResultPacker(budget=budget).pack("replace filter", [doc(f"{HISTORY} {FILTER} {LIGHT}")])
+    assert sum(count_tokens(s) for s in context_packing.split_sentences(results[0]["content"])) <= budget
+
+
+def test_a_sentence_over_the_budget_is_skipped_but_smaller_ones_still_fit():
+    long = "Filter " * 40 + "replacement takes a while."
+    short = "Replace it."
+    results = ResultPacker(budget=count_tokens(short)).pack("filter replacement", [doc(long), doc(short)])
+    assert results == [{"rank": 1, "content": short}]
+
+
+def test_nothing_fits_returns_no_results():
+    packer = ResultPacker(budget=1)
+    assert packer.pack("filter", [doc(FILTER)]) == []
+    assert packer.stats()["dropped_chunks"] == 1
+
+
+def test_duplicate_sentences_are_kept_once_and_empty_chunks_dropped():
+    packer = ResultPacker(budget=1000)
+    results = packer.pack("filter", [doc(f"{FILTER} {LIGHT}"), doc(f"{LIGHT}\n{FILTER.upper()}")])
+    assert [r["content"] for r in results] == [f"{FILTER} {LIGHT}"]
+    stats = packer.stats()
+    assert stats["duplicate_sentences"] == 2
+    assert stats["dropped_chunks"] == 1
+
+
+def test_only_requested_metadata_is_kept_and_ranks_are_renumbered():
+    packer = ResultPacker(budget=1000, metadata_fields=["product_model", "source"])
+    docs = [
+        doc(FILTER, product_model="WD-A1", source="manual.pdf", _id="1", page=3),
+        doc(FILTER),
+        doc(LIGHT, source=""),
+    ]
+    assert packer.pack("filter", docs) == [
+        {"rank": 1, "content": FILTER, "metadata": {"product_model": "WD-A1", "source": "manual.pdf"}},
+        {"rank": 2, "content": LIGHT},
+    ]
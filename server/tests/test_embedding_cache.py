@@ -0,0 +1,143 @@
+import sqlite3
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+import embedding_cache
+from embedding_cache import PRUNE_INTERVAL, CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.queries = []
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return [float(len(text)), 1.0, 0.5]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(embedding_cache, "time", clock)
+    return clock
+
+
+def rows(path):
+    with sqlite3.connect(path) as db:
+        return [key for key, in db.execute("SELECT key FROM query_embeddings ORDER BY created")]
+
+
+def test_normalized_queries_share_an_entry(clock):
+    base = CountingEmbeddings()
+    cache = CachedEmbeddings(base, "m")
+    assert cache.embed_query("Filter   light?") == cache.embed_query("filter light")
+    assert base.queries == ["Filter light"]
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_memory_entries_expire_after_the_ttl(clock):
+    base = CountingEmbeddings()
+    cache = CachedEmbeddings(base, "m", ttl=10)
+    cache.embed_query("leak")
+    clock.now += 10
+    cache.embed_query("leak")
+    clock.now += 11
+    cache.embed_query("leak")
+    assert len(base.queries) == 2
+    assert cache.stats()["misses"] == 2
+
+
+def test_memory_tier_evicts_the_least_recently_used(clock):
+    base = CountingEmbeddings()
+    cache = CachedEmbeddings(base, "m", max_entries=2)
+    for query in ("a", "b", "a", "c", "a", "b"):
+        cache.embed_query(query)
+    assert base.queries == ["a", "b", "c", "b"]
+
+
+def test_disk_tier_is_shared_across_instances(clock, tmp_path):
+    path = str(tmp_path / "cache" / "embeddings.db")
+    CachedEmbeddings(CountingEmbeddings(), "m", disk_path=path).embed_query("leak")
+
+    base = CountingEmbeddings()
+    cache = CachedEmbeddings(base, "m", disk_path=path)
+    assert cache.embed_query("leak") == [4.0, 1.0, 0.5]
+    assert base.queries == []
+    assert cache.stats()["disk_hits"] == 1
+
+    # Vectors are keyed by model too
+    other = CachedEmbeddings(base, "other", disk_path=path)
+    other.embed_query("leak")
+    assert base.queries == ["leak"]
+
+
+def test_expired_disk_rows_are_ignored_and_pruned_on_open(clock, tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    first = CachedEmbeddings(CountingEmbeddings(), "m", ttl=60, disk_path=path)
+    first.embed_query("old")
+    clock.now += 30
+    first.embed_query("new")
+    clock.now += 31
+
+    base = CountingEmbeddings()
+    cache = CachedEmbeddings(base, "m", ttl=60, disk_path=path)
+    assert cache.stats()["disk_pruned"] == 1
+    assert rows(path) == ["new"]
+    cache.embed_query("new")
+    assert base.queries == []
+
+
+def test_prune_caps_rows_in_batches(clock, tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "PRUNE_BATCH", 3)
+    path = str(tmp_path / "embeddings.db")
+    cache = CachedEmbeddings(CountingEmbeddings(), "m", disk_path=path, disk_max_entries=5)
+    for i in range(12):
+        clock.now += 1
+        cache.embed_query(f"query {i}")
+    assert len(rows(path)) == 12
+
+    statements = []
+    cache._prune_db.set_trace_callback(statements.append)
+    cache._disk_prune()
+    assert rows(path) == [f"query {i}" for i in range(7, 12)]
+    assert cache.stats()["disk_pruned"] == 7
+    # One expiry pass that found nothing, then the 7 oldest rows 3 at a time
+    assert len([s for s in statements if s.startswith("DELETE")]) == 4
+
+
+def test_writes_prune_again_once_the_interval_has_passed(clock, tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    cache = CachedEmbeddings(CountingEmbeddings(), "m", disk_path=path, disk_max_entries=2)
+    for query in ("a", "b", "c"):
+        clock.now += 1
+        cache.embed_query(query)
+    assert len(rows(path)) == 3
+
+    clock.now += PRUNE_INTERVAL
+    cache.embed_query("d")
+    assert rows(path) == ["c", "d"]
+    assert cache.stats()["disk_pruned"] == 2
+
+
+def test_prune_already_running_is_not_started_again(clock, tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    cache = CachedEmbeddings(CountingEmbeddings(), "m", ttl=1, disk_path=path)
+    cache.embed_query("a")
+    clock.now += 2
+    with cache._prune_lock:
+        cache._disk_prune()
+    assert rows(path) == ["a"]
+    cache._disk_prune()
+    assert rows(path) == []
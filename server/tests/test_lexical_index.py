@@ -0,0 +1,93 @@
+from langchain_core.documents import Document
+
+from lexical_index import BM25Index, HybridRetriever, reciprocal_rank_fusion
+from vector_index import ROUTING_FIELD
+
+
+def doc(id, text=""):
+    return Document(page_content=text or f"chunk {id}", metadata={"_id": id})
+
+
+PAYLOADS = [
+    {"id": "1", "page_content": "Error E3 means the water tank is empty.", ROUTING_FIELD: []},
+    {"id": "2", "page_content": "G3P600 filter replacement every six months.", ROUTING_FIELD: ["WD-G3P600"]},
+    {"id": "3", "page_content": "G3P800 filter replacement every twelve months.", ROUTING_FIELD: ["WD-G3P800"]},
+    {"id": "4", "page_content": "Flush a new filter for five minutes before drinking.", ROUTING_FIELD: []},
+]
+
+
+class FakeVectorStore:
+    def __init__(self, docs):
+        self.docs = docs
+        self.calls = []
+
+    def similarity_search(self, query, k=4, **kwargs):
+        self.calls.append((query, k, kwargs))
+        return self.docs[:k]
+
+
+def retriever(dense_docs=(), **kwargs):
+    return HybridRetriever(
+        vector_store=FakeVectorStore(list(dense_docs)),
+        lexical=BM25Index(PAYLOADS),
+        dense_model_kwargs=lambda models: {"filter": {"models": models}},
+        **kwargs,
+    )
+
+
+def ids(docs):
+    return [d.metadata["_id"] for d in docs]
+
+
+def test_rrf_documents_in_both_rankings_come_first():
+    fused = reciprocal_rank_fusion([[doc("a"), doc("b")], [doc("c"), doc("b")]], k=3)
+    assert ids(fused) == ["b", "a", "c"]
+
+
+def test_rrf_ties_keep_first_seen_order():
+    # a and b score 1/61 + 1/62 each; c and d score 1/63 each
+    fused = reciprocal_rank_fusion([[doc("a"), doc("b"), doc("c")], [doc("b"), doc("a"), doc("d")]], k=4)
+    assert ids(fused) == ["a", "b", "c", "d"]
+    fused = reciprocal_rank_fusion([[doc("b"), doc("a")], [doc("a"), doc("b")]], k=2)
+    assert ids(fused) == ["b", "a"]
+
+
+def test_rrf_merges_the_same_chunk_and_truncates_to_k():
+    fused = reciprocal_rank_fusion([[doc("a", "dense copy")], [doc("a", "lexical copy"), doc("b")]], k=1)
+    assert len(fused) == 1
+    assert fused[0].page_content == "dense copy"
+
+
+def test_identifier_query_skips_the_embedding_call():
+    hybrid = retriever(dense_docs=[doc("4")])
+    docs = hybrid.invoke("G3P600 E3")
+    assert hybrid.vector_store.calls == []
+    assert set(ids(docs)) == {"1", "2"}
+    assert hybrid.stats()["lexical"]["queries"] == 1
+    assert "hybrid" not in hybrid.stats()
+
+
+def test_fast_path_respects_the_model_partition():
+    hybrid = retriever()
+    docs = hybrid.invoke("G3P800 G3P600", models=["WD-G3P800"])
+    assert ids(docs) == ["3"]
+    assert hybrid.vector_store.calls == []
+
+
+def test_identifier_query_without_lexical_hits_falls_back_to_hybrid():
+    hybrid = retriever(dense_docs=[doc("4")])
+    docs = hybrid.invoke("X9Z999")
+    assert ids(docs) == ["4"]
+    assert len(hybrid.vector_store.calls) == 1
+    assert set(hybrid.stats()) == {"hybrid"}
+
+
+def test_natural_language_query_fuses_dense_and_lexical_results():
+    hybrid = retriever(dense_docs=[doc("1"), doc("2")], k=2)
+    docs = hybrid.invoke("when is the G3P600 filter replacement due", models=["WD-G3P600"])
+    (query, k, kwargs), = hybrid.vector_store.calls
+    assert k == hybrid.fetch_k
+    assert kwargs == {"filter": {"models": ["WD-G3P600"]}}
+    # Chunk 2 is ranked by both halves, so it outranks the dense-only top hit
+    assert ids(docs) == ["2", "1"]
+    assert hybrid.stats()["hybrid"]["queries"] == 1
@@ -0,0 +1,196 @@
+import asyncio
+
+import pytest
+
+from pipecat.frames.frames import InterimTranscriptionFrame
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+from prefetch import RetrievalPrefetcher, is_lookup_utterance, overlap
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "My G3P600 is leaking under the sink",
+        "the filter light is flashing red",
+        "it shows E3 on the display",
+        "it won't turn on",
+        "how do I change the filter",
+        "the water tastes weird",
+        "too much waste water going down the drain",
+    ],
+)
+def test_problem_utterances_are_looked_up(text):
+    assert is_lookup_utterance(text)
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["Can I change my order", "turn off the light", "I can't hear you", "the code is 1234", "", None],
+)
+def test_small_talk_is_not_looked_up(text):
+    assert not is_lookup_utterance(text)
+
+
+def test_overlap():
+    assert overlap(["a", "b"], ["b", "c"]) == pytest.approx(1 / 3)
+    assert overlap(["a"], []) == 0.0
+
+
+class FakeSearch:
+    def __init__(self, result=("doc",)):
+        self.result = result
+        self.queries = []
+        self.release = asyncio.Event()
+
+    async def __call__(self, query, models):
+        self.queries.append((query, models))
+        await self.release.wait()
+        return list(self.result) if self.result is not None else None
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_tool_call_waits_for_the_inflight_prefetch():
+    async def main():
+        search = FakeSearch()
+        prefetcher = RetrievalPrefetcher(search)
+        prefetcher._maybe_prefetch("My G3P600 is leaking under the sink")
+        lookup = asyncio.create_task(prefetcher.lookup("WD-G3P600-W leaking under sink", ["WD-G3P600-W"], 1.0))
+        await asyncio.sleep(0)
+        search.release.set()
+        assert await lookup == ["doc"]
+        assert search.queries == [("My WD-G3P600-W is leaking under the sink", ["WD-G3P600-W"])]
+        stats = prefetcher.stats()
+        assert (stats["prefetches"], stats["hits"], stats["misses"]) == (1, 1, 0)
+        assert stats["hit_rate"] == 1.0
+
+    run(main())
+
+
+def test_unrelated_or_other_model_tool_calls_miss():
+    async def main():
+        search = FakeSearch()
+        search.release.set()
+        prefetcher = RetrievalPrefetcher(search)
+        prefetcher._maybe_prefetch("My G3P600 is leaking under the sink")
+        await asyncio.sleep(0)
+        assert await prefetcher.lookup("warranty registration", ["WD-G3P600-W"], 1.0) is None
+        assert await prefetcher.lookup("G3P800 leaking under sink", ["WD-G3P800-B"], 1.0) is None
+        assert prefetcher.stats()["misses"] == 2
+
+    run(main())
+
+
+def test_model_is_carried_over_from_an_earlier_utterance():
+    async def main():
+        search = FakeSearch()
+        prefetcher = RetrievalPrefetcher(search)
+        prefetcher._maybe_prefetch("I have a G3P600")
+        prefetcher._maybe_prefetch("it is beeping all night")
+        await asyncio.sleep(0)
+        assert search.queries == [("it is beeping all night", ["WD-G3P600-W"])]
+        await prefetcher.cleanup()
+
+    run(main())
+
+
+def test_no_model_no_prefetch():
+    async def main():
+        search = FakeSearch()
+        prefetcher = RetrievalPrefetcher(search)
+        prefetcher._maybe_prefetch("it is leaking")
+        await asyncio.sleep(0)
+        assert search.queries == []
+        assert prefetcher.stats()["prefetches"] == 0
+
+    run(main())
+
+
+def test_newer_utterance_replaces_the_inflight_one_and_repeats_are_ignored():
+    async def main():
+        search = FakeSearch()
+        prefetcher = RetrievalPrefetcher(search)
+        prefetcher._maybe_prefetch("My G3P600 is leaking")
+        first = prefetcher._prefetches[0]
+        prefetcher._maybe_prefetch("My G3P600 is leaking")
+        prefetcher._maybe_prefetch("My G3P600 is leaking from the faucet connector")
+        await asyncio.sleep(0)
+        assert first.task.cancelled()
+        assert [p.query for p in prefetcher._prefetches] == ["My WD-G3P600-W is leaking from the faucet connector"]
+        stats = prefetcher.stats()
+        assert (stats["prefetches"], stats["replaced"]) == (2, 1)
+        await prefetcher.cleanup()
+
+    run(main())
+
+
+def test_prefetch_awaited_by_a_tool_call_is_not_replaced():
+    async def main():
+        search = FakeSearch()
+        prefetcher = RetrievalPrefetcher(search)
+        prefetcher._maybe_prefetch("My G3P600 is leaking")
+        lookup = asyncio.create_task(prefetcher.lookup("G3P600 leaking", ["WD-G3P600-W"], 1.0))
+        await asyncio.sleep(0)
+        prefetcher._maybe_prefetch("My G3P600 filter light is flashing red")
+        search.release.set()
+        assert await lookup == ["doc"]
+        assert prefetcher.stats()["replaced"] == 0
+        assert len(prefetcher._prefetches) == 2
+
+    run(main())
+
+
+def test_only_max_prefetches_are_kept():
+    async def main():
+        search = FakeSearch()
+        search.release.set()
+        prefetcher = RetrievalPrefetcher(search, max_prefetches=2)
+        for text in ("My G3P600 is leaking", "the G3P600 smells bad", "G3P600 shows error E3"):
+            prefetcher._maybe_prefetch(text)
+            await asyncio.sleep(0)
+        assert [p.query for p in prefetcher._prefetches] == [
+            "the WD-G3P600-W smells bad",
+            "WD-G3P600-W shows error E3",
+        ]
+
+    run(main())
+
+
+def test_timed_out_or_empty_prefetch_is_a_miss():
+    async def main():
+        search = FakeSearch()
+        prefetcher = RetrievalPrefetcher(search)
+        prefetcher._maybe_prefetch("My G3P600 is leaking")
+        assert await prefetcher.lookup("G3P600 leaking", ["WD-G3P600-W"], 0.01) is None
+        # The timed-out wait does not cancel the prefetch itself
+        assert not prefetcher._prefetches[0].task.done()
+
+        search.result = None
+        search.release.set()
+        assert await prefetcher.lookup("G3P600 leaking", ["WD-G3P600-W"], 1.0) is None
+        assert prefetcher.stats()["misses"] == 2
+
+    run(main())
+
+
+def test_interim_transcriptions_prefetch_only_after_a_pause(monkeypatch):
+    async def noop(self, *args, **kwargs):
+        pass
+
+    monkeypatch.setattr(FrameProcessor, "process_frame", noop)
+    monkeypatch.setattr(FrameProcessor, "push_frame", noop)
+
+    async def main():
+        search = FakeSearch()
+        prefetcher = RetrievalPrefetcher(search, debounce=0.05)
+        for text in ("My G3P600 is", "My G3P600 is leaking", "My G3P600 is leaking from the tank"):
+            frame = InterimTranscriptionFrame(text=text, user_id="user", timestamp="now")
+            await prefetcher.process_frame(frame, FrameDirection.DOWNSTREAM)
+        await asyncio.sleep(0.1)
+        assert search.queries == [("My WD-G3P600-W is leaking from the tank", ["WD-G3P600-W"])]
+        search.release.set()
+
+    run(main())
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from retrieval_bench import (
+    CONFIGS,
+    SYNTHETIC_BASELINE,
+    SYNTHETIC_FILE,
+    HashedEmbeddings,
+    build_synthetic_collection,
+    load_queries,
+    regressions,
+    run_config,
+)
+
+# Qdrant's local mode locks its directory, so the tests stay on the exported NumPy index
+NUMPY_CONFIGS = [name for name, settings in CONFIGS.items() if settings["backend"] == "numpy"]
+
+
+@pytest.fixture(scope="module")
+def report(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("retrieval-bench")
+    embeddings = HashedEmbeddings()
+    kb = {
+        "persist_path": str(tmp_path / "qdrant"),
+        "collection": "synthetic",
+        "numpy_index": str(tmp_path / "index"),
+    }
+    build_synthetic_collection(SYNTHETIC_FILE, kb["persist_path"], kb["collection"], embeddings)
+    queries = load_queries(SYNTHETIC_FILE)
+    stores: dict = {}
+    return [run_config(name, queries, embeddings, repeat=1, stores=stores, **kb) for name in NUMPY_CONFIGS]
+
+
+def test_synthetic_quality_matches_the_baseline(report):
+    with open(SYNTHETIC_BASELINE) as f:
+        baseline = json.load(f)
+    # Latency is machine-dependent; only recall and MRR are gated here
+    assert regressions(report, baseline, k=4, max_recall_drop=0.02, max_slowdown=0) == []
+    assert all(result["queries"] == 32 for result in report)
+
+
+def test_gate_reports_a_quality_drop(report):
+    baseline = [dict(result, mrr=result["mrr"] + 0.1) for result in report]
+    failures = regressions(report, baseline, k=4, max_recall_drop=0.02, max_slowdown=0)
+    assert len(failures) == len(report)
+    assert all(": mrr " in failure for failure in failures)
+
+
+def test_latency_is_gated_only_when_asked(report):
+    baseline = [dict(result, p99_ms=result["p99_ms"] / 10) for result in report]
+    assert regressions(report, baseline, k=4, max_recall_drop=0.02, max_slowdown=0) == []
+    assert len(regressions(report, baseline, k=4, max_recall_drop=0.02, max_slowdown=1.5)) == len(report)
@@ -1,16 +1,70 @@
 from pipecat.adapters.schemas.function_schema import FunctionSchema
 from pipecat.adapters.schemas.tools_schema import ToolsSchema
+import asyncio
+import hashlib
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import TYPE_CHECKING, Optional
 from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings
-from langchain_qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient
-from pipecat.services.openai.llm import OpenAILLMService
+from langchain_core.embeddings import Embeddings
+from loguru import logger
 from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContext
 from prompts import DEFAULT_SYSTEM_PROMPT
+from embedding_cache import CachedEmbeddings
+from answer_cache import SemanticAnswerCache
+from vector_index import ROUTING_FIELD, NumpyVectorStore, load_numpy_store, scroll_collection
+from lexical_index import BM25Index, HybridRetriever
+from http_clients import async_http_client, openai_client, sync_http_client
+
+# langchain_openai, langchain_qdrant/qdrant_client and the pipecat OpenAI service are
+# imported where they are used, so a bot on the NumPy backend never loads Qdrant
+if TYPE_CHECKING:
+    from langchain_qdrant import QdrantVectorStore
+    from pipecat.services.openai.llm import OpenAILLMService
 
 load_dotenv(override=True)
 
+# Seconds a knowledge base lookup may take before the tool answers with a fallback
+KB_SEARCH_TIMEOUT = float(os.getenv("KB_SEARCH_TIMEOUT", "3.0"))
+
+# Knowledge base backend: "qdrant" or "numpy", and where the NumPy export lives
+KB_BACKEND = os.getenv("KB_BACKEND", "qdrant").lower().strip()
+KB_NUMPY_INDEX = os.getenv("KB_NUMPY_INDEX", "./waterdrop_faq_index")
+# Optional compact copy searched first ("int8" or "binary"), and how many candidates
+# per result are rescored at full precision
+KB_QUANTIZATION = os.getenv("KB_QUANTIZATION") or None
+KB_RESCORE_OVERSAMPLE = int(os.getenv("KB_RESCORE_OVERSAMPLE", "4"))
+# Two-stage Matryoshka search: first pass over this many leading dimensions (e.g. 256, 512)
+KB_COARSE_DIMS = int(os.getenv("KB_COARSE_DIMS", "0")) or None
+# Chunk metadata field holding the WD-* model(s) a chunk belongs to
+KB_MODEL_FIELD = os.getenv("KB_MODEL_FIELD", "product_model")
+# Fuse dense results with an in-process BM25 index (and answer identifier queries lexically)
+KB_HYBRID = os.getenv("KB_HYBRID", "false").lower() in ("1", "true", "yes")
+
+# Query embedding model (the collection was embedded with the same model)
+EMBEDDING_MODEL = "text-embedding-3-large"
+
+# Query embedding cache: in-memory LRU size, TTL in seconds, optional shared SQLite file
+# and the most rows that file keeps (about 12 KB each)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "1024"))
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", str(24 * 60 * 60)))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH")
+EMBEDDING_CACHE_DISK_SIZE = int(os.getenv("EMBEDDING_CACHE_DISK_SIZE", "10000"))
+
+# Semantic answer cache: reuse the spoken answer for near-identical knowledge base questions
+ANSWER_CACHE = os.getenv("ANSWER_CACHE", "false").lower() in ("1", "true", "yes")
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 60 * 60)))
+
+# Retrieval does a blocking embedding request plus a local vector scan, so it runs
+# on a small dedicated pool instead of the event loop (or the unbounded default executor)
+_retrieval_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("KB_SEARCH_WORKERS", "4")),
+    thread_name_prefix="kb-search",
+)
+
 # Define the retriever function using the standard schema
 retriever_function = FunctionSchema(
     name="search_knowledge_base",
@@ -27,25 +81,232 @@ retriever_function = FunctionSchema(
 # Create a tools schema with your retriever function
 retriever_tools = ToolsSchema(standard_tools=[retriever_function])
 
-def load_qdrant_from_disk(persist_path: str, collection_name: str) -> QdrantVectorStore:
+def create_embeddings(base: Optional[Embeddings] = None) -> CachedEmbeddings:
+    """
+    Creates the query embeddings used by every knowledge base backend.
+    base replaces the OpenAI embeddings underneath the cache (e.g. recorded
+    vectors in retrieval_bench.py); its model attribute, if any, keys the cache.
+    """
+    if base is None:
+        api_key = os.environ.get("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY not found in environment variables.")
+        from langchain_openai import OpenAIEmbeddings
+
+        # On the process-wide keep-alive pools instead of a client per instance. A
+        # request (retries included) cannot outlive the lookup's budget, so it frees
+        # its kb-search thread instead of finishing for a caller that gave up
+        base = OpenAIEmbeddings(
+            model=EMBEDDING_MODEL,
+            http_client=sync_http_client(),
+            http_async_client=async_http_client(),
+            request_timeout=KB_SEARCH_TIMEOUT,
+            max_retries=0,
+        )
+    return CachedEmbeddings(
+        base,
+        model=getattr(base, "model", EMBEDDING_MODEL),
+        max_entries=EMBEDDING_CACHE_SIZE,
+        ttl=EMBEDDING_CACHE_TTL,
+        disk_path=EMBEDDING_CACHE_PATH,
+        disk_max_entries=EMBEDDING_CACHE_DISK_SIZE,
+    )
+
+def load_qdrant_from_disk(
+    persist_path: str, collection_name: str, embeddings: Optional[Embeddings] = None
+) -> "QdrantVectorStore":
     """
     Loads the Qdrant vector store from disk and returns a QdrantVectorStore instance.
+    Model filters need ROUTING_FIELD on every point; a collection that lacks it
+    (not built by ingest.py) is reported, not modified.
     """
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment variables.")
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+    from langchain_qdrant import QdrantVectorStore
+    from qdrant_client import QdrantClient
+
+    embeddings = embeddings or create_embeddings()
 
     client = QdrantClient(path=persist_path)
+    sample, _ = client.scroll(collection_name, limit=1, with_payload=[ROUTING_FIELD], with_vectors=False)
+    if sample and ROUTING_FIELD not in (sample[0].payload or {}):
+        logger.warning(
+            f"{collection_name} has no {ROUTING_FIELD} tags, so model filters treat its points as shared; "
+            "run `python vector_index.py tag` with the bots stopped"
+        )
     return QdrantVectorStore(
         client=client,
         collection_name=collection_name,
         embedding=embeddings,
     )
 
-TOOL_CONTEXT = OpenAILLMContext(
-    messages=[{"role": "system", "content": DEFAULT_SYSTEM_PROMPT}],
-    tools=retriever_tools
-)
+def load_vector_store(
+    persist_path: str,
+    collection_name: str,
+    backend: str = KB_BACKEND,
+    embeddings: Optional[Embeddings] = None,
+    quantization: Optional[str] = KB_QUANTIZATION,
+    coarse_dims: Optional[int] = KB_COARSE_DIMS,
+    numpy_index: Optional[str] = None,
+):
+    """
+    Loads the knowledge base with the backend selected by KB_BACKEND:
+    "qdrant" (embedded local mode) or "numpy" (memory-mapped matrix, see vector_index.py).
+    Both return a LangChain vector store, so as_retriever(k=4) works the same.
+    The keyword arguments override the environment settings (retrieval_bench.py).
+    """
+    if backend == "numpy":
+        return load_numpy_store(
+            numpy_index or KB_NUMPY_INDEX,
+            embeddings or create_embeddings(),
+            persist_path,
+            collection_name,
+            quantization=quantization,
+            oversample=KB_RESCORE_OVERSAMPLE,
+            coarse_dims=coarse_dims,
+            model_field=KB_MODEL_FIELD,
+        )
+    if backend != "qdrant":
+        raise ValueError(f"Invalid KB_BACKEND: {backend}. Must be 'qdrant' or 'numpy'")
+    return load_qdrant_from_disk(persist_path, collection_name, embeddings)
 
-LLM_WITH_TOOLS = OpenAILLMService(api_key=os.getenv("OPENAI_API_KEY"))
+def create_retriever(vector_store, k: int = 4, hybrid: bool = KB_HYBRID):
+    """
+    Returns the retriever used by search_knowledge_base: the vector store's own
+    retriever, or with KB_HYBRID a BM25 + dense retriever over the same chunks.
+    """
+    if not hybrid:
+        return vector_store.as_retriever(k=k)
+    if isinstance(vector_store, NumpyVectorStore):
+        payloads = vector_store.payloads
+    else:
+        payloads = [
+            payload for payload, _ in scroll_collection(
+                vector_store.client, vector_store.collection_name, with_vectors=False
+            )
+        ]
+    return HybridRetriever(
+        vector_store=vector_store,
+        lexical=BM25Index(payloads, model_field=KB_MODEL_FIELD),
+        dense_model_kwargs=partial(dense_model_kwargs, vector_store),
+        k=k,
+    )
+
+def dense_model_kwargs(vector_store, models: list[str]) -> dict:
+    """
+    Vector store search kwargs for the given product models plus shared documents.
+    The NumPy backend searches per-model partitions; Qdrant gets a payload filter
+    on the same canonical routing models (ROUTING_FIELD).
+    """
+    if isinstance(vector_store, NumpyVectorStore):
+        return {"models": models}
+    from qdrant_client import models as qdrant_models
+
+    key = ROUTING_FIELD
+    return {
+        "filter": qdrant_models.Filter(
+            should=[
+                qdrant_models.FieldCondition(key=key, match=qdrant_models.MatchAny(any=models)),
+                qdrant_models.IsEmptyCondition(is_empty=qdrant_models.PayloadField(key=key)),
+            ]
+        )
+    }
+
+def model_search_kwargs(retriever, models: list[str]) -> dict:
+    """
+    Search kwargs that restrict a lookup to the given product models plus shared
+    (model-less) documents such as policies and warranty.
+    """
+    if not models:
+        return {}
+    if isinstance(retriever, HybridRetriever):
+        return {"models": models}
+    return dense_model_kwargs(retriever.vectorstore, models)
+
+def collection_fingerprint(persist_path: str, backend: str = KB_BACKEND) -> str:
+    """
+    Short hash of the knowledge base files on disk (the NumPy index, or the
+    Qdrant storage directory). It changes whenever the collection is re-exported
+    or re-ingested.
+    """
+    root = KB_NUMPY_INDEX if backend == "numpy" else persist_path
+    digest = hashlib.sha1()
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.endswith(".lock"):
+                continue
+            stat = os.stat(os.path.join(dirpath, name))
+            digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:12]
+
+def create_answer_cache(persist_path: str):
+    """
+    Returns the process-wide SemanticAnswerCache, or None unless ANSWER_CACHE is set.
+    """
+    if not ANSWER_CACHE:
+        return None
+    return SemanticAnswerCache(
+        threshold=ANSWER_CACHE_THRESHOLD,
+        max_entries=ANSWER_CACHE_SIZE,
+        ttl=ANSWER_CACHE_TTL,
+        fingerprint=partial(collection_fingerprint, persist_path),
+    )
+
+async def embed_query(vector_store, query: str, timeout: float = KB_SEARCH_TIMEOUT):
+    """
+    Embeds a query on the retrieval thread pool (through the embedding cache, so
+    the retriever's own embedding of the same query is free).
+    Returns None if the embedding does not finish within the timeout budget.
+    """
+    if timeout <= 0:
+        return None
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_retrieval_executor, vector_store.embeddings.embed_query, query)
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        return None
+
+async def retrieve_documents(retriever, query: str, timeout: float = KB_SEARCH_TIMEOUT, **search_kwargs):
+    """
+    Runs retriever.invoke(query) on the retrieval thread pool so audio, VAD and TTS
+    frames keep flowing while the lookup is in progress.
+    Extra search_kwargs (e.g. from model_search_kwargs) are passed to the vector store.
+    Returns None if the lookup does not finish within the timeout budget; a lookup
+    still queued for a thread then never starts.
+    """
+    if timeout <= 0:
+        return None
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_retrieval_executor, partial(retriever.invoke, query, **search_kwargs))
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        return None
+
+def create_tool_context() -> OpenAILLMContext:
+    """
+    Creates a fresh conversation context with the system prompt and retriever tool.
+    Each session needs its own context since it accumulates the conversation.
+    """
+    return OpenAILLMContext(
+        messages=[{"role": "system", "content": DEFAULT_SYSTEM_PROMPT}],
+        tools=retriever_tools
+    )
+
+@lru_cache(maxsize=1)
+def _pooled_llm_service() -> type:
+    from pipecat.services.openai.llm import OpenAILLMService
+
+    class PooledOpenAILLMService(OpenAILLMService):
+        """OpenAILLMService on the process-wide OpenAI client, so sessions share connections."""
+
+        def create_client(self, api_key=None, base_url=None, **kwargs):
+            return openai_client()
+
+    return PooledOpenAILLMService
+
+def create_llm_with_tools() -> "OpenAILLMService":
+    """
+    Creates an OpenAI LLM service for a single session.
+    """
+    return _pooled_llm_service()(api_key=os.getenv("OPENAI_API_KEY"))
@@ -0,0 +1,429 @@
+"""
+Pre-synthesized TTS audio for fixed and repeated utterances.
+
+Every tool call speaks "Let me check on that.", and greetings and fallback
+lines come out nearly word for word in every session, yet each one is
+synthesized again over the Cartesia websocket. This module keeps raw PCM per
+(voice, sample rate, text):
+- TTSAudioCache: a byte-bounded in-memory LRU plus an optional on-disk tier
+  (one .pcm file per entry) shared by every bot process on the host; disk
+  reads, writes and eviction run in worker threads, off the event loop
+- FILLER_PHRASES are rendered once per voice, at worker startup or ahead of
+  time with ``python tts_cache.py render``
+- CachedCartesiaTTSService plays cache hits through the service's ordered
+  audio contexts with no network round-trip, and renders sentences it keeps
+  seeing in the background so the next occurrence is a hit
+
+Usage:
+    python tts_cache.py render --voice <voice_id> [--sample-rate 24000] [phrase ...]
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import AsyncGenerator, Dict, List, Optional
+
+import aiohttp
+from dotenv import load_dotenv
+from loguru import logger
+
+from pipecat.frames.frames import Frame, StartInterruptionFrame, TTSAudioRawFrame, TTSStartedFrame
+from pipecat.processors.frame_processor import FrameDirection
+from pipecat.services.cartesia.tts import CartesiaTTSService
+
+load_dotenv(override=True)
+
+# Fixed lines the bot speaks itself (not generated by the LLM)
+FILLER_PHRASES = ["Let me check on that."]
+
+# In-memory budget, optional shared directory and its budget
+TTS_CACHE_MEMORY_MB = float(os.getenv("TTS_CACHE_MEMORY_MB", "32"))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR")
+TTS_CACHE_DISK_MB = float(os.getenv("TTS_CACHE_DISK_MB", "256"))
+# A sentence is rendered into the cache once it has been spoken this many times
+TTS_CACHE_REPEATS = int(os.getenv("TTS_CACHE_REPEATS", "2"))
+# Output rate used for pre-rendering (PipelineParams' default)
+TTS_CACHE_SAMPLE_RATE = int(os.getenv("TTS_CACHE_SAMPLE_RATE", "24000"))
+
+# Cartesia endpoints (pointed at service_stubs.py for load tests)
+CARTESIA_HTTP_URL = os.getenv("CARTESIA_HTTP_URL", "https://api.cartesia.ai/tts/bytes")
+CARTESIA_WS_URL = os.getenv("CARTESIA_WS_URL", "wss://api.cartesia.ai/tts/websocket")
+CARTESIA_HTTP_VERSION = "2024-11-13"
+
+# The disk tier is trimmed back to its budget at most this often (seconds)
+DISK_EVICT_INTERVAL = 60
+
+# Longer texts are never cached: they rarely repeat verbatim
+MAX_TEXT_CHARS = 200
+# Cached audio is queued in ~100ms frames (16-bit mono) so interruptions stay responsive
+CHUNK_SECONDS = 0.1
+
+
+def normalize_text(text: str) -> str:
+    """
+    Whitespace-collapsed text. Case and punctuation are kept since they change
+    the prosody.
+    """
+    return " ".join((text or "").split())
+
+
+def cache_key(voice_id: str, sample_rate: int, text: str) -> str:
+    return hashlib.sha1(f"{voice_id}|{sample_rate}|{normalize_text(text)}".encode()).hexdigest()
+
+
+class TTSAudioCache:
+    """
+    Raw PCM cache keyed on (voice, sample rate, text), bounded in bytes.
+    """
+
+    def __init__(
+        self,
+        max_memory_bytes: int = 32 * 1024 * 1024,
+        disk_dir: Optional[str] = None,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._evicted_at = 0.0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.pcm")
+
+    def _memory_put(self, key: str, audio: bytes):
+        if len(audio) > self.max_memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    async def get(self, voice_id: str, sample_rate: int, text: str) -> Optional[bytes]:
+        key = cache_key(voice_id, sample_rate, text)
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            self._stats["memory_hits"] += 1
+            return audio
+        if self.disk_dir:
+            audio = await asyncio.to_thread(self._disk_read, key)
+            if audio:
+                self._memory_put(key, audio)
+                self._stats["disk_hits"] += 1
+                return audio
+        self._stats["misses"] += 1
+        return None
+
+    async def contains(self, voice_id: str, sample_rate: int, text: str) -> bool:
+        key = cache_key(voice_id, sample_rate, text)
+        if key in self._memory:
+            return True
+        return bool(self.disk_dir) and await asyncio.to_thread(os.path.exists, self._path(key))
+
+    async def put(self, voice_id: str, sample_rate: int, text: str, audio: bytes):
+        if not audio:
+            return
+        key = cache_key(voice_id, sample_rate, text)
+        self._memory_put(key, audio)
+        if self.disk_dir:
+            await asyncio.to_thread(self._disk_write, key, audio)
+
+    def _disk_read(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                audio = f.read()
+            # Touch the file so disk eviction is least-recently-used
+            os.utime(self._path(key))
+            return audio
+        except OSError:
+            return None
+
+    def _disk_write(self, key: str, audio: bytes):
+        # Write-then-rename so other processes never read a partial file
+        tmp = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(audio)
+        os.replace(tmp, self._path(key))
+        # Listing the directory is O(entries), so the budget is enforced periodically
+        if time.monotonic() - self._evicted_at >= DISK_EVICT_INTERVAL:
+            self._evicted_at = time.monotonic()
+            self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".pcm"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.disk_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.disk_dir, name))
+            except OSError:
+                pass
+            total -= size
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Hit counts, hit rate and memory use.
+        """
+        lookups = sum(self._stats.values())
+        hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+        return {
+            **self._stats,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+        }
+
+
+def create_tts_cache() -> TTSAudioCache:
+    """
+    The process-wide cache, sized from the TTS_CACHE_* settings.
+    """
+    return TTSAudioCache(
+        max_memory_bytes=int(TTS_CACHE_MEMORY_MB * 1024 * 1024),
+        disk_dir=TTS_CACHE_DIR,
+        max_disk_bytes=int(TTS_CACHE_DISK_MB * 1024 * 1024),
+    )
+
+
+async def render_pcm(
+    session: aiohttp.ClientSession,
+    voice_id: str,
+    text: str,
+    sample_rate: int,
+    model: str = "sonic-2",
+    language: str = "en",
+    api_key: Optional[str] = None,
+) -> bytes:
+    """
+    Synthesizes text to raw 16-bit mono PCM with Cartesia's HTTP API.
+    """
+    payload = {
+        "model_id": model,
+        "transcript": text,
+        "voice": {"mode": "id", "id": voice_id},
+        "output_format": {"container": "raw", "encoding": "pcm_s16le", "sample_rate": sample_rate},
+        "language": language,
+    }
+    headers = {
+        "Cartesia-Version": CARTESIA_HTTP_VERSION,
+        "X-API-Key": api_key or os.getenv("CARTESIA_API_KEY"),
+        "Content-Type": "application/json",
+    }
+    async with session.post(CARTESIA_HTTP_URL, json=payload, headers=headers) as response:
+        if response.status != 200:
+            raise Exception(f"Cartesia API returned status {response.status}: {await response.text()}")
+        return await response.read()
+
+
+async def prerender(
+    cache: TTSAudioCache,
+    session: aiohttp.ClientSession,
+    voice_id: str,
+    phrases: List[str] = FILLER_PHRASES,
+    sample_rate: int = TTS_CACHE_SAMPLE_RATE,
+    **render_kwargs,
+) -> int:
+    """
+    Renders any of the phrases missing from the cache for this voice.
+    Returns how many were rendered.
+    """
+    rendered = 0
+    for phrase in phrases:
+        if await cache.contains(voice_id, sample_rate, phrase):
+            continue
+        try:
+            audio = await render_pcm(session, voice_id, phrase, sample_rate, **render_kwargs)
+        except Exception as e:
+            logger.warning(f"Could not pre-render '{phrase}': {e}")
+            continue
+        await cache.put(voice_id, sample_rate, phrase, audio)
+        rendered += 1
+    return rendered
+
+
+class CachedCartesiaTTSService(CartesiaTTSService):
+    """
+    Cartesia websocket TTS that plays cached audio when it has it.
+
+    A sentence is served from the cache only when no live Cartesia context is
+    open, so it never cuts a streamed response's prosody in half. Cache hits
+    go through the same ordered audio contexts and word-timestamp markers as
+    live audio, so text frames, TTSStoppedFrame and LLMFullResponseEndFrame
+    reach the rest of the pipeline as usual.
+
+    Args:
+        audio_cache: Shared TTSAudioCache
+        http_session: Session used to render repeated sentences in the background
+        repeat_threshold: Times a sentence is spoken before it is rendered into the cache
+    """
+
+    def __init__(
+        self,
+        *,
+        audio_cache: TTSAudioCache,
+        http_session: Optional[aiohttp.ClientSession] = None,
+        repeat_threshold: int = TTS_CACHE_REPEATS,
+        **kwargs,
+    ):
+        kwargs.setdefault("url", CARTESIA_WS_URL)
+        super().__init__(**kwargs)
+        self._audio_cache = audio_cache
+        self._http_session = http_session
+        self._repeat_threshold = repeat_threshold
+        self._seen: "OrderedDict[str, int]" = OrderedDict()
+        # Renders in flight; each removes itself when it finishes
+        self._render_tasks: Dict[str, asyncio.Task] = {}
+        self._cached_in_response = False
+        self._cached_chars = 0
+
+    def _note_spoken(self, text: str):
+        if len(text) > MAX_TEXT_CHARS or not self._http_session or self._repeat_threshold <= 0:
+            return
+        key = cache_key(self._voice_id, self.sample_rate, text)
+        count = self._seen.pop(key, 0) + 1
+        self._seen[key] = count
+        while len(self._seen) > 2048:
+            self._seen.popitem(last=False)
+        if count >= self._repeat_threshold and key not in self._render_tasks:
+            task = asyncio.create_task(self._render(key, text))
+            self._render_tasks[key] = task
+            task.add_done_callback(lambda _, key=key: self._render_tasks.pop(key, None))
+
+    async def _render(self, key: str, text: str):
+        voice_id, sample_rate = self._voice_id, self.sample_rate
+        try:
+            audio = await render_pcm(
+                self._http_session,
+                voice_id,
+                text,
+                sample_rate,
+                model=self.model_name,
+                language=self._settings.get("language") or "en",
+                api_key=self._api_key,
+            )
+            await self._audio_cache.put(voice_id, sample_rate, text, audio)
+            logger.debug(f"{self}: cached audio for [{text}]")
+        except Exception as e:
+            # Retried once the sentence has been spoken repeat_threshold more times
+            self._seen.pop(key, None)
+            logger.warning(f"{self}: could not cache audio for [{text}]: {e}")
+
+    async def run_tts(self, text: str) -> AsyncGenerator[Frame, None]:
+        """Play text from the cache, or synthesize it over the websocket.
+
+        Args:
+            text: The text to synthesize into speech.
+
+        Yields:
+            Frame: Audio frames containing the synthesized speech.
+        """
+        text = normalize_text(text)
+        audio = None
+        if not self._context_id and len(text) <= MAX_TEXT_CHARS:
+            audio = await self._audio_cache.get(self._voice_id, self.sample_rate, text)
+
+        if audio is None:
+            self._note_spoken(text)
+            async for frame in super().run_tts(text):
+                yield frame
+            return
+
+        logger.debug(f"{self}: Playing cached TTS [{text}]")
+        self._cached_chars += len(text)
+        yield TTSStartedFrame()
+
+        context_id = str(uuid.uuid4())
+        await self.create_audio_context(context_id)
+        self.start_word_timestamps()
+        await self.add_word_timestamps([(text, 0)])
+        chunk = int(self.sample_rate * CHUNK_SECONDS) * 2
+        for i in range(0, len(audio), chunk):
+            await self.append_to_audio_context(
+                context_id,
+                TTSAudioRawFrame(audio=audio[i : i + chunk], sample_rate=self.sample_rate, num_channels=1),
+            )
+        await self.remove_audio_context(context_id)
+
+        if self._llm_response_started:
+            # The rest of the LLM response may still stream; end it on flush
+            self._cached_in_response = True
+        else:
+            await self.add_word_timestamps([("TTSStoppedFrame", 0), ("Reset", 0)])
+        yield None
+
+    async def flush_audio(self):
+        """Finalize the live context, or end a response whose last sentence was cached."""
+        if not self._context_id and self._cached_in_response:
+            self._cached_in_response = False
+            await self.add_word_timestamps([("TTSStoppedFrame", 0), ("Reset", 0)])
+            return
+        if self._context_id:
+            # The live context's own "done" message ends the response
+            self._cached_in_response = False
+        await super().flush_audio()
+
+    async def _handle_interruption(self, frame: StartInterruptionFrame, direction: FrameDirection):
+        await super()._handle_interruption(frame, direction)
+        self._cached_in_response = False
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Cache stats plus characters this session did not send to Cartesia.
+        """
+        return {**self._audio_cache.stats(), "chars_saved": self._cached_chars}
+
+    async def cleanup(self):
+        await super().cleanup()
+        for task in list(self._render_tasks.values()):
+            task.cancel()
+        logger.info(f"TTS audio cache: {self.stats()}")
+
+
+async def _render_command(args):
+    if not TTS_CACHE_DIR:
+        raise SystemExit("Set TTS_CACHE_DIR so rendered audio is kept on disk")
+    cache = create_tts_cache()
+    async with aiohttp.ClientSession() as session:
+        count = await prerender(
+            cache, session, args.voice, args.phrases or FILLER_PHRASES, args.sample_rate, language=args.language
+        )
+    print(f"Rendered {count} phrase(s) for voice {args.voice} into {TTS_CACHE_DIR}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render fixed TTS phrases")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    render = subparsers.add_parser("render", help="Render phrases for a voice into TTS_CACHE_DIR")
+    render.add_argument("--voice", required=True, help="Cartesia voice id")
+    render.add_argument("--sample-rate", type=int, default=TTS_CACHE_SAMPLE_RATE)
+    render.add_argument("--language", default="en")
+    render.add_argument("phrases", nargs="*", help=f"Phrases to render (default: {FILLER_PHRASES})")
+
+    args = parser.parse_args()
+    if args.command == "render":
+        asyncio.run(_render_command(args))
+
+
+if __name__ == "__main__":
+    main()
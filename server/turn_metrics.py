@@ -0,0 +1,180 @@
+#
+# Copyright (c) 2024–2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Voice Turn Latency Histograms.
+
+Bots time each stage of a conversational turn (see ``latency_observer``) into
+fixed-bucket histograms. Every few seconds they send the histograms recorded
+since their last report to server.py as a ``metrics`` event (see
+``worker_ipc``). Fixed buckets make the reports additive, so the server can
+merge any number of processes and sessions without keeping raw samples.
+
+The server renders the merged histograms, with p50/p95/p99 estimated from
+the buckets, in the Prometheus text format on ``/metrics``.
+
+Stages (seconds):
+- ``stt``: user stopped speaking -> final transcription
+- ``llm_ttft``: LLM request -> first token (first LLM call of the turn)
+- ``tool``: knowledge base tool call -> result (every call)
+- ``tts_ttfb``: TTS request -> first audio byte (first sentence of the turn)
+- ``first_audio``: user stopped speaking -> bot started speaking
+
+This module has no heavy dependencies so both sides can import it.
+"""
+
+import bisect
+from typing import Any, Dict, Iterable, List, Optional
+
+STAGES = ("stt", "llm_ttft", "tool", "tts_ttfb", "first_audio")
+
+# Upper bounds (seconds) of the histogram buckets; the last bucket is +Inf
+BUCKETS = (
+    0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5,
+    0.6, 0.75, 1.0, 1.25, 1.5, 2.0, 2.5, 3.0, 4.0, 5.0, 7.5, 10.0,
+)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram:
+    """Counts of latencies per fixed bucket, plus their sum."""
+
+    def __init__(self, counts: Optional[List[int]] = None, total: float = 0.0):
+        self.counts = list(counts) if counts else [0] * (len(BUCKETS) + 1)
+        self.total = total
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+
+    def merge(self, other: "LatencyHistogram"):
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.total += other.total
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated quantile, interpolating linearly within the bucket (like histogram_quantile)."""
+        count = self.count
+        if not count:
+            return None
+        rank = q * count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                if i == len(BUCKETS):
+                    # Beyond the last bound there is nothing to interpolate towards
+                    return BUCKETS[-1]
+                low = BUCKETS[i - 1] if i else 0.0
+                return low + (BUCKETS[i] - low) * (rank - seen) / n
+            seen += n
+        return BUCKETS[-1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"counts": self.counts, "sum": round(self.total, 6)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> Optional["LatencyHistogram"]:
+        counts = data.get("counts")
+        if not isinstance(counts, list) or len(counts) != len(BUCKETS) + 1:
+            return None
+        return cls([int(n) for n in counts], float(data.get("sum", 0.0)))
+
+
+class StageHistograms:
+    """One LatencyHistogram per turn stage."""
+
+    def __init__(self):
+        self.stages: Dict[str, LatencyHistogram] = {stage: LatencyHistogram() for stage in STAGES}
+
+    def observe(self, stage: str, seconds: float):
+        self.stages[stage].observe(seconds)
+
+    def merge(self, stages: Dict[str, Any]):
+        """Adds a reported ``to_dict()`` snapshot; unknown stages and malformed entries are ignored."""
+        for stage, data in stages.items():
+            if stage in self.stages and isinstance(data, dict):
+                histogram = LatencyHistogram.from_dict(data)
+                if histogram:
+                    self.stages[stage].merge(histogram)
+
+    def empty(self) -> bool:
+        return not any(h.count for h in self.stages.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {stage: h.to_dict() for stage, h in self.stages.items() if h.count}
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Sample count and p50/p95/p99 in milliseconds per stage."""
+        report = {}
+        for stage, h in self.stages.items():
+            if h.count:
+                report[stage] = {"n": h.count}
+                for q in QUANTILES:
+                    report[stage][f"p{int(q * 100)}_ms"] = round(h.quantile(q) * 1000)
+        return report
+
+
+def _labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{str(v)}"' for k, v in labels.items())
+    return "{" + inner + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class PrometheusText:
+    """Builds a Prometheus text exposition (format 0.0.4)."""
+
+    def __init__(self):
+        self._lines: List[str] = []
+
+    def metric(
+        self,
+        name: str,
+        kind: str,
+        help: str,
+        samples: Iterable[tuple[Dict[str, Any], Optional[float]]],
+    ):
+        """Adds a metric family; samples with a None value are skipped."""
+        samples = [(labels, value) for labels, value in samples if value is not None]
+        if not samples:
+            return
+        self._lines.append(f"# HELP {name} {help}")
+        self._lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self._lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def histograms(self, name: str, help: str, histograms: StageHistograms):
+        """Adds per-stage histograms plus a gauge family with their estimated quantiles."""
+        self._lines.append(f"# HELP {name} {help}")
+        self._lines.append(f"# TYPE {name} histogram")
+        for stage, h in histograms.stages.items():
+            cumulative = 0
+            for bound, n in zip(list(BUCKETS) + ["+Inf"], h.counts):
+                cumulative += n
+                self._lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            self._lines.append(f'{name}_sum{{stage="{stage}"}} {_number(round(h.total, 6))}')
+            self._lines.append(f'{name}_count{{stage="{stage}"}} {h.count}')
+        self.metric(
+            f"{name}_quantile",
+            "gauge",
+            f"{help} (quantile estimated from the histogram buckets)",
+            (
+                ({"stage": stage, "quantile": q}, h.quantile(q) and round(h.quantile(q), 6))
+                for stage, h in histograms.stages.items()
+                for q in QUANTILES
+            ),
+        )
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
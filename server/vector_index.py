@@ -0,0 +1,615 @@
+"""
+In-memory NumPy vector index for the knowledge base.
+
+Qdrant's embedded local mode scans the collection in pure Python and loads it
+separately in every bot process. This module exports the collection once into:
+- vectors.npy: a contiguous, pre-normalized float32 matrix (one row per chunk)
+- payloads.json: the LangChain page_content/metadata for each row
+- index.json: collection name, dimension and row count
+
+Each export is a new versioned directory next to the index path, which is a
+symlink swapped atomically to the newest version; the previous version is kept
+for processes still opening it. Exports are serialized with a lock file, so bot
+processes that start together export the collection once.
+
+NumpyVectorStore memory-maps that export, so every process on a host shares one
+physical copy of the matrix, and answers top-k with a single matrix-vector
+product. It is a LangChain VectorStore, so as_retriever(k=4) works unchanged.
+
+Optionally the index also holds compact copies of the matrix:
+- int8: per-dimension symmetric scalar quantization (4x smaller)
+- binary: one sign bit per dimension (32x smaller), scored by Hamming distance
+Search runs on the compact copy first, then rescores a small candidate set
+with the full float32 rows, which stay on disk until touched.
+
+text-embedding-3-large is a Matryoshka embedding: its leading dimensions are a
+usable embedding on their own. With coarse_dims set (e.g. 256 or 512), the first
+pass instead runs over the first coarse_dims dimensions of every row,
+renormalized. The full 3072-dim query is embedded once and sliced locally.
+
+Rows are also partitioned by product model: a chunk belongs to the models in
+its model metadata field (or, failing that, the models its text mentions), and
+chunks that name no model (policies, warranty, shipping) are shared. Searches
+for a model only score that model's partition plus the shared rows. The
+canonical models are stored on each Qdrant point as ROUTING_FIELD, which the
+Qdrant backend filters on, so both backends route the same chunks. ingest.py
+writes it; collections built elsewhere are tagged once with the tag command
+(loading and exporting never write to the collection).
+
+Tag, build the export, the quantized copies and a recall/memory report with:
+    python vector_index.py tag --qdrant ./waterdrop_faq_qdrant --collection waterdrop_faq
+    python vector_index.py export --qdrant ./waterdrop_faq_qdrant --collection waterdrop_faq --out ./waterdrop_faq_index
+    python vector_index.py quantize --index ./waterdrop_faq_index
+    python vector_index.py evaluate --index ./waterdrop_faq_index
+"""
+import argparse
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from product_models import extract_models
+
+VECTORS_FILE = "vectors.npy"
+PAYLOADS_FILE = "payloads.json"
+META_FILE = "index.json"
+INT8_FILE = "vectors.int8.npy"
+INT8_SCALE_FILE = "int8_scale.npy"
+BINARY_FILE = "vectors.bin.npy"
+
+QUANTIZATIONS = ("int8", "binary")
+
+# Payload field with a point's canonical product models ([] for shared chunks)
+ROUTING_FIELD = "routing_models"
+
+# Truncated Matryoshka prefixes reported by evaluate()
+COARSE_DIMS = (256, 512)
+
+
+def truncated_file(dims: int) -> str:
+    return f"vectors.d{dims}.npy"
+
+# Set-bit count for every byte value, used for Hamming distance on packed bits
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scales each row to unit length so cosine similarity becomes a dot product.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def scroll_collection(client, collection_name: str, with_vectors: bool = True, batch_size: int = 256):
+    """
+    Yields (payload, vector) for every point of a Qdrant collection, where payload
+    is the LangChain id/page_content/metadata record and vector is None unless requested.
+    """
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=with_vectors,
+        )
+        for point in points:
+            payload = point.payload or {}
+            vector = point.vector
+            if isinstance(vector, dict):
+                # Named vectors; LangChain stores its vector under ""
+                vector = vector.get("") or next(iter(vector.values()))
+            record = {
+                "id": str(point.id),
+                "page_content": payload.get("page_content", ""),
+                "metadata": payload.get("metadata") or {},
+            }
+            if ROUTING_FIELD in payload:
+                record[ROUTING_FIELD] = payload[ROUTING_FIELD]
+            yield record, vector
+        if offset is None:
+            break
+
+
+@contextmanager
+def export_lock(out_dir: str):
+    """
+    Holds an exclusive lock on an index path across processes.
+    """
+    path = os.path.abspath(out_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.lock"), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def publish_index(tmp_dir: str, out_dir: str):
+    """
+    Points the out_dir symlink at a finished export directory. Readers see either
+    the previous export or this one, never a missing or partial index.
+    """
+    out_dir = os.path.abspath(out_dir)
+    parent, name = os.path.split(out_dir)
+    version = os.path.join(parent, f".{name}-{time.time_ns()}")
+    os.rename(tmp_dir, version)
+    previous = os.path.join(parent, os.readlink(out_dir)) if os.path.islink(out_dir) else None
+    if os.path.isdir(out_dir) and not os.path.islink(out_dir):
+        # Index exported before versioning: moved aside once, like any previous version
+        previous = os.path.join(parent, f".{name}-0")
+        os.rename(out_dir, previous)
+
+    link = os.path.join(parent, f".{name}-link-{os.getpid()}")
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(version), link)
+    os.replace(link, out_dir)
+
+    # Keep the version just replaced for processes still opening it; drop older ones
+    keep = {version, previous}
+    for entry in os.listdir(parent):
+        path = os.path.join(parent, entry)
+        if entry.startswith(f".{name}-") and not entry.startswith(f".{name}-link-") and path not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def export_collection(
+    persist_path: str,
+    collection_name: str,
+    out_dir: str,
+    batch_size: int = 256,
+    if_missing: bool = False,
+) -> str:
+    """
+    Exports a local-mode Qdrant collection to a NumPy index directory.
+    The export is written to a temporary directory and published with
+    publish_index(), under export_lock(), so concurrent readers never see a
+    partial index and concurrent exporters take turns. With if_missing, an
+    index another process exported while this one waited is kept.
+    """
+    from qdrant_client import QdrantClient
+
+    with export_lock(out_dir):
+        if if_missing and os.path.exists(os.path.join(out_dir, META_FILE)):
+            return out_dir
+        client = QdrantClient(path=persist_path)
+        try:
+            rows, payloads = [], []
+            for payload, vector in scroll_collection(client, collection_name, batch_size=batch_size):
+                rows.append(vector)
+                payloads.append(payload)
+        finally:
+            client.close()
+
+        dim = len(rows[0]) if rows else 0
+        vectors = normalize_rows(np.array(rows, dtype=np.float32).reshape(len(rows), dim))
+
+        tmp_dir = tempfile.mkdtemp(prefix=".index-", dir=os.path.dirname(os.path.abspath(out_dir)))
+        os.chmod(tmp_dir, 0o755)
+        np.save(os.path.join(tmp_dir, VECTORS_FILE), np.ascontiguousarray(vectors))
+        with open(os.path.join(tmp_dir, PAYLOADS_FILE), "w") as f:
+            json.dump(payloads, f)
+        with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+            json.dump({"collection": collection_name, "dim": dim, "count": len(payloads)}, f)
+        publish_index(tmp_dir, out_dir)
+    return out_dir
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric per-dimension int8 quantization: vectors ~= codes * scale.
+    """
+    scale = np.abs(vectors).max(axis=0) / 127.0 if len(vectors) else np.ones(vectors.shape[1], np.float32)
+    scale = np.where(scale == 0, 1.0, scale).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scale), -127, 127).astype(np.int8)
+    return codes, scale
+
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """
+    One sign bit per dimension, packed eight to a byte.
+    """
+    return np.packbits(np.asarray(vectors) > 0, axis=-1)
+
+
+def save_array(path: str, array: np.ndarray):
+    """
+    np.save to a temporary file renamed over path, so a concurrent np.load never
+    reads a partly written file.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=".array-", suffix=".npy", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, array)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def build_quantized(index_dir: str):
+    """
+    Writes the int8 and binary copies of an exported index next to its float32 matrix.
+    The int8 codes go last: their presence marks the set complete.
+    """
+    vectors = np.load(os.path.join(index_dir, VECTORS_FILE), mmap_mode="r")
+    codes, scale = quantize_int8(vectors)
+    save_array(os.path.join(index_dir, INT8_SCALE_FILE), scale)
+    save_array(os.path.join(index_dir, BINARY_FILE), quantize_binary(vectors))
+    save_array(os.path.join(index_dir, INT8_FILE), codes)
+
+
+def truncate(vectors: np.ndarray, dims: int) -> np.ndarray:
+    """
+    Keeps the first dims dimensions of each row and renormalizes them.
+    """
+    return normalize_rows(np.asarray(vectors)[..., :dims])
+
+
+def build_truncated(index_dir: str, dims: int):
+    """
+    Writes the renormalized dims-dimensional prefix of an exported index.
+    """
+    vectors = np.load(os.path.join(index_dir, VECTORS_FILE), mmap_mode="r")
+    save_array(os.path.join(index_dir, truncated_file(dims)), np.ascontiguousarray(truncate(vectors, dims)))
+
+
+def chunk_models(payload: dict, model_field: str) -> List[str]:
+    """
+    Canonical models a chunk belongs to: its model metadata field if set,
+    otherwise the models its text mentions.
+    """
+    value = (payload.get("metadata") or {}).get(model_field)
+    if isinstance(value, (list, tuple)):
+        value = " ".join(str(v) for v in value)
+    return extract_models(str(value)) if value else extract_models(payload.get("page_content", ""))
+
+
+def routing_models(payload: dict, model_field: str) -> List[str]:
+    """
+    Models a chunk is routed to: its ROUTING_FIELD tag, or chunk_models() if untagged.
+    """
+    if ROUTING_FIELD in payload:
+        return list(payload[ROUTING_FIELD] or [])
+    return chunk_models(payload, model_field)
+
+
+def tag_routing_models(client, collection_name: str, model_field: str) -> int:
+    """
+    Stores routing_models() on every point of a Qdrant collection whose
+    ROUTING_FIELD is missing or stale. Returns the number of points updated.
+    """
+    updates: dict = {}
+    for payload, _ in scroll_collection(client, collection_name, with_vectors=False):
+        models = chunk_models(payload, model_field)
+        if payload.get(ROUTING_FIELD) != models:
+            # Point ids are unsigned integers or UUIDs; scroll_collection returns them as strings
+            point_id = int(payload["id"]) if payload["id"].isdigit() else payload["id"]
+            updates.setdefault(tuple(models), []).append(point_id)
+    for models, ids in updates.items():
+        client.set_payload(collection_name, payload={ROUTING_FIELD: list(models)}, points=ids)
+    return sum(len(ids) for ids in updates.values())
+
+
+def partition_rows(payloads: List[dict], model_field: str) -> Tuple[dict, np.ndarray]:
+    """
+    Maps each canonical model to its rows; rows with no model are shared.
+    """
+    partitions: dict = {}
+    shared = []
+    for row, payload in enumerate(payloads):
+        models = routing_models(payload, model_field)
+        if not models:
+            shared.append(row)
+        for model in models:
+            partitions.setdefault(model, []).append(row)
+    return (
+        {model: np.array(rows, dtype=np.int64) for model, rows in partitions.items()},
+        np.array(shared, dtype=np.int64),
+    )
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first.
+    """
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Read-only vector store over a memory-mapped, pre-normalized float32 matrix.
+    """
+
+    def __init__(
+        self,
+        index_dir: str,
+        embedding: Embeddings,
+        quantization: Optional[str] = None,
+        oversample: int = 4,
+        coarse_dims: Optional[int] = None,
+        model_field: str = "product_model",
+    ):
+        if quantization not in (None,) + QUANTIZATIONS:
+            raise ValueError(f"Invalid quantization: {quantization}. Must be one of {QUANTIZATIONS}")
+        if quantization and coarse_dims:
+            raise ValueError("Use either quantization or coarse_dims for the first search pass, not both")
+        # Resolved once, so every file comes from the same export even if a newer one is published
+        index_dir = os.path.realpath(index_dir)
+        self.index_dir = index_dir
+        self.quantization = quantization
+        self.oversample = oversample
+        self.coarse_dims = coarse_dims
+        self.model_field = model_field
+        self._embedding = embedding
+        with open(os.path.join(index_dir, META_FILE)) as f:
+            self.meta = json.load(f)
+        with open(os.path.join(index_dir, PAYLOADS_FILE)) as f:
+            self.payloads = json.load(f)
+        # mmap keeps one physical copy per host, shared by every bot process
+        self.vectors = np.load(os.path.join(index_dir, VECTORS_FILE), mmap_mode="r")
+
+        self.int8_codes = self.int8_scale = self.binary_codes = None
+        if quantization and not os.path.exists(os.path.join(index_dir, INT8_FILE)):
+            build_quantized(index_dir)
+        if quantization == "int8":
+            # The compact copy is what stays resident; float rows are only read to rescore
+            self.int8_codes = np.load(os.path.join(index_dir, INT8_FILE))
+            self.int8_scale = np.load(os.path.join(index_dir, INT8_SCALE_FILE))
+        elif quantization == "binary":
+            self.binary_codes = np.load(os.path.join(index_dir, BINARY_FILE))
+
+        self.truncated = None
+        if coarse_dims:
+            if coarse_dims >= self.vectors.shape[1]:
+                raise ValueError(f"coarse_dims must be below the index dimension ({self.vectors.shape[1]})")
+            path = os.path.join(index_dir, truncated_file(coarse_dims))
+            if not os.path.exists(path):
+                build_truncated(index_dir, coarse_dims)
+            self.truncated = np.load(path)
+
+        self.partitions, self.shared_rows = self._build_partitions()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def _document(self, row: int) -> Document:
+        payload = self.payloads[row]
+        metadata = dict(payload["metadata"])
+        metadata.setdefault("_id", payload["id"])
+        metadata.setdefault("_collection_name", self.meta["collection"])
+        return Document(page_content=payload["page_content"], metadata=metadata)
+
+    def _build_partitions(self) -> Tuple[dict, np.ndarray]:
+        return partition_rows(self.payloads, self.model_field)
+
+    def rows_for_models(self, models: Optional[List[str]]) -> Optional[np.ndarray]:
+        """
+        Sorted rows to search for the given models plus shared rows, or None to
+        search everything (no models given, or none of them has a partition).
+        """
+        known = [self.partitions[m] for m in (models or []) if m in self.partitions]
+        if not known:
+            return None
+        return np.unique(np.concatenate(known + [self.shared_rows]))
+
+    def search_vector(
+        self, vector: List[float], k: int = 4, models: Optional[List[str]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Returns (row, cosine score) pairs for the k nearest rows, restricted to
+        the partitions of the given models when there are any.
+        """
+        if self.vectors.shape[0] == 0:
+            return []
+        query = normalize_rows(np.asarray(vector, dtype=np.float32))
+        rows = self.rows_for_models(models)
+
+        def subset(matrix: np.ndarray) -> np.ndarray:
+            return matrix if rows is None else matrix[rows]
+
+        def to_rows(picked: np.ndarray) -> np.ndarray:
+            return picked if rows is None else rows[picked]
+
+        if self.quantization is None and self.truncated is None:
+            scores = subset(self.vectors) @ query
+            picked = top_k(scores, k)
+            return [(int(row), float(scores[i])) for i, row in zip(picked, to_rows(picked))]
+
+        # Coarse pass on the compact copy, then exact rescoring of the candidates
+        if self.truncated is not None:
+            coarse = subset(self.truncated) @ truncate(query, self.coarse_dims)
+        elif self.quantization == "int8":
+            coarse = subset(self.int8_codes) @ (query * self.int8_scale)
+        else:
+            distance = _POPCOUNT[np.bitwise_xor(subset(self.binary_codes), quantize_binary(query))].sum(axis=1)
+            coarse = -distance.astype(np.float32)
+        candidates = np.sort(to_rows(top_k(coarse, k * self.oversample)))
+        scores = np.asarray(self.vectors[candidates]) @ query
+        return [(int(candidates[i]), float(scores[i])) for i in top_k(scores, k)]
+
+    def memory_footprint(self) -> dict:
+        """
+        Bytes held by each copy of the matrix.
+        """
+        footprint = {"float32": int(self.vectors.nbytes)}
+        if self.int8_codes is not None:
+            footprint["int8"] = int(self.int8_codes.nbytes + self.int8_scale.nbytes)
+        if self.binary_codes is not None:
+            footprint["binary"] = int(self.binary_codes.nbytes)
+        if self.truncated is not None:
+            footprint[f"d{self.coarse_dims}"] = int(self.truncated.nbytes)
+        return footprint
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, models: Optional[List[str]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return [(self._document(row), score) for row, score in self.search_vector(embedding, k, models)]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, models: Optional[List[str]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k, models)
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, models: Optional[List[str]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, models)]
+
+    def similarity_search(
+        self, query: str, k: int = 4, models: Optional[List[str]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, models)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are already cosine similarities
+        return lambda score: score
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        raise NotImplementedError("NumpyVectorStore is read-only; re-export the collection instead")
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None, **kwargs: Any):
+        raise NotImplementedError("NumpyVectorStore is built with export_collection()")
+
+
+def load_numpy_store(
+    index_dir: str,
+    embedding: Embeddings,
+    persist_path: str,
+    collection_name: str,
+    quantization: Optional[str] = None,
+    oversample: int = 4,
+    coarse_dims: Optional[int] = None,
+    model_field: str = "product_model",
+) -> NumpyVectorStore:
+    """
+    Opens the NumPy index, exporting it from the Qdrant collection first if needed.
+    Processes that start together wait for the first one's export instead of
+    exporting again.
+    """
+    if not os.path.exists(os.path.join(index_dir, META_FILE)):
+        export_collection(persist_path, collection_name, index_dir, if_missing=True)
+    return NumpyVectorStore(
+        index_dir,
+        embedding,
+        quantization=quantization,
+        oversample=oversample,
+        coarse_dims=coarse_dims,
+        model_field=model_field,
+    )
+
+
+def recall_at_k(store: NumpyVectorStore, exact: NumpyVectorStore, queries: np.ndarray, k: int = 4) -> float:
+    """
+    Mean fraction of the exact top-k that the store also returns.
+    """
+    if len(queries) == 0:
+        return 0.0
+    total = 0.0
+    for query in queries:
+        expected = {row for row, _ in exact.search_vector(query, k)}
+        found = {row for row, _ in store.search_vector(query, k)}
+        total += len(expected & found) / max(1, len(expected))
+    return total / len(queries)
+
+
+def evaluate(index_dir: str, queries: Optional[np.ndarray] = None, k: int = 4, noise: float = 0.05) -> List[dict]:
+    """
+    Reports memory footprint and recall@k of each quantization and truncated
+    first pass against the unquantized baseline. Without recorded query vectors, every indexed row
+    plus gaussian noise stands in for a query, so this runs fully offline.
+    """
+    exact = NumpyVectorStore(index_dir, embedding=None)
+    if queries is None:
+        rng = np.random.default_rng(0)
+        rows = np.asarray(exact.vectors)
+        queries = rows + rng.normal(0, noise, rows.shape).astype(np.float32)
+
+    report = [{"quantization": "none", "bytes": exact.memory_footprint()["float32"], f"recall@{k}": 1.0}]
+    for quantization in QUANTIZATIONS:
+        store = NumpyVectorStore(index_dir, embedding=None, quantization=quantization)
+        report.append({
+            "quantization": quantization,
+            "bytes": store.memory_footprint()[quantization],
+            f"recall@{k}": round(recall_at_k(store, exact, queries, k), 4),
+        })
+    for dims in COARSE_DIMS:
+        if dims >= exact.vectors.shape[1]:
+            continue
+        store = NumpyVectorStore(index_dir, embedding=None, coarse_dims=dims)
+        report.append({
+            "quantization": f"matryoshka-{dims}",
+            "bytes": store.memory_footprint()[f"d{dims}"],
+            f"recall@{k}": round(recall_at_k(store, exact, queries, k), 4),
+        })
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="NumPy vector index for the knowledge base")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export a Qdrant collection to a NumPy index")
+    export_parser.add_argument("--qdrant", default="./waterdrop_faq_qdrant", help="Qdrant local-mode directory")
+    export_parser.add_argument("--collection", default="waterdrop_faq", help="Collection name")
+    export_parser.add_argument("--out", default="./waterdrop_faq_index", help="Output index directory")
+
+    tag_parser = subparsers.add_parser("tag", help=f"Store each point's routing models as {ROUTING_FIELD}")
+    tag_parser.add_argument("--qdrant", default="./waterdrop_faq_qdrant", help="Qdrant local-mode directory")
+    tag_parser.add_argument("--collection", default="waterdrop_faq", help="Collection name")
+    tag_parser.add_argument(
+        "--model-field", default=os.getenv("KB_MODEL_FIELD", "product_model"), help="Chunk metadata field for product models"
+    )
+
+    quantize_parser = subparsers.add_parser("quantize", help="Build int8, binary and truncated copies of an index")
+    quantize_parser.add_argument("--index", default="./waterdrop_faq_index", help="Index directory")
+
+    evaluate_parser = subparsers.add_parser("evaluate", help="Report memory and recall@k per quantization")
+    evaluate_parser.add_argument("--index", default="./waterdrop_faq_index", help="Index directory")
+    evaluate_parser.add_argument("--queries", help="Optional .npy file of recorded query vectors")
+    evaluate_parser.add_argument("-k", type=int, default=4, help="Results per query")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        out = export_collection(args.qdrant, args.collection, args.out)
+        with open(os.path.join(out, META_FILE)) as f:
+            print(f"Exported {json.load(f)} to {out}")
+    elif args.command == "tag":
+        from qdrant_client import QdrantClient
+
+        client = QdrantClient(path=args.qdrant)
+        try:
+            print(f"Tagged {tag_routing_models(client, args.collection, args.model_field)} points")
+        finally:
+            client.close()
+    elif args.command == "quantize":
+        build_quantized(args.index)
+        for dims in COARSE_DIMS:
+            build_truncated(args.index, dims)
+        print(f"Wrote quantized and truncated copies to {args.index}")
+    elif args.command == "evaluate":
+        queries = np.load(args.queries) if args.queries else None
+        for row in evaluate(args.index, queries, args.k):
+            print(json.dumps(row))
@@ -0,0 +1,97 @@
+#
+# Copyright (c) 2024–2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Worker IPC Protocol.
+
+Pre-warmed bot workers and server.py talk over the worker's standard streams
+using line-delimited JSON:
+- The worker writes events (e.g. ``{"event": "ready"}``) to stdout
+- The server writes session handoffs (room URL, token, language, voice) to stdin
+
+Every handoff carries a ``session_id`` which the worker echoes back in its
+``accepted``, ``rejected`` and ``session_ended`` events, so one worker can host
+several sessions. A worker that is already full, or reads a handoff after its
+``expires`` time (the server has given up on it), answers ``rejected`` and the
+server routes the session elsewhere.
+
+Cold-started bots have their stdout read the same way, for their ``metrics``
+events.
+
+This module has no heavy dependencies so both sides can import it.
+"""
+
+import asyncio
+import json
+import sys
+from typing import Any, AsyncIterator, Dict, Optional
+
+# Worker has finished initializing and is waiting for a handoff
+READY = "ready"
+# Worker has received a handoff and is joining the room
+ACCEPTED = "accepted"
+# Worker did not take a handoff ("reason": "full" or "expired"); nothing joined the room
+REJECTED = "rejected"
+# A session hosted by the worker has finished
+SESSION_ENDED = "session_ended"
+# Turn latency histograms recorded since the bot's last report (see turn_metrics)
+METRICS = "metrics"
+
+
+def encode(message: Dict[str, Any]) -> bytes:
+    """Encode a message as a single JSON line."""
+    return (json.dumps(message) + "\n").encode()
+
+
+def decode(line: bytes | str) -> Optional[Dict[str, Any]]:
+    """Decode a JSON line, returning None for blank or non-protocol lines."""
+    if isinstance(line, bytes):
+        line = line.decode(errors="replace")
+    line = line.strip()
+    if not line.startswith("{"):
+        return None
+    try:
+        message = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    return message if isinstance(message, dict) else None
+
+
+async def read_events(pipe) -> AsyncIterator[Dict[str, Any]]:
+    """Yield the events a bot writes to ``pipe`` (server side) until it exits.
+
+    Non-protocol lines are skipped, which also keeps the pipe drained.
+    """
+    reader = asyncio.StreamReader()
+    loop = asyncio.get_running_loop()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        event = decode(line)
+        if event is not None:
+            yield event
+
+
+def send_event(event: str, **fields):
+    """Write an event to the server (worker side)."""
+    sys.stdout.buffer.write(encode({"event": event, **fields}))
+    sys.stdout.flush()
+
+
+async def read_message() -> Optional[Dict[str, Any]]:
+    """Wait for the next message from the server (worker side).
+
+    Returns:
+        The decoded message, or None if the server closed the pipe.
+    """
+    while True:
+        line = await asyncio.to_thread(sys.stdin.readline)
+        if not line:
+            return None
+        message = decode(line)
+        if message is not None:
+            return message